@@ -11,6 +11,9 @@ fi
 su-exec "$USER" python manage.py collectstatic --noinput
 su-exec "$USER" python manage.py migrate --noinput
 
+# Background job worker (label sheets, backups)
+su-exec "$USER" python manage.py run_jobs &
+
 if [ "$1" = "--debug" ]; then
   # Django development server
   exec su-exec "$USER" python manage.py runserver "0.0.0.0:$DJANGO_DEV_SERVER_PORT"
@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import List, Optional
 
 TRUE = ("1", "true", "True", "TRUE", "on", "yes")
@@ -9,3 +10,50 @@ def is_true(val: Optional[str]) -> bool:
 
 def split_with_comma(val: str) -> List[str]:
     return list(filter(None, map(str.strip, val.split(","))))
+
+
+def conn_max_age(val: str) -> Optional[int]:
+    """Parse CONN_MAX_AGE; "none" means connections are never closed for age."""
+    if val.strip().lower() == "none":
+        return None
+    return int(val)
+
+
+SESSION_ENGINES = ("db", "cached_db", "cache")
+CACHE_BACKENDS = {
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+}
+
+
+def session_engine(val: str) -> str:
+    """Map "db", "cached_db" or "cache" to Django's session engine module."""
+    name = val.strip().lower()
+    if name not in SESSION_ENGINES:
+        raise ValueError(
+            f"Unknown session engine {val!r}, expected one of {SESSION_ENGINES}"
+        )
+    return f"django.contrib.sessions.backends.{name}"
+
+
+def cache_config(kind: str, location: str, base_dir: Path) -> dict:
+    """
+    Build a CACHES entry from a backend name and its location.
+
+    "file" locations are directories relative to base_dir; "memcached" and
+    "redis" take a server address such as 127.0.0.1:11211 or
+    redis://127.0.0.1:6379.
+    """
+    name = kind.strip().lower()
+    if name not in CACHE_BACKENDS:
+        raise ValueError(
+            f"Unknown cache backend {kind!r}, expected one of {tuple(CACHE_BACKENDS)}"
+        )
+    config = {"BACKEND": CACHE_BACKENDS[name], "LOCATION": location}
+    if name == "file":
+        config["LOCATION"] = str(base_dir / location)
+        # Past MAX_ENTRIES a third of the files are culled, logging people out
+        config["OPTIONS"] = {"MAX_ENTRIES": 10000}
+    return config
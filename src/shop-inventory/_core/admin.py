@@ -1,7 +1,7 @@
 # Register your models here.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import Job, User
 
 
 @admin.register(User)
@@ -47,3 +47,18 @@ class CustomAdmin(UserAdmin):
     def get_groups(self, obj):
         """Return a comma-separated list of the user's groups"""
         return ", ".join([group.name for group in obj.groups.all()])
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "kind",
+        "status",
+        "progress",
+        "total",
+        "created_by",
+        "created_at",
+    )
+    list_filter = ("kind", "status")
+    readonly_fields = ("started_at", "finished_at", "created_at")
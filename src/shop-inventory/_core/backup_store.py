@@ -0,0 +1,285 @@
+"""
+Incremental, deduplicated database backups on a backup drive.
+
+A snapshot is split into fixed-size chunks. Each chunk is stored once, as an
+AES-encrypted zip named by an HMAC of its contents, so a run only writes the
+chunks that changed since any earlier snapshot. A small JSON manifest per
+snapshot lists its chunks in order. Layout under the store root:
+
+    store.json                  salt for the HMAC key
+    chunks/ab/abcdef....zip     one encrypted chunk
+    snapshots/<name>.json       manifest, written last
+"""
+
+from collections import defaultdict
+from datetime import datetime
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import secrets
+import threading
+
+import pyzipper
+
+logger = logging.getLogger(__name__)
+
+STORE_DIRNAME = "shop_backup_chunks"
+# A multiple of every SQLite page size, so a changed page dirties one chunk
+CHUNK_SIZE = 256 * 1024
+KEY_ITERATIONS = 200_000
+SNAPSHOT_NAME_FORMAT = "%Y-%m-%dT%H%M%S"
+
+
+class BackupStoreError(Exception):
+    pass
+
+
+def _write_atomic(path, write):
+    """Write a file through a .partial name, fsync it, then rename into place."""
+    partial_path = f"{path}.partial"
+    try:
+        write(partial_path)
+        with open(partial_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+class EncodedChunks:
+    """
+    Encrypted chunk zips for one snapshot, shared by the stores on every drive.
+
+    Drives are written in parallel threads; each chunk is compressed and
+    encrypted by whichever thread needs it first and reused by the rest.
+    A chunk is dropped once all `readers` stores have passed it, so only the
+    chunks between the fastest and slowest drive are held at once.
+    """
+
+    def __init__(self, readers=1):
+        self._readers = readers
+        self._blobs = {}
+        self._passed = defaultdict(int)
+        self._locks = defaultdict(threading.Lock)
+        self._guard = threading.Lock()
+
+    def get(self, offset, build):
+        with self._guard:
+            lock = self._locks[offset]
+        with lock:
+            if offset not in self._blobs:
+                self._blobs[offset] = build()
+            return self._blobs[offset]
+
+    def passed(self, offset):
+        """Note that one store is done with the chunk at `offset`."""
+        with self._guard:
+            self._passed[offset] += 1
+            self._release()
+
+    def leave(self):
+        """
+        Note that a store stopped early and will pass no more chunks.
+
+        Chunks it had passed may then be dropped before every other store is
+        done with them; a store that still needs one encodes it again.
+        """
+        with self._guard:
+            self._readers -= 1
+            self._release()
+
+    def _release(self):
+        for offset, count in list(self._passed.items()):
+            if count >= self._readers:
+                self._blobs.pop(offset, None)
+                self._locks.pop(offset, None)
+                del self._passed[offset]
+
+
+class ChunkStore:
+    def __init__(self, root, password):
+        self.root = root
+        self.password = password.encode()
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.snapshot_dir = os.path.join(root, "snapshots")
+        self._key = None
+
+    @property
+    def key(self):
+        """HMAC key for chunk names, derived from the password and store salt."""
+        if self._key is None:
+            config_path = os.path.join(self.root, "store.json")
+            if os.path.exists(config_path):
+                with open(config_path) as f:
+                    salt = bytes.fromhex(json.load(f)["salt"])
+            else:
+                os.makedirs(self.root, exist_ok=True)
+                salt = secrets.token_bytes(16)
+                config = json.dumps({"salt": salt.hex(), "chunk_size": CHUNK_SIZE})
+                _write_atomic(config_path, lambda p: _write_text(p, config))
+            self._key = hashlib.pbkdf2_hmac(
+                "sha256", self.password, salt, KEY_ITERATIONS
+            )
+        return self._key
+
+    def digest(self, data):
+        return hmac.new(self.key, data, hashlib.sha256).hexdigest()
+
+    def chunk_path(self, chunk_id):
+        return os.path.join(self.chunk_dir, chunk_id[:2], f"{chunk_id}.zip")
+
+    def encode_chunk(self, data):
+        """Compress and encrypt one chunk into the bytes of its zip file."""
+        buffer = io.BytesIO()
+        with pyzipper.AESZipFile(
+            buffer,
+            "w",
+            compression=pyzipper.ZIP_LZMA,
+            encryption=pyzipper.WZ_AES,
+        ) as zf:
+            zf.setpassword(self.password)
+            zf.writestr("chunk", data)
+        return buffer.getvalue()
+
+    def _write_chunk(self, chunk_id, blob):
+        path = self.chunk_path(chunk_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, lambda p: _write_bytes(p, blob))
+
+    def _read_chunk(self, chunk_id):
+        with pyzipper.AESZipFile(self.chunk_path(chunk_id)) as zf:
+            zf.setpassword(self.password)
+            data = zf.read("chunk")
+        if not hmac.compare_digest(self.digest(data), chunk_id):
+            raise BackupStoreError(f"Chunk {chunk_id} is corrupt")
+        return data
+
+    def write_snapshot(self, source, name=None, encoded=None):
+        """
+        Store the binary file `source` as a new snapshot and return
+        (name, chunks_written, bytes_written).
+
+        The file is read a chunk at a time and chunks already in the store are
+        skipped. The manifest is written after every chunk is on disk, so a
+        snapshot is either complete or absent. Pass one EncodedChunks as
+        `encoded` to every drive's store so each chunk is compressed and
+        encrypted only once.
+        """
+        if encoded is None:
+            encoded = EncodedChunks()
+        name = name or datetime.now().strftime(SNAPSHOT_NAME_FORMAT)
+        digest = hmac.new(self.key, digestmod=hashlib.sha256)
+        chunk_ids = []
+        size = written = written_bytes = 0
+        try:
+            while chunk := source.read(CHUNK_SIZE):
+                digest.update(chunk)
+                chunk_id = self.digest(chunk)
+                chunk_ids.append(chunk_id)
+                if not os.path.exists(self.chunk_path(chunk_id)):
+                    blob = encoded.get(size, lambda: self.encode_chunk(chunk))
+                    self._write_chunk(chunk_id, blob)
+                    written += 1
+                    written_bytes += len(blob)
+                encoded.passed(size)
+                size += len(chunk)
+        except BaseException:
+            encoded.leave()
+            raise
+
+        manifest = json.dumps(
+            {
+                "name": name,
+                "size": size,
+                "chunk_size": CHUNK_SIZE,
+                "digest": digest.hexdigest(),
+                "chunks": chunk_ids,
+            }
+        )
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = os.path.join(self.snapshot_dir, f"{name}.json")
+        _write_atomic(path, lambda p: _write_text(p, manifest))
+        logger.info(
+            f"Snapshot {name}: {len(chunk_ids)} chunks, {written} new "
+            f"({written_bytes} bytes written)"
+        )
+        return name, written, written_bytes
+
+    def snapshots(self):
+        """Snapshot names, oldest first."""
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return sorted(
+            entry[: -len(".json")]
+            for entry in os.listdir(self.snapshot_dir)
+            if entry.endswith(".json")
+        )
+
+    def manifest(self, name):
+        path = os.path.join(self.snapshot_dir, f"{name}.json")
+        if not os.path.exists(path):
+            raise BackupStoreError(f"No snapshot named {name}")
+        with open(path) as f:
+            return json.load(f)
+
+    def read_snapshot(self, name, dest):
+        """
+        Write the database bytes of snapshot `name` to the binary file `dest`.
+
+        Chunks are verified and written one at a time, with a running digest
+        checked against the manifest at the end; BackupStoreError if it fails.
+        """
+        manifest = self.manifest(name)
+        digest = hmac.new(self.key, digestmod=hashlib.sha256)
+        size = 0
+        for chunk_id in manifest["chunks"]:
+            data = self._read_chunk(chunk_id)
+            digest.update(data)
+            dest.write(data)
+            size += len(data)
+        if size != manifest["size"] or not hmac.compare_digest(
+            digest.hexdigest(), manifest["digest"]
+        ):
+            raise BackupStoreError(f"Snapshot {name} does not match its manifest")
+
+    def prune(self, keep):
+        """
+        Keep the `keep` newest snapshots and delete chunks none of them use.
+
+        Returns (snapshots_removed, chunks_removed).
+        """
+        if keep < 1:
+            raise ValueError("prune must keep at least one snapshot")
+        names = self.snapshots()
+        expired = names[:-keep]
+        for name in expired:
+            os.remove(os.path.join(self.snapshot_dir, f"{name}.json"))
+            logger.info(f"Removed old snapshot: {name}")
+
+        referenced = set()
+        for name in self.snapshots():
+            referenced.update(self.manifest(name)["chunks"])
+
+        removed_chunks = 0
+        if os.path.isdir(self.chunk_dir):
+            for prefix in os.listdir(self.chunk_dir):
+                prefix_dir = os.path.join(self.chunk_dir, prefix)
+                for entry in os.listdir(prefix_dir):
+                    if entry[: -len(".zip")] not in referenced:
+                        os.remove(os.path.join(prefix_dir, entry))
+                        removed_chunks += 1
+        return len(expired), removed_chunks
+
+
+def _write_text(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+from . import groups
+
+
+def user_groups(request):
+    """Expose the user's group names to templates, loaded only when used."""
+    user = getattr(request, "user", None)
+    if user is None:
+        return {"user_groups": frozenset()}
+    return {"user_groups": SimpleLazyObject(lambda: groups.group_names(user))}
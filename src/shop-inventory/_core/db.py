@@ -0,0 +1,13 @@
+def sqlite_pragma_statements(pragmas):
+    """Build PRAGMA statements from a {name: value} dict, skipping blank values."""
+    return [
+        f"PRAGMA {name} = {value}"
+        for name, value in pragmas.items()
+        if value not in (None, "")
+    ]
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    """Run the configured PRAGMA statements on a DB-API cursor."""
+    for statement in sqlite_pragma_statements(pragmas):
+        cursor.execute(statement)
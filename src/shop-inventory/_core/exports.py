@@ -0,0 +1,152 @@
+"""
+CSV exports of inventory, products and order history.
+
+Rows are read with values_list projections through QuerySet.iterator, so only
+one chunk of tuples is in memory at a time, and written out as they arrive.
+The export views stream them with StreamingHttpResponse and the export_csv
+command writes them to a file; memory stays flat however long the history.
+
+Filters: `location` narrows every export (products to those stocked there,
+orders to lines taken from there); `since` and `until` are inclusive local
+dates and narrow the order export, the only one with dates.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+import csv
+import io
+
+from django.db.models import F
+from django.utils import timezone
+
+from checkout.models import OrderItem
+from inventory.models import Inventory, Product
+
+CHUNK_SIZE = 2000
+# Rows written per chunk handed to the response
+FLUSH_ROWS = 500
+
+COLUMNS = {
+    "inventory": (
+        ("inventory_id", "id"),
+        ("location", "location__name"),
+        ("product_id", "product_id"),
+        ("name", "product__name"),
+        ("manufacturer", "product__manufacturer"),
+        ("barcode", "product__barcode"),
+        ("active", "product__active"),
+        ("quantity", "quantity"),
+    ),
+    "products": (
+        ("product_id", "id"),
+        ("name", "name"),
+        ("manufacturer", "manufacturer"),
+        ("barcode", "barcode"),
+        ("normalized_barcode", "normalized_barcode"),
+        ("active", "active"),
+    ),
+    "orders": (
+        ("order_number", "order__order_number"),
+        ("date", "order__date"),
+        ("implicit_id", "order__implicit_id"),
+        ("product_id", "inventory_item__product_id"),
+        ("name", "inventory_item__product__name"),
+        ("manufacturer", "inventory_item__product__manufacturer"),
+        ("barcode", "inventory_item__product__barcode"),
+        ("location", "inventory_item__location__name"),
+        ("quantity", "quantity"),
+    ),
+}
+KINDS = tuple(COLUMNS)
+
+
+def _start_of(day, beyond):
+    """
+    Local midnight starting `day`, in UTC as the database compares it.
+    `beyond` (datetime.min or datetime.max) stands in where that falls
+    outside the years datetime can hold, at either end of the calendar.
+    """
+    try:
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start.astimezone(dt_timezone.utc)
+    except OverflowError:
+        return beyond.replace(tzinfo=dt_timezone.utc)
+
+
+def _at_location(rows, field, location):
+    """
+    Filter `rows` to `location` through `field` as ``location_id + 0``.
+
+    The +0 keeps SQLite from driving the query from the location index,
+    which would return rows in index order and sort them all (in memory,
+    with temp_store=MEMORY) before the first came out. Instead it walks the
+    export's ordering index and checks each row's location as it goes.
+    """
+    return rows.alias(export_location=F(field) + 0).filter(export_location=location.pk)
+
+
+def queryset(kind, since=None, until=None, location=None):
+    """The filtered rows of one export as tuples, oldest first."""
+    ordering = ("pk",)
+    if kind == "inventory":
+        rows = Inventory.objects.all()
+        if location is not None:
+            rows = _at_location(rows, "location_id", location)
+    elif kind == "products":
+        rows = Product.objects.all()
+        if location is not None:
+            # (product, location) is unique, so this adds no duplicates
+            rows = _at_location(rows, "inventory_product__location_id", location)
+    elif kind == "orders":
+        rows = OrderItem.objects.all()
+        if location is not None:
+            rows = _at_location(rows, "inventory_item__location_id", location)
+        if since is not None or until is not None:
+            # Bound both ends, with aware datetimes rather than __date (which
+            # converts every row's timestamp): SQLite only takes the date
+            # index for a closed range, and then reads the range in order
+            start = _start_of(since or date.min, datetime.min)
+            # The last day there is has no next day to stop before
+            if until is None or until == date.max:
+                end = datetime.max.replace(tzinfo=dt_timezone.utc)
+            else:
+                end = _start_of(until + timedelta(days=1), datetime.max)
+            rows = rows.filter(order__date__gte=start, order__date__lt=end)
+            ordering = ("order__date", "order_id", "id")
+        else:
+            # Ids follow commit order, and the order_id index yields them
+            # sorted, so a full export starts streaming at once
+            ordering = ("order_id", "id")
+    else:
+        raise ValueError(f"Unknown export {kind!r}")
+    fields = [lookup for _, lookup in COLUMNS[kind]]
+    return rows.order_by(*ordering).values_list(*fields)
+
+
+def rows(kind, since=None, until=None, location=None, chunk_size=CHUNK_SIZE):
+    """The header and then each row of an export, read a chunk at a time."""
+    yield [header for header, _ in COLUMNS[kind]]
+    records = queryset(kind, since, until, location).iterator(chunk_size=chunk_size)
+    if kind == "orders":
+        for record in records:
+            # Order times are stored in UTC; export them as local time
+            date = timezone.localtime(record[1]).isoformat(timespec="seconds")
+            yield (record[0], date, *record[2:])
+    else:
+        yield from records
+
+
+def stream(rows):
+    """CSV text for `rows`, a few hundred rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def filename(kind):
+    return f"{kind}-{timezone.localdate():%Y-%m-%d}.csv"
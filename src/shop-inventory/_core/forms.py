@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 from django.utils.translation import gettext_lazy as _
+from inventory.models import Location
 
 
 class CustomLoginForm(AuthenticationForm):
@@ -32,3 +33,29 @@ class CustomLoginForm(AuthenticationForm):
         ),
         "inactive": _("This account is inactive."),
     }
+
+
+class ExportForm(forms.Form):
+    """Optional filters for the CSV exports; dates are inclusive."""
+
+    since = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    until = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    location = forms.ModelChoiceField(
+        queryset=Location.objects.order_by("name"),
+        required=False,
+        empty_label="All locations",
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        since, until = cleaned_data.get("since"), cleaned_data.get("until")
+        if since and until and since > until:
+            raise forms.ValidationError("The start date is after the end date")
+        return cleaned_data
@@ -0,0 +1,53 @@
+"""
+Memoized group membership for permission checks and templates.
+
+A user's group names are loaded with one query and kept in two places: on the
+user object for the rest of the request, and in the shared "sessions" cache
+for every later request from any of that user's sessions. The cached entry is
+keyed by user id, so signals can drop it the moment membership changes,
+which an entry stored inside each session could not offer.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# A fallback expiry; membership changes invalidate the entry straight away
+CACHE_SECONDS = 60 * 60
+_ATTRIBUTE = "_group_names"
+
+
+def _cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def _key(user_id):
+    return f"group_names:{user_id}"
+
+
+def group_names(user):
+    """The names of the groups `user` belongs to, as a frozenset."""
+    if not user.is_authenticated:
+        return frozenset()
+    names = getattr(user, _ATTRIBUTE, None)
+    if names is None:
+        cached = _cache().get(_key(user.pk))
+        if cached is None:
+            cached = list(user.groups.values_list("name", flat=True))
+            _cache().set(_key(user.pk), cached, CACHE_SECONDS)
+        names = frozenset(cached)
+        setattr(user, _ATTRIBUTE, names)
+    return names
+
+
+def in_groups(user, *names):
+    """True if `user` belongs to at least one of the named groups."""
+    return not group_names(user).isdisjoint(names)
+
+
+def invalidate(user_ids):
+    """Forget the cached group names of the given users."""
+    keys = [_key(user_id) for user_id in user_ids]
+    _cache().delete_many(keys)
+    # Another request may cache the old names before the change commits
+    transaction.on_commit(lambda: _cache().delete_many(keys))
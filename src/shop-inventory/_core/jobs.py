@@ -0,0 +1,129 @@
+"""
+Small local job queue for work too slow to run inside a request.
+
+Views call `enqueue()` to add a row to the Job table and return immediately;
+the `run_jobs` management command, started next to gunicorn, claims queued
+jobs one at a time and runs the matching task from TASKS. Tasks receive the
+Job and a `progress(done, total=None, message=None)` callback, and may return
+`(filename, content)` to leave a file in JOBS_DIR for download.
+"""
+
+from datetime import timedelta
+import logging
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> dotted path of the task function
+TASKS = {
+    "qrcode_sheet": "inventory.jobs.qrcode_sheet",
+    "backup_db": "_core.jobs.backup_db",
+}
+
+
+def enqueue(kind, user=None, **params):
+    """Queue a job of `kind`, or return the caller's unfinished one of that kind."""
+    if kind not in TASKS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    existing = Job.objects.filter(
+        kind=kind, created_by=user, status__in=[Job.QUEUED, Job.RUNNING]
+    ).first()
+    if existing:
+        return existing
+    return Job.objects.create(kind=kind, created_by=user, params=params)
+
+
+def claim_next():
+    """Mark the oldest queued job as running and return it, or None."""
+    while True:
+        job = Job.objects.filter(status=Job.QUEUED).order_by("created_at").first()
+        if job is None:
+            return None
+        # Conditional update, so two workers can never claim the same job
+        claimed = Job.objects.filter(id=job.id, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def result_path(job):
+    return os.path.join(settings.JOBS_DIR, job.result_file)
+
+
+def run(job):
+    """Run a claimed job to completion, recording the outcome on its row."""
+
+    def progress(done, total=None, message=None):
+        fields = {"progress": done}
+        if total is not None:
+            fields["total"] = total
+        if message is not None:
+            fields["message"] = message[:255]
+        Job.objects.filter(id=job.id).update(**fields)
+
+    logger.info(f"Running job {job}")
+    try:
+        task = import_string(TASKS[job.kind])
+        result = task(job, progress)
+        if result is not None:
+            filename, content = result
+            job.result_file = f"{job.id}-{filename}"
+            os.makedirs(settings.JOBS_DIR, exist_ok=True)
+            with open(result_path(job), "wb") as f:
+                f.write(content)
+        status, message = Job.SUCCEEDED, None
+    except Exception as e:
+        logger.exception(f"Job {job} failed")
+        status, message = Job.FAILED, str(e)[:255] or e.__class__.__name__
+
+    fields = {
+        "status": status,
+        "result_file": job.result_file,
+        "finished_at": timezone.now(),
+    }
+    if message is not None:
+        fields["message"] = message
+    Job.objects.filter(id=job.id).update(**fields)
+    job.refresh_from_db()
+    return job
+
+
+def fail_interrupted():
+    """Fail jobs left running by a worker that stopped part way through."""
+    return Job.objects.filter(status=Job.RUNNING).update(
+        status=Job.FAILED,
+        message="Interrupted by a worker restart",
+        finished_at=timezone.now(),
+    )
+
+
+def prune(max_age):
+    """Delete finished jobs older than `max_age` seconds, with their files."""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    old_jobs = Job.objects.filter(
+        status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=cutoff
+    )
+    with transaction.atomic():
+        for job in old_jobs.exclude(result_file=""):
+            try:
+                os.remove(result_path(job))
+            except FileNotFoundError:
+                pass
+        deleted, _ = old_jobs.delete()
+    return deleted
+
+
+def backup_db(job, progress):
+    """Run the backup_db command, reporting each backup drive as it is done."""
+    from django.core.management import call_command
+
+    call_command("backup_db", progress=progress)
@@ -0,0 +1,317 @@
+"""
+Load generator that simulates a busy pantry shift against a running server.
+
+Each virtual user is an asyncio task with its own keep-alive HTTP/1.1
+connection and cookie jar (standard library only, so it runs on the Pi
+itself). Employees log in, scan barcodes at checkout:index and commit an
+order via checkout:process_order every few scans; managers adjust stock via
+inventory:stock_update. Redirects are followed as a browser would, so each
+action's latency is what the person at the till waits for, and a "database
+is locked" error reported through the messages framework is seen and counted.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+import random
+import re
+import statistics
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin, urlsplit
+
+USER_PREFIX = "loadtest"
+BARCODE_PREFIX = "49"
+LOCKED = b"database is locked"
+_CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class LoadTestError(Exception):
+    pass
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    body: bytes
+
+
+class Client:
+    """A minimal keep-alive HTTP/1.1 client with a cookie jar."""
+
+    def __init__(self, base_url, unix_socket=None, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.unix_socket = unix_socket
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def _connect(self):
+        if self.unix_socket:
+            self.reader, self.writer = await asyncio.open_unix_connection(
+                self.unix_socket
+            )
+        else:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+    async def request(self, method, path, data=None, headers=None):
+        """Send one request, retrying once if the kept-alive connection dropped."""
+        for attempt in range(2):
+            if self.writer is None:
+                await self._connect()
+            try:
+                return await asyncio.wait_for(
+                    self._exchange(method, path, data, headers or {}), self.timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _exchange(self, method, path, data, headers):
+        body = urlencode(data).encode() if data is not None else b""
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}",
+            "Connection: keep-alive",
+            f"Content-Length: {len(body)}",
+        ]
+        if data is not None:
+            lines.append("Content-Type: application/x-www-form-urlencoded")
+        if self.cookies:
+            cookie = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+            lines.append(f"Cookie: {cookie}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                for morsel in SimpleCookie(value).values():
+                    self.cookies[morsel.key] = morsel.value
+            response_headers[name] = value
+
+        if response_headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            response_body = b"".join(chunks)
+        elif "content-length" in response_headers:
+            response_body = await self.reader.readexactly(
+                int(response_headers["content-length"])
+            )
+        else:
+            response_body = await self.reader.read()
+            await self.close()
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return Response(status, response_headers, response_body)
+
+    async def fetch(self, method, path, data=None):
+        """Send a request and follow redirects with GETs, as a browser would."""
+        headers = {}
+        if method == "POST" and "csrftoken" in self.cookies:
+            headers["X-CSRFToken"] = self.cookies["csrftoken"]
+            headers["Referer"] = urljoin(self.base_url, path)
+        response = await self.request(method, path, data, headers)
+        for _ in range(5):
+            if response.status not in (301, 302, 303, 307):
+                break
+            location = urlsplit(urljoin(path, response.headers["location"]))
+            path = location.path + (f"?{location.query}" if location.query else "")
+            response = await self.request("GET", path)
+        return response
+
+    async def login(self, path, username, password):
+        page = await self.request("GET", path)
+        token = _CSRF_INPUT.search(page.body)
+        data = {"username": username, "password": password}
+        if token:
+            data["csrfmiddlewaretoken"] = token.group(1).decode()
+        await self.fetch("POST", path, data)
+        if "sessionid" not in self.cookies:
+            raise LoadTestError(f"Could not log in as {username}")
+
+
+@dataclass
+class Results:
+    timings: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    locked: dict = field(default_factory=dict)
+
+    def add(self, action, seconds, response):
+        self.timings.setdefault(action, []).append(seconds * 1000)
+        if response.status >= 400:
+            self.errors[action] = self.errors.get(action, 0) + 1
+        if LOCKED in response.body:
+            self.locked[action] = self.locked.get(action, 0) + 1
+
+    def fail(self, action):
+        self.errors[action] = self.errors.get(action, 0) + 1
+        self.timings.setdefault(action, [])
+
+    def rows(self, seconds):
+        """(action, count, rps, p50, p95, p99, errors, locked) per action."""
+        rows = []
+        for action in sorted(self.timings):
+            values = self.timings[action]
+            if len(values) >= 2:
+                cuts = statistics.quantiles(values, n=100, method="inclusive")
+                p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+            else:
+                p50 = p95 = p99 = values[0] if values else 0.0
+            rows.append(
+                (
+                    action,
+                    len(values),
+                    len(values) / seconds,
+                    p50,
+                    p95,
+                    p99,
+                    self.errors.get(action, 0),
+                    self.locked.get(action, 0),
+                )
+            )
+        return rows
+
+
+@dataclass
+class Shift:
+    """What the virtual users do, and the stock they do it to."""
+
+    barcodes: list
+    inventory_ids: list
+    # Paths for "login", "scan", "process_order" and "stock_update"
+    urls: dict
+    scans_per_order: int = 5
+    think_seconds: float = 1.0
+
+
+async def _timed(results, action, call):
+    start = time.perf_counter()
+    try:
+        response = await call
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        results.fail(action)
+        return None
+    results.add(action, time.perf_counter() - start, response)
+    return response
+
+
+async def _think(rng, shift):
+    if shift.think_seconds:
+        await asyncio.sleep(rng.expovariate(1 / shift.think_seconds))
+
+
+async def employee(client, shift, results, rng, deadline):
+    """Scan a few items, then commit the order, until the shift ends."""
+    while time.monotonic() < deadline:
+        for _ in range(rng.randint(1, shift.scans_per_order * 2 - 1)):
+            barcode = rng.choice(shift.barcodes)
+            await _timed(
+                results,
+                "scan",
+                client.fetch("POST", shift.urls["scan"], {"barcode": barcode}),
+            )
+            await _think(rng, shift)
+            if time.monotonic() >= deadline:
+                return
+        await _timed(
+            results,
+            "process_order",
+            client.fetch(
+                "POST",
+                shift.urls["process_order"],
+                {"implicit_id": f"shopper{rng.randrange(10000)}@rowan.edu"},
+            ),
+        )
+        await _think(rng, shift)
+
+
+async def manager(client, shift, results, rng, deadline):
+    """Correct stock counts, mostly upwards, until the shift ends."""
+    while time.monotonic() < deadline:
+        await _timed(
+            results,
+            "stock_update",
+            client.fetch(
+                "POST",
+                shift.urls["stock_update"],
+                {
+                    "item_id": rng.choice(shift.inventory_ids),
+                    "delta_qty": rng.choice((5, 10, 20, -1)),
+                },
+            ),
+        )
+        await _think(rng, shift)
+
+
+async def run_shift(
+    base_url,
+    shift,
+    employees,
+    managers,
+    seconds,
+    password,
+    seed=0,
+    unix_socket=None,
+):
+    """
+    Run the shift, logging each user in with `password`, and return
+    (Results, wall-clock seconds).
+    """
+    results = Results()
+    users = [("employee", i) for i in range(employees)]
+    users += [("manager", i) for i in range(managers)]
+    clients = [Client(base_url, unix_socket) for _ in users]
+    try:
+        for client, (role, index) in zip(clients, users):
+            await client.login(
+                shift.urls["login"], f"{USER_PREFIX}-{role}-{index}", password
+            )
+
+        start = time.monotonic()
+        deadline = start + seconds
+        behaviours = {"employee": employee, "manager": manager}
+        await asyncio.gather(
+            *(
+                behaviours[role](
+                    client,
+                    shift,
+                    results,
+                    random.Random(f"{seed}-{role}-{index}"),
+                    deadline,
+                )
+                for client, (role, index) in zip(clients, users)
+            )
+        )
+        return results, time.monotonic() - start
+    finally:
+        for client in clients:
+            await client.close()
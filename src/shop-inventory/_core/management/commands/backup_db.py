@@ -1,89 +1,441 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+import argparse
 import os
 import pyzipper
 import glob
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import shutil
+import hashlib
+import sqlite3
+import tempfile
+import time
 import logging
 
+from _core.backup_store import (
+    SNAPSHOT_NAME_FORMAT,
+    STORE_DIRNAME,
+    ChunkStore,
+    EncodedChunks,
+)
+
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Online backup step size and pause; the pause releases the read lock so
+# checkout writers are not starved while a large database is copied.
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.05
+BACKUP_MAX_RESTARTS = 3
+COPY_BLOCK_SIZE = 1024 * 1024
+
+BACKUP_MARKER = ".shopbackup"
+# Folders that never hold the marker but can be huge on a shared USB drive
+SKIP_DIRS = {
+    STORE_DIRNAME,
+    "$RECYCLE.BIN",
+    ".git",
+    ".Spotlight-V100",
+    ".fseventsd",
+    "DCIM",
+    "lost+found",
+    "node_modules",
+    "System Volume Information",
+}
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_count(value):
+    """argparse type for --keep: 0 or less would delete every backup."""
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError("must keep at least 1 backup")
+    return count
+
+
+def snapshot_database(
+    db_path, snapshot_path, step_pages=BACKUP_STEP_PAGES, step_sleep=BACKUP_STEP_SLEEP
+):
+    """
+    Copy a live SQLite database to `snapshot_path` with the online backup API.
+
+    Pages are copied `step_pages` at a time with a `step_sleep` pause between
+    steps, straight to disk, so memory use does not grow with the database.
+    The copy is consistent even while other connections write (WAL contents
+    included), and is checked with PRAGMA integrity_check. Returns its size.
+    """
+    source = sqlite3.connect(db_path)
+    snapshot = sqlite3.connect(snapshot_path)
+    try:
+        restarts = 0
+        last_remaining = None
+
+        def pause(status, remaining, total):
+            # A write from another connection restarts the copy from the
+            # first page; under constant writes finish in a single step.
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > BACKUP_MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            last_remaining = remaining
+            if remaining:
+                time.sleep(step_sleep)
+
+        try:
+            source.backup(snapshot, pages=step_pages, progress=pause, sleep=step_sleep)
+        except _TooManyRestarts:
+            logger.warning("Database kept changing; finishing backup in one step")
+            source.backup(snapshot, sleep=step_sleep)
+
+        result = snapshot.execute("PRAGMA integrity_check").fetchall()
+        if result != [("ok",)]:
+            problems = "; ".join(row[0] for row in result[:5])
+            raise CommandError(f"Backup snapshot failed integrity check: {problems}")
+    finally:
+        snapshot.close()
+        source.close()
+    return os.path.getsize(snapshot_path)
+
+
+def build_archive(snapshot_path, password, path):
+    """Write the snapshot file into an encrypted zip at `path`; return its SHA-256."""
+    # Use AESZipFile instead of ZipFile for better encryption
+    with pyzipper.AESZipFile(
+        path,
+        "w",
+        compression=pyzipper.ZIP_LZMA,
+        encryption=pyzipper.WZ_AES,
+    ) as zf:
+        zf.setpassword(password.encode())
+        zf.write(snapshot_path, "db.sqlite3")
+    return file_sha256(path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(COPY_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def copy_verified(source, dest, sha256):
+    """
+    Copy `source` to `dest`, fsync it and check it reads back as `sha256`.
+
+    The copy is written beside the final name and only renamed into place
+    once verified, so a failed copy never leaves a truncated backup.
+    """
+    partial_path = f"{dest}.partial"
+    try:
+        with open(source, "rb") as src, open(partial_path, "wb") as dst:
+            while block := src.read(COPY_BLOCK_SIZE):
+                dst.write(block)
+            dst.flush()
+            os.fsync(dst.fileno())
+            # Drop the cached pages so verification reads from the drive
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(dst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        if file_sha256(partial_path) != sha256:
+            raise OSError(f"Checksum mismatch writing {dest}")
+        os.replace(partial_path, dest)
+        dir_fd = os.open(os.path.dirname(dest), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return os.path.getsize(dest)
+
 
 class Command(BaseCommand):
     help = "Create encrypted backup of the database on mounted backup drives"
+    # Set by the background job runner to report per-drive progress
+    stealth_options = ("progress",)
+
+    def fail(self, message):
+        """Log a reason for not backing up; a background job also fails."""
+        logger.error(message)
+        if self.progress:
+            raise CommandError(message)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--step-pages",
+            type=int,
+            default=BACKUP_STEP_PAGES,
+            help="Database pages copied per online backup step",
+        )
+        parser.add_argument(
+            "--step-sleep",
+            type=float,
+            default=BACKUP_STEP_SLEEP,
+            help="Seconds to pause between backup steps so writers can run",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=["archive", "chunks"],
+            default=os.environ.get("DJANGO_BACKUP_MODE", "archive"),
+            help=(
+                "archive: one full encrypted zip per run; chunks: incremental, "
+                "deduplicated snapshots (restore with restore_db)"
+            ),
+        )
+        parser.add_argument(
+            "--keep",
+            type=backup_count,
+            # A string default goes through `type` too, so a bad
+            # DJANGO_BACKUP_KEEP is rejected as well
+            default=os.environ.get("DJANGO_BACKUP_KEEP", "100"),
+            help="Backups to keep on each drive",
+        )
+        parser.add_argument(
+            "--max-depth",
+            type=int,
+            default=int(os.environ.get("DJANGO_BACKUP_SEARCH_DEPTH", "2")),
+            help="Directory levels below BACKUP_MOUNT_DIR searched for drives",
+        )
+        parser.add_argument(
+            "--discovery-timeout",
+            type=float,
+            default=float(os.environ.get("DJANGO_BACKUP_SEARCH_TIMEOUT", "10")),
+            help="Seconds to spend looking for backup drives",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the drives that would be used and how long finding them took",
+        )
+
+    def find_backup_drives(self, max_depth=2, timeout=10.0):
+        """
+        Find mounted drives with a .shopbackup file, breadth first.
 
-    def find_backup_drives(self):
-        """Find all mounted drives with a .shopbackup file"""
+        Only `max_depth` levels below BACKUP_MOUNT_DIR are checked and the
+        search gives up after `timeout` seconds. Symlinks, known heavy folders
+        and filesystems mounted inside a drive are skipped, and the search
+        stops descending once a directory holding the marker is found.
+        """
         # Get backup mount directory from environment
         backup_mount_dir = os.environ.get("BACKUP_MOUNT_DIR", "/tmp/pantry-backup-mounts")
-        mount_points = [backup_mount_dir]
         backup_drives = []
+        if not os.path.isdir(backup_mount_dir):
+            return backup_drives
 
-        for mount_point in mount_points:
-            if os.path.exists(mount_point):
-                # Walk through all subdirectories
-                for root, dirs, files in os.walk(mount_point):
-                    logger.info(f"Checking {root} for .shopbackup ...")
-                    if ".shopbackup" in files:
-                        logger.info(f"{root}/.shopbackup found.")
-                        backup_drives.append(root)
+        root_dev = os.stat(backup_mount_dir).st_dev
+        # (path, depth, device, inside a drive's filesystem)
+        queue = deque([(backup_mount_dir, 0, root_dev, False)])
+        deadline = time.monotonic() + timeout
+        while queue:
+            if time.monotonic() > deadline:
+                logger.warning(
+                    f"Backup drive discovery timed out after {timeout:.1f}s with "
+                    f"{len(queue)} director(ies) under {backup_mount_dir} unchecked"
+                )
+                break
+            path, depth, dev, on_drive = queue.popleft()
+            logger.debug(f"Checking {path} for {BACKUP_MARKER} ...")
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError as e:
+                logger.debug(f"Skipping {path}: {e}")
+                continue
+
+            if any(e.name == BACKUP_MARKER and e.is_file() for e in entries):
+                logger.info(f"{path}/{BACKUP_MARKER} found.")
+                backup_drives.append(path)
+                continue
+            if depth >= max_depth:
+                continue
+
+            for entry in entries:
+                if entry.name in SKIP_DIRS or entry.name.startswith(".Trash"):
+                    continue
+                try:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    entry_dev = entry.stat(follow_symlinks=False).st_dev
+                except OSError:
+                    continue
+                if on_drive and entry_dev != dev:
+                    # Another filesystem mounted inside a drive
+                    continue
+                queue.append(
+                    (
+                        entry.path,
+                        depth + 1,
+                        entry_dev,
+                        on_drive or entry_dev != root_dev,
+                    )
+                )
+
+        return sorted(backup_drives)
+
+    def write_archive(self, drive, archive_path, sha256, zip_filename, keep):
+        """Copy the prebuilt archive to a drive and drop old ones; returns bytes."""
+        zip_path = os.path.join(drive, zip_filename)
+        size = copy_verified(archive_path, zip_path, sha256)
+        logger.info(f"Backup created at: {zip_path}")
+
+        # Keep only the most recent backups
+        existing_backups = sorted(glob.glob(os.path.join(drive, "shop_backup_*.zip")))
+        if len(existing_backups) > keep:
+            for old_backup in existing_backups[:-keep]:
+                os.remove(old_backup)
+                logger.info(f"Removed old backup: {old_backup}")
+        return size
 
-        return backup_drives
+    def write_chunks(self, drive, snapshot_path, password, keep, name, encoded):
+        """Add the snapshot file to the drive's chunk store; returns bytes written."""
+        store = ChunkStore(os.path.join(drive, STORE_DIRNAME), password)
+        with open(snapshot_path, "rb") as snapshot:
+            name, written, written_bytes = store.write_snapshot(snapshot, name, encoded)
+        logger.info(
+            f"Incremental backup {name} created on {drive}: {written} new chunk(s), "
+            f"{written_bytes} bytes"
+        )
+        removed_snapshots, removed_chunks = store.prune(keep)
+        if removed_snapshots:
+            logger.info(
+                f"Removed {removed_snapshots} old snapshot(s) and "
+                f"{removed_chunks} unreferenced chunk(s) from {drive}"
+            )
+        return written_bytes
+
+    def fan_out(self, drives, write):
+        """
+        Run `write(drive)` for every drive in parallel threads.
+
+        Reports each drive's throughput as it finishes and returns the drives
+        that failed; one bad drive does not stop the others.
+        """
+
+        def timed(drive):
+            start = time.perf_counter()
+            size = write(drive)
+            return size, time.perf_counter() - start
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=len(drives)) as pool:
+            futures = {pool.submit(timed, drive): drive for drive in drives}
+            for done, future in enumerate(as_completed(futures), start=1):
+                drive = futures[future]
+                try:
+                    size, seconds = future.result()
+                except Exception:
+                    logger.exception(f"Backup to {drive} failed")
+                    failed.append(drive)
+                    self.stdout.write(f"{drive}: FAILED")
+                else:
+                    rate = size / seconds / 1e6 if seconds else 0
+                    self.stdout.write(
+                        f"{drive}: {size / 1e6:.2f} MB in {seconds:.2f}s "
+                        f"({rate:.2f} MB/s)"
+                    )
+                if self.progress:
+                    self.progress(done, len(drives), f"Finished {drive}")
+        return failed
 
     def handle(self, *args, **options):
         """Create a password-protected zip backup of the database"""
         from django.conf import settings
 
+        self.progress = options.get("progress")
         db_path = settings.DATABASES["default"]["NAME"]
         backup_password = os.environ.get("DJANGO_BACKUP_PASSWORD")
 
-        if not backup_password:
-            logger.error("DJANGO_BACKUP_PASSWORD environment variable not set")
-            return
-
         # Create timestamp for backup file
         timestamp = datetime.now().strftime("%Y-%m-%d")
         zip_filename = f"shop_backup_{timestamp}.zip"
 
         # Find drives to backup to
-        backup_drives = self.find_backup_drives()
+        start = time.perf_counter()
+        backup_drives = self.find_backup_drives(
+            options["max_depth"], options["discovery_timeout"]
+        )
+        discovery_time = time.perf_counter() - start
+        logger.info(
+            f"Found {len(backup_drives)} backup drive(s) in {discovery_time:.3f}s"
+        )
 
-        if not backup_drives:
-            logger.error("No backup drives found with .shopbackup file")
+        if options["dry_run"]:
+            for drive in backup_drives:
+                self.stdout.write(drive)
+            self.stdout.write(
+                f"Found {len(backup_drives)} backup drive(s) in {discovery_time:.3f}s"
+            )
             return
 
-        # Create a temporary copy of the database
-        temp_db = f"/tmp/db_backup_{timestamp}.sqlite3"
-        shutil.copy2(db_path, temp_db)
+        if not backup_password:
+            return self.fail("DJANGO_BACKUP_PASSWORD environment variable not set")
 
-        try:
-            # Create encrypted zip file with AES encryption
-            for drive in backup_drives:
-                zip_path = os.path.join(drive, zip_filename)
-
-                # Use AESZipFile instead of ZipFile for better encryption
-                with pyzipper.AESZipFile(
-                    zip_path,
-                    "w",
-                    compression=pyzipper.ZIP_LZMA,
-                    encryption=pyzipper.WZ_AES,
-                ) as zf:
-                    zf.setpassword(backup_password.encode())
-                    zf.write(temp_db, arcname="db.sqlite3")
-
-                logger.info(f"Backup created at: {zip_path}")
-
-                # Keep only the 5 most recent backups
-                existing_backups = sorted(
-                    glob.glob(os.path.join(drive, "shop_backup_*.zip"))
+        if not backup_drives:
+            return self.fail("No backup drives found with .shopbackup file")
+
+        # Take a consistent snapshot of the live database without copying
+        # the file underneath gunicorn's writers. It goes to a temporary file
+        # beside the database rather than into memory, and the archive or
+        # chunks are streamed from there.
+        if self.progress:
+            self.progress(0, len(backup_drives), "Snapshotting database")
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(db_path)) as tmp:
+            snapshot_path = os.path.join(tmp, "db.sqlite3")
+            try:
+                size = snapshot_database(
+                    db_path, snapshot_path, options["step_pages"], options["step_sleep"]
                 )
-                if len(existing_backups) > 100:
-                    for old_backup in existing_backups[:-100]:
-                        os.remove(old_backup)
-                        logger.info(f"Removed old backup: {old_backup}")
+            except CommandError as e:
+                return self.fail(str(e))
+            logger.info(
+                f"Snapshot of {size} bytes taken in {time.perf_counter() - start:.2f}s"
+            )
 
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_db):
-                os.remove(temp_db)
+            # Encrypt once, then write to every drive at the same time
+            if options["mode"] == "chunks":
+                name = datetime.now().strftime(SNAPSHOT_NAME_FORMAT)
+                encoded = EncodedChunks(len(backup_drives))
+                failed = self.fan_out(
+                    backup_drives,
+                    lambda drive: self.write_chunks(
+                        drive,
+                        snapshot_path,
+                        backup_password,
+                        options["keep"],
+                        name,
+                        encoded,
+                    ),
+                )
+            else:
+                archive_path = os.path.join(tmp, zip_filename)
+                sha256 = build_archive(snapshot_path, backup_password, archive_path)
+                logger.info(
+                    f"Archive of {os.path.getsize(archive_path)} bytes built in "
+                    f"{time.perf_counter() - start:.2f}s"
+                )
+                failed = self.fan_out(
+                    backup_drives,
+                    lambda drive: self.write_archive(
+                        drive, archive_path, sha256, zip_filename, options["keep"]
+                    ),
+                )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Backed up to {len(backup_drives) - len(failed)} of "
+            f"{len(backup_drives)} drive(s) in {elapsed:.2f}s"
+        )
+        if failed:
+            return self.fail(f"Backup failed on: {', '.join(failed)}")
+        if self.progress:
+            self.progress(
+                len(backup_drives),
+                message=f"Backed up to {len(backup_drives)} drive(s)",
+            )
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+import os
+import statistics
+import tempfile
+import time
+
+BARCODE = "012345678905"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark per-request latency of the checkout scan endpoint with and "
+        "without persistent database connections (runs on a throwaway database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=600,
+            help="CONN_MAX_AGE used for the persistent run",
+        )
+
+    def seed(self):
+        from inventory.models import Product, Location, Inventory
+
+        shopfloor, _ = Location.objects.get_or_create(name="Shopfloor")
+        product = Product.objects.create(
+            name="Bench Item", manufacturer="Bench", barcode=BARCODE
+        )
+        Inventory.objects.create(
+            product=product, location=shopfloor, quantity=10_000_000
+        )
+
+    def measure(self, max_age, count):
+        """Time `count` scans with the given CONN_MAX_AGE, in milliseconds."""
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        client = Client()
+        url = reverse("checkout:index")
+        # Warm up URL resolving, templates and the barcode index
+        client.post(url, {"barcode": BARCODE})
+
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            # The test client skips the request_started/request_finished
+            # connection handling the WSGI handler does, so do it here
+            close_old_connections()
+            client.post(url, {"barcode": BARCODE})
+            close_old_connections()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        original_max_age = connection.settings_dict["CONN_MAX_AGE"]
+
+        # A file-backed test database, since Django never closes in-memory ones
+        with tempfile.TemporaryDirectory() as tmp:
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                tmp, "bench.sqlite3"
+            )
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0)
+            try:
+                self.seed()
+                results = [
+                    ("per-request", self.measure(0, count)),
+                    ("persistent", self.measure(options["max_age"], count)),
+                ]
+            finally:
+                connection.settings_dict["CONN_MAX_AGE"] = original_max_age
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.stdout.write(f"{count} barcode scans against checkout:index")
+        self.stdout.write(
+            f"{'connections':<14}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        )
+        for name, timings in results:
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            self.stdout.write(
+                f"{name:<14}{statistics.mean(timings):>10.2f}"
+                f"{statistics.median(timings):>10.2f}{p95:>10.2f}"
+            )
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from importlib import import_module
+import os
+import statistics
+import tempfile
+import time
+
+from _core import cache_config, session_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark session read and write latency for each session engine and "
+        "cache backend (runs on a throwaway database and cache directory)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=500)
+        parser.add_argument(
+            "--memcached",
+            help="Also measure a memcached server at this address (host:port)",
+        )
+        parser.add_argument(
+            "--redis",
+            help="Also measure a redis server at this URL (redis://host:port)",
+        )
+
+    def profiles(self, tmp, options):
+        """(label, engine, session cache kind, location) for each run."""
+        caches = [("file", os.path.join(tmp, "sessions")), ("locmem", "bench")]
+        if options["memcached"]:
+            caches.append(("memcached", options["memcached"]))
+        if options["redis"]:
+            caches.append(("redis", options["redis"]))
+        yield "db", "db", "locmem", "bench"
+        for engine in ("cached_db", "cache"):
+            for kind, location in caches:
+                yield f"{engine}+{kind}", engine, kind, location
+
+    def measure(self, engine, count):
+        """Time `count` creates, loads and updates, in milliseconds."""
+        store_class = import_module(session_engine(engine)).SessionStore
+        writes, reads, updates = [], [], []
+        keys = []
+        for i in range(count):
+            start = time.perf_counter()
+            session = store_class()
+            session["_auth_user_id"] = str(i)
+            session["cart_id"] = f"{i:032x}"
+            session.save()
+            writes.append((time.perf_counter() - start) * 1000)
+            keys.append(session.session_key)
+
+        for key in keys:
+            start = time.perf_counter()
+            store_class(key).get("_auth_user_id")
+            reads.append((time.perf_counter() - start) * 1000)
+
+        for key in keys:
+            # One step of a multi-step form writing its progress
+            start = time.perf_counter()
+            session = store_class(key)
+            session["step"] = 2
+            session.save()
+            updates.append((time.perf_counter() - start) * 1000)
+
+        for key in keys:
+            store_class(key).delete()
+        return reads, writes, updates
+
+    def handle(self, *args, **options):
+        count = options["sessions"]
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            # A file-backed test database, so writes pay for real commits
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                tmp, "bench.sqlite3"
+            )
+            setup_test_environment()
+            old_name = connection.creation.create_test_db(verbosity=0)
+            try:
+                for label, engine, kind, location in self.profiles(tmp, options):
+                    caches = {
+                        **settings.CACHES,
+                        "sessions": cache_config(kind, location, settings.BASE_DIR),
+                    }
+                    with override_settings(CACHES=caches):
+                        results.append((label, self.measure(engine, count)))
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        self.stdout.write(f"{count} sessions per backend, latency in ms")
+        self.stdout.write(
+            f"{'backend':<20}{'read p50':>10}{'read p95':>10}"
+            f"{'write p50':>11}{'write p95':>11}{'update p50':>12}{'update p95':>12}"
+        )
+        for label, timings in results:
+            row = f"{label:<20}"
+            for width, values in zip((10, 11, 12), timings):
+                p95 = statistics.quantiles(values, n=20)[-1]
+                row += f"{statistics.median(values):>{width}.3f}{p95:>{width}.3f}"
+            self.stdout.write(row)
@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from multiprocessing import Pool
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from _core.db import apply_sqlite_pragmas
+
+ROWS = 2000
+
+
+def _prepare_database(path):
+    """Create a small inventory-like table to hammer from several processes."""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE stock (id INTEGER PRIMARY KEY, name TEXT, quantity INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO stock (id, name, quantity) VALUES (?, ?, ?)",
+        ((i, f"Item {i}", 1000) for i in range(ROWS)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _worker(args):
+    """Mix reads and short write transactions, like scans and order commits."""
+    path, pragmas, seconds, write_ratio, seed = args
+    rng = random.Random(seed)
+    # isolation_level=None so BEGIN IMMEDIATE / COMMIT are explicit
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+    apply_sqlite_pragmas(conn.cursor(), pragmas)
+
+    reads = writes = locked = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                conn.execute("BEGIN IMMEDIATE")
+                for _ in range(3):
+                    conn.execute(
+                        "UPDATE stock SET quantity = quantity - 1 WHERE id = ?",
+                        (rng.randrange(ROWS),),
+                    )
+                conn.execute("COMMIT")
+                writes += 1
+            else:
+                start = rng.randrange(ROWS)
+                conn.execute(
+                    "SELECT name, quantity FROM stock WHERE id BETWEEN ? AND ?",
+                    (start, start + 50),
+                ).fetchall()
+                reads += 1
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+    conn.close()
+    return reads, writes, locked
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent SQLite throughput with the default journal "
+        "settings and with the SQLITE_PRAGMAS production profile"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=3)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument(
+            "--write-ratio",
+            type=float,
+            default=0.2,
+            help="Fraction of operations that are write transactions",
+        )
+
+    def run_profile(self, pragmas, workers, seconds, write_ratio):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.sqlite3")
+            _prepare_database(path)
+            jobs = [(path, pragmas, seconds, write_ratio, i) for i in range(workers)]
+            with Pool(workers) as pool:
+                results = pool.map(_worker, jobs)
+        reads, writes, locked = (sum(column) for column in zip(*results))
+        return reads, writes, locked
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        seconds = options["seconds"]
+        profiles = [
+            ("default", {}),
+            ("production", settings.SQLITE_PRAGMAS),
+        ]
+
+        self.stdout.write(
+            f"{workers} workers, {seconds:.1f}s each, "
+            f"{options['write_ratio']:.0%} writes"
+        )
+        self.stdout.write(
+            f"{'profile':<12}{'reads/s':>12}{'writes/s':>12}{'locked':>10}"
+        )
+        for name, pragmas in profiles:
+            reads, writes, locked = self.run_profile(
+                pragmas, workers, seconds, options["write_ratio"]
+            )
+            self.stdout.write(
+                f"{name:<12}{reads / seconds:>12.0f}{writes / seconds:>12.0f}"
+                f"{locked:>10}"
+            )
@@ -0,0 +1,64 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from _core import exports
+from _core.forms import ExportForm
+from inventory.models import Location
+
+
+class Command(BaseCommand):
+    help = (
+        "Write inventory, products or order lines as CSV, reading the "
+        "database a chunk at a time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=exports.KINDS)
+        parser.add_argument(
+            "--since", help="First day of orders to include (YYYY-MM-DD)"
+        )
+        parser.add_argument(
+            "--until", help="Last day of orders to include (YYYY-MM-DD)"
+        )
+        parser.add_argument("--location", help="Location name")
+        parser.add_argument("--output", "-o", help="File to write instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        location = None
+        if options["location"]:
+            location = Location.objects.filter(name=options["location"]).first()
+            if location is None:
+                raise CommandError(f"No location named {options['location']!r}")
+        # Validate the dates the way the export page does
+        form = ExportForm(
+            {
+                "since": options["since"] or "",
+                "until": options["until"] or "",
+                "location": location.pk if location else "",
+            }
+        )
+        if not form.is_valid():
+            raise CommandError(
+                "; ".join(error for errors in form.errors.values() for error in errors)
+            )
+
+        rows = exports.rows(
+            options["kind"], **form.cleaned_data, chunk_size=options["chunk_size"]
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="") as f:
+                count = self.write(f, rows)
+            self.stderr.write(f"Wrote {count} row(s) to {options['output']}")
+        else:
+            self.write(self.stdout, rows)
+
+    def write(self, f, rows):
+        """Write `rows` and return how many followed the header."""
+        writer = csv.writer(f)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count - 1
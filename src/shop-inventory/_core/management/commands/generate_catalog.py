@@ -0,0 +1,267 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import random
+import time
+import uuid
+
+from checkout import barcode_index, rollups, stock
+from checkout.models import Order, OrderItem
+from inventory.models import Inventory, Location, Product, normalize_barcode
+
+# Share of generated products per barcode kind
+BARCODE_MIX = (("upc_a", 70), ("upc_e", 10), ("variable_weight", 5), ("uuid", 15))
+NAMES = (
+    *("Beans", "Rice", "Pasta", "Soup", "Cereal", "Oats", "Tuna", "Peanut Butter"),
+    *("Crackers", "Granola", "Applesauce", "Corn", "Peas", "Lentils", "Salsa"),
+)
+MANUFACTURERS = ("Acme Foods", "Pantry Co", "Harvest", "Goodwell", "Store Brand")
+# Orders are placed during opening hours
+OPEN_HOUR, CLOSE_HOUR = 9, 19
+
+
+def upc_check_digit(digits):
+    """Check digit for the first 11 digits of a UPC-A code."""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(digits))
+    return str((10 - total % 10) % 10)
+
+
+def upc_e_to_upc_a(code):
+    """Expand the first 7 digits of a UPC-E code to the 11 UPC-A digits."""
+    system, d = code[0], code[1:7]
+    if d[5] in "012":
+        body = d[0:2] + d[5] + "0000" + d[2:5]
+    elif d[5] == "3":
+        body = d[0:3] + "00000" + d[3:5]
+    elif d[5] == "4":
+        body = d[0:4] + "00000" + d[4]
+    else:
+        body = d[0:5] + "0000" + d[5]
+    return system + body
+
+
+def upc_a(rng):
+    # Number systems 0, 1 and 6-9 are regular products; 2 is variable weight
+    digits = rng.choice("016789") + f"{rng.randrange(10**10):010d}"
+    return digits + upc_check_digit(digits)
+
+
+def upc_e(rng):
+    digits = rng.choice("01") + f"{rng.randrange(10**6):06d}"
+    return digits + upc_check_digit(upc_e_to_upc_a(digits))
+
+
+def variable_weight(rng):
+    # 2 + five item digits + price or weight (first digit 0 = weight)
+    digits = "2" + f"{rng.randrange(10**5):05d}" + f"{rng.randrange(10**5):05d}"
+    return digits + upc_check_digit(digits)
+
+
+def uuid_code(rng):
+    return uuid.UUID(int=rng.getrandbits(128)).hex
+
+
+GENERATORS = {
+    "upc_a": upc_a,
+    "upc_e": upc_e,
+    "variable_weight": variable_weight,
+    "uuid": uuid_code,
+}
+
+
+def batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic catalog (products with UPC-A, UPC-E, variable "
+        "weight and UUID barcodes), locations, inventory and years of order "
+        "history for benchmarks and load tests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--locations", type=int, default=10)
+        parser.add_argument("--orders", type=int, default=10000)
+        parser.add_argument(
+            "--lines-per-order",
+            type=int,
+            default=4,
+            help="Average number of order lines per order",
+        )
+        parser.add_argument("--years", type=float, default=2.0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed, for repeatable data"
+        )
+
+    def phase(self, name, start, count):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{name:<12}{count:>10} rows in {elapsed:6.2f}s "
+            f"({count / elapsed if elapsed else 0:,.0f}/s)"
+        )
+
+    def create(self, model, objects, batch_size):
+        """bulk_create in batches, one transaction per batch."""
+        for batch in batched(objects, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=batch_size)
+        return objects
+
+    def make_locations(self, rng, count, batch_size):
+        shopfloor, _ = Location.objects.get_or_create(name="Shopfloor")
+        existing = set(Location.objects.values_list("name", flat=True))
+        names = []
+        index = 0
+        while len(names) < count:
+            name = f"Shelf {index}"
+            if name not in existing:
+                names.append(name)
+            index += 1
+        others = self.create(
+            Location, [Location(name=name) for name in names], batch_size
+        )
+        return shopfloor, others
+
+    def make_products(self, rng, count, batch_size):
+        kinds = [kind for kind, _ in BARCODE_MIX]
+        weights = [weight for _, weight in BARCODE_MIX]
+        taken = set(Product.objects.values_list("normalized_barcode", flat=True))
+        # Names are unique per manufacturer
+        names = set(Product.objects.values_list("name", "manufacturer"))
+        number = len(names)
+        products = []
+        while len(products) < count:
+            barcode = GENERATORS[rng.choices(kinds, weights)[0]](rng)
+            normalized = normalize_barcode(barcode)
+            number += 1
+            name = (f"{rng.choice(NAMES)} {number}", rng.choice(MANUFACTURERS))
+            if normalized in taken or name in names:
+                continue
+            taken.add(normalized)
+            names.add(name)
+            products.append(
+                Product(
+                    name=name[0],
+                    manufacturer=name[1],
+                    barcode=barcode,
+                    # bulk_create skips Product.save, which normally sets this
+                    normalized_barcode=normalized,
+                )
+            )
+        return self.create(Product, products, batch_size)
+
+    def make_inventory(self, rng, products, shopfloor, others, batch_size):
+        """Stock most products on the Shopfloor and some in up to two others."""
+        rows = []
+        for product in products:
+            if rng.random() < 0.8:
+                rows.append(
+                    Inventory(
+                        product=product,
+                        location=shopfloor,
+                        quantity=rng.randint(0, 200),
+                    )
+                )
+            for location in rng.sample(others, min(len(others), rng.randint(0, 2))):
+                rows.append(
+                    Inventory(
+                        product=product, location=location, quantity=rng.randint(0, 500)
+                    )
+                )
+        return self.create(Inventory, rows, batch_size)
+
+    def order_times(self, rng, count, years):
+        """`count` sorted order times before today, in opening hours."""
+        now = timezone.now()
+        days = max(1, int(years * 365))
+        times = []
+        for _ in range(count):
+            day = now - timedelta(days=rng.randint(1, days))
+            times.append(
+                day.replace(
+                    hour=rng.randrange(OPEN_HOUR, CLOSE_HOUR),
+                    minute=rng.randrange(60),
+                    second=rng.randrange(60),
+                    microsecond=0,
+                )
+            )
+        times.sort()
+        return times
+
+    def make_orders(self, rng, count, lines_per_order, years, sellable, batch_size):
+        """Create orders and their lines one batch of orders at a time."""
+        taken = set(Order.objects.values_list("order_number", flat=True))
+        lines = 0
+        max_lines = max(1, min(len(sellable), lines_per_order * 2 - 1))
+        for dates in batched(self.order_times(rng, count, years), batch_size):
+            orders = []
+            for date in dates:
+                number = f"{rng.getrandbits(32):08x}"
+                while number in taken:
+                    number = f"{rng.getrandbits(32):08x}"
+                taken.add(number)
+                if rng.random() < 0.5:
+                    implicit_id = f"shopper{rng.randrange(100000)}@students.rowan.edu"
+                else:
+                    implicit_id = f"{rng.randrange(10**12):012d}"
+                orders.append(
+                    Order(order_number=number, implicit_id=implicit_id, date=date)
+                )
+            with transaction.atomic():
+                Order.objects.bulk_create(orders, batch_size=batch_size)
+                items = [
+                    OrderItem(
+                        order_id=order.id,
+                        inventory_item_id=inventory_id,
+                        quantity=rng.randint(1, 3),
+                    )
+                    for order in orders
+                    for inventory_id in rng.sample(sellable, rng.randint(1, max_lines))
+                ]
+                OrderItem.objects.bulk_create(items, batch_size=batch_size)
+            lines += len(items)
+        return lines
+
+    def handle(self, *args, **options):
+        # Mix in the catalog size so a second run does not replay the first's
+        # barcodes; the same seed on the same database repeats exactly
+        rng = random.Random(f"{options['seed']}-{Product.objects.count()}")
+        batch_size = options["batch_size"]
+
+        start = time.perf_counter()
+        shopfloor, others = self.make_locations(rng, options["locations"], batch_size)
+        self.phase("locations", start, len(others))
+
+        start = time.perf_counter()
+        products = self.make_products(rng, options["products"], batch_size)
+        self.phase("products", start, len(products))
+
+        start = time.perf_counter()
+        inventory = self.make_inventory(rng, products, shopfloor, others, batch_size)
+        self.phase("inventory", start, len(inventory))
+
+        sellable = [row.id for row in inventory if row.location_id == shopfloor.id]
+        if options["orders"] and sellable:
+            start = time.perf_counter()
+            lines = self.make_orders(
+                rng,
+                options["orders"],
+                options["lines_per_order"],
+                options["years"],
+                sellable,
+                batch_size,
+            )
+            self.phase("order lines", start, lines)
+            # The orders skipped commit_cart, so fold them in from scratch
+            start = time.perf_counter()
+            self.phase("rollups", start, sum(rollups.rebuild(batch_size)))
+
+        # bulk_create sends no signals; other workers' indexes expire on their own
+        start = time.perf_counter()
+        self.phase("sellable", start, stock.rebuild(batch_size))
+        barcode_index.invalidate()
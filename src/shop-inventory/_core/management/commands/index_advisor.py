@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from _core import query_plans
+from checkout.models import SellableStock
+from inventory.models import Inventory
+
+# Pages the workload reads, as (url name, query string)
+PAGES = (
+    ("checkout:index", ""),
+    ("checkout:recent_orders", ""),
+    ("checkout:reports", "?days=365"),
+    ("inventory:index", ""),
+    ("inventory:manage_inventory", ""),
+    ("inventory:endpoint_stats", ""),
+    ("inventory:add_product", ""),
+    ("inventory:remove_product", ""),
+    ("inventory:reactivate_product", ""),
+    ("inventory:edit_product", ""),
+    ("inventory:add_location", ""),
+    ("inventory:add_item_to_location", ""),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Capture the SQL of a representative workload, EXPLAIN QUERY PLAN "
+        "each statement and propose indexes for table scans and temp B-trees"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sql-file",
+            help="Analyse the statements in this file (one per line) instead "
+            "of running the built-in workload",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Ignore scans of tables smaller than this",
+        )
+        parser.add_argument("--rounds", type=int, default=3)
+
+    def workload(self, rounds):
+        """
+        Drive the checkout and inventory pages as a manager would and return
+        every statement run. Everything happens in one transaction that is
+        rolled back, so the database is left as it was.
+        """
+        stock = SellableStock.objects.order_by("pk").first()
+        inventory = Inventory.objects.order_by("pk").first()
+        hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=hosts):
+            with CaptureQueriesContext(connection) as captured:
+                with transaction.atomic():
+                    user = get_user_model().objects.create_superuser(
+                        "index-advisor", password=None
+                    )
+                    client = Client()
+                    client.force_login(user)
+                    for _ in range(rounds):
+                        for name, query in PAGES:
+                            client.get(reverse(name) + query)
+                        if stock is not None:
+                            word = stock.name.split()[0]
+                            client.get(reverse("checkout:index"), {"filter": word})
+                            client.get(reverse("checkout:search"), {"q": word})
+                            client.get(reverse("inventory:index"), {"search": word})
+                            client.post(
+                                reverse("checkout:index"),
+                                {"barcode": stock.normalized_barcode},
+                            )
+                            client.post(
+                                reverse("checkout:process_order"),
+                                {"implicit_id": "index-advisor@rowan.edu"},
+                            )
+                        if inventory is not None:
+                            client.post(
+                                reverse("inventory:stock_update"),
+                                {"item_id": inventory.id, "delta_qty": 1},
+                            )
+                    transaction.set_rollback(True)
+        return [query["sql"] for query in captured.captured_queries]
+
+    def handle(self, *args, **options):
+        if options["sql_file"]:
+            with open(options["sql_file"]) as f:
+                statements = [line.strip() for line in f if line.strip()]
+        else:
+            statements = self.workload(options["rounds"])
+        findings = query_plans.analyse(statements, options["min_rows"])
+
+        self.stdout.write(
+            f"Analysed {len(statements)} statements; {len(findings)} shape(s) flagged"
+        )
+        proposals = {}
+        for finding in findings:
+            self.stdout.write("")
+            self.stdout.write(f"x{finding.count}  {finding.sql[:300]}")
+            for problem in finding.problems:
+                self.stdout.write(self.style.WARNING(f"    {problem}"))
+            for proposal in finding.proposals:
+                proposals.setdefault(proposal, 0)
+                proposals[proposal] += finding.count
+                self.stdout.write(f"    -> {query_plans.model_index(proposal)}")
+
+        if proposals:
+            self.stdout.write("")
+            self.stdout.write("Proposed indexes, by statements served:")
+            for proposal, count in sorted(proposals.items(), key=lambda p: -p[1]):
+                self.stdout.write(f"{count:>6}  {query_plans.model_index(proposal)}")
@@ -0,0 +1,211 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+import asyncio
+import os
+import secrets
+
+from _core import loadtest
+from _core.loadtest import BARCODE_PREFIX, USER_PREFIX, Shift
+from checkout import barcode_index, rollups
+from checkout.models import Order
+from inventory.models import Inventory, Location, Product
+
+STOCK = 1_000_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a busy shift (scans, order commits, stock updates) against a "
+        "running server and report requests/sec, tail latency and lock errors. "
+        "Run with --prepare first, before the server builds its barcode index, "
+        "and with --cleanup afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--unix",
+            help="Connect to this unix socket instead (e.g. gunicorn's pantry.sock)",
+        )
+        parser.add_argument("--employees", type=int, default=4)
+        parser.add_argument("--managers", type=int, default=1)
+        parser.add_argument("--seconds", type=float, default=60.0)
+        parser.add_argument(
+            "--think",
+            type=float,
+            default=1.0,
+            help="Mean seconds each user waits between actions (0 = flat out)",
+        )
+        parser.add_argument("--scans-per-order", type=int, default=5)
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed, for repeatable runs"
+        )
+        parser.add_argument(
+            "--prepare",
+            action="store_true",
+            help="Create the load test users and products in the configured "
+            "database, then exit",
+        )
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument(
+            "--password",
+            default=os.environ.get("DJANGO_LOADTEST_PASSWORD"),
+            help="Password of the load test users (default: "
+            "$DJANGO_LOADTEST_PASSWORD). --prepare generates one if unset",
+        )
+        parser.add_argument(
+            "--cleanup",
+            action="store_true",
+            help="Delete the load test users, products and their orders, then exit",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run even with DEBUG off, i.e. against a production database",
+        )
+
+    def prepare(self, options):
+        User = get_user_model()
+        password = options["password"] or secrets.token_urlsafe(16)
+        roles = [("employee", "Shop Employee", options["employees"])]
+        roles.append(("manager", "Shop Manager", options["managers"]))
+        with transaction.atomic():
+            shopfloor, _ = Location.objects.get_or_create(name="Shopfloor")
+            for role, group_name, count in roles:
+                group, _ = Group.objects.get_or_create(name=group_name)
+                for index in range(count):
+                    user, _ = User.objects.get_or_create(
+                        username=f"{USER_PREFIX}-{role}-{index}"
+                    )
+                    user.set_password(password)
+                    user.save()
+                    user.groups.add(group)
+
+            for index in range(options["products"]):
+                barcode = f"{BARCODE_PREFIX}{index:010d}"
+                product, _ = Product.objects.get_or_create(
+                    barcode=barcode,
+                    defaults={
+                        "name": f"Load Test Item {index}",
+                        "manufacturer": "Load Test",
+                    },
+                )
+                Inventory.objects.update_or_create(
+                    product=product, location=shopfloor, defaults={"quantity": STOCK}
+                )
+        self.stdout.write(
+            f"Prepared {options['employees']} employee(s), {options['managers']} "
+            f"manager(s) and {options['products']} products"
+        )
+        if not options["password"]:
+            # Shown once; pass it to the run with --password
+            self.stdout.write(f"Generated password: {password}")
+
+    def cleanup(self):
+        """Delete what --prepare created and the orders placed with it."""
+        products = Product.objects.filter(
+            barcode__startswith=BARCODE_PREFIX, manufacturer="Load Test"
+        )
+        with transaction.atomic():
+            # Order lines protect the inventory rows they were taken from
+            _, orders = Order.objects.filter(
+                items__inventory_item__product__in=products
+            ).delete()
+            _, deleted = products.delete()
+            _, users = (
+                get_user_model()
+                .objects.filter(username__startswith=f"{USER_PREFIX}-")
+                .delete()
+            )
+            if orders:
+                # The hourly rollup has no row to cascade from
+                rollups.rebuild()
+        barcode_index.invalidate()
+        self.stdout.write(
+            f"Removed {users.get(get_user_model()._meta.label, 0)} user(s), "
+            f"{deleted.get('inventory.Product', 0)} product(s) and "
+            f"{orders.get('checkout.Order', 0)} order(s)"
+        )
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            self.cleanup()
+            return
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(
+                "DEBUG is off, so this is probably a production database; "
+                "pass --force to run the load test against it anyway"
+            )
+        if options["prepare"]:
+            self.prepare(options)
+            return
+
+        stock = list(
+            Inventory.objects.filter(
+                product__barcode__startswith=BARCODE_PREFIX,
+                product__manufacturer="Load Test",
+                location__name="Shopfloor",
+            ).values_list("id", "product__barcode")
+        )
+        if not stock:
+            raise CommandError("No load test products found; run with --prepare")
+        if not options["password"]:
+            raise CommandError(
+                "Pass --password or set DJANGO_LOADTEST_PASSWORD to the "
+                "password --prepare used"
+            )
+        shift = Shift(
+            barcodes=[barcode for _, barcode in stock],
+            inventory_ids=[inventory_id for inventory_id, _ in stock],
+            urls={
+                "login": reverse("login"),
+                "scan": reverse("checkout:index"),
+                "process_order": reverse("checkout:process_order"),
+                "stock_update": reverse("inventory:stock_update"),
+            },
+            scans_per_order=options["scans_per_order"],
+            think_seconds=options["think"],
+        )
+        try:
+            results, elapsed = asyncio.run(
+                loadtest.run_shift(
+                    options["url"],
+                    shift,
+                    options["employees"],
+                    options["managers"],
+                    options["seconds"],
+                    options["password"],
+                    seed=options["seed"],
+                    unix_socket=options["unix"],
+                )
+            )
+        except (OSError, loadtest.LoadTestError) as e:
+            raise CommandError(f"Load test failed: {e}")
+        self.report(results, elapsed, options)
+
+    def report(self, results, elapsed, options):
+        rows = results.rows(elapsed)
+        total = sum(row[1] for row in rows)
+        locked = sum(row[7] for row in rows)
+        self.stdout.write(
+            f"{options['employees']} employee(s), {options['managers']} manager(s), "
+            f"{elapsed:.1f}s, think {options['think']:.1f}s, seed {options['seed']}"
+        )
+        self.stdout.write(
+            f"{'action':<15}{'count':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'errors':>8}{'locked':>8}"
+        )
+        for action, count, rps, p50, p95, p99, errors, action_locked in rows:
+            self.stdout.write(
+                f"{action:<15}{count:>8}{rps:>9.1f}{p50:>9.1f}{p95:>9.1f}"
+                f"{p99:>9.1f}{errors:>8}{action_locked:>8}"
+            )
+        rate = locked / total if total else 0
+        self.stdout.write(
+            f"Total {total} actions, {total / elapsed:.1f}/s; "
+            f"'database is locked' on {locked} ({rate:.2%})"
+        )
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+import sqlite3
+
+from _core.backup_store import STORE_DIRNAME, BackupStoreError, ChunkStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild a database file from an incremental backup on a backup drive "
+        "(see backup_db --mode chunks)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("drive", help="Backup drive holding a .shopbackup file")
+        parser.add_argument(
+            "--snapshot", help="Snapshot to restore (default: the newest)"
+        )
+        parser.add_argument("--output", help="Database file to write")
+        parser.add_argument(
+            "--list", action="store_true", help="List snapshots and exit"
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Overwrite an existing output file"
+        )
+
+    def handle(self, *args, **options):
+        password = os.environ.get("DJANGO_BACKUP_PASSWORD")
+        if not password:
+            raise CommandError("DJANGO_BACKUP_PASSWORD environment variable not set")
+
+        store = ChunkStore(os.path.join(options["drive"], STORE_DIRNAME), password)
+        names = store.snapshots()
+        if not names:
+            raise CommandError(f"No incremental backups found on {options['drive']}")
+
+        if options["list"]:
+            for name in names:
+                manifest = store.manifest(name)
+                self.stdout.write(
+                    f"{name}  {manifest['size']:>12} bytes  "
+                    f"{len(manifest['chunks'])} chunks"
+                )
+            return
+
+        output = options["output"]
+        if not output:
+            raise CommandError("--output is required to restore a snapshot")
+        if os.path.exists(output) and not options["force"]:
+            raise CommandError(f"{output} exists; pass --force to overwrite it")
+
+        name = options["snapshot"] or names[-1]
+        partial_path = f"{output}.partial"
+        try:
+            # Chunks are written as they are verified, never all held at once
+            with open(partial_path, "wb") as f:
+                try:
+                    store.read_snapshot(name, f)
+                except BackupStoreError as e:
+                    raise CommandError(str(e))
+                f.flush()
+                os.fsync(f.fileno())
+            conn = sqlite3.connect(partial_path)
+            try:
+                result = conn.execute("PRAGMA integrity_check").fetchall()
+            finally:
+                conn.close()
+            if result != [("ok",)]:
+                raise CommandError(f"Restored snapshot {name} failed integrity check")
+            os.replace(partial_path, output)
+        finally:
+            for path in (partial_path, f"{partial_path}-wal", f"{partial_path}-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self.stdout.write(f"Restored snapshot {name} to {output}")
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import logging
+import time
+
+from _core import jobs, metrics
+from checkout import cart as cart_store
+from inventory import ledger
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sweeps for old jobs, expired sessions, abandoned carts and
+# old endpoint stats, and checks for a due stock snapshot
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (label sheets, backups) as they arrive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between checks of an empty queue",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every queued job and exit instead of waiting for more",
+        )
+
+    def housekeeping(self):
+        pruned = jobs.prune(settings.JOB_RESULT_MAX_AGE)
+        if pruned:
+            logger.info(f"Removed {pruned} old job(s)")
+        # Expired django_session rows; cache-only sessions expire on their own
+        call_command("clearsessions")
+        carts = cart_store.clear_abandoned()
+        if carts:
+            logger.info(f"Removed {carts} abandoned cart row(s)")
+        metrics.prune(settings.METRICS_RETENTION_DAYS)
+        taken = ledger.snapshot_if_due(settings.STOCK_SNAPSHOT_HOURS)
+        if taken:
+            logger.info(f"{taken[0]}: {taken[1]} changed quantity row(s)")
+
+    def handle(self, *args, **options):
+        # Nothing restarts the worker, so a failed step (a locked database,
+        # most often) is logged and retried rather than ending the loop
+        try:
+            interrupted = jobs.fail_interrupted()
+        except Exception:
+            logger.exception("Could not mark interrupted jobs as failed")
+        else:
+            if interrupted:
+                logger.warning(f"Marked {interrupted} interrupted job(s) as failed")
+
+        last_prune = None
+        while True:
+            try:
+                if last_prune is None or time.monotonic() - last_prune > PRUNE_INTERVAL:
+                    # Stamped first, so a failing sweep waits for the next interval
+                    last_prune = time.monotonic()
+                    self.housekeeping()
+
+                job = jobs.claim_next()
+                if job is not None:
+                    job = jobs.run(job)
+                    self.stdout.write(f"{job}")
+                    continue
+            except Exception:
+                logger.exception("Job worker step failed; retrying")
+                close_old_connections()
+            else:
+                if options["once"]:
+                    return
+            time.sleep(options["poll"])
@@ -0,0 +1,225 @@
+"""
+Per-endpoint request metrics.
+
+MetricsMiddleware times every request that resolves to a URL name and counts
+its SQL queries and SQL time. Samples, stamped with the hour the request
+started, go into a bounded ring buffer in the worker process; every
+METRICS_FLUSH_SECONDS the buffer is folded into one EndpointStats row per URL
+name and hour. The flush runs from request_finished, after the response has
+gone out, so a slow or failed flush never costs a user a page. When a worker
+is busier than the buffer between flushes, the oldest samples are dropped
+rather than letting memory grow.
+"""
+
+from bisect import bisect_left
+from collections import deque
+from datetime import timedelta
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import EndpointStats
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; a last bucket is open
+BUCKETS_MS = (
+    *(1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 75, 100),
+    *(150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000),
+)
+BUFFER_SIZE = 5000
+
+_buffer = deque(maxlen=BUFFER_SIZE)
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+class _QueryTimer:
+    """An execute_wrapper that counts queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        hour = _hour(timezone.now())
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        if match is not None and match.view_name:
+            record(match.view_name, elapsed_ms, timer.count, timer.seconds * 1000, hour)
+        return response
+
+
+def _hour(when):
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def record(url_name, elapsed_ms, queries, sql_ms, hour=None):
+    """Buffer one request's timings, for `hour` (default: now), until the next flush."""
+    _buffer.append(
+        (url_name, elapsed_ms, queries, sql_ms, hour or _hour(timezone.now()))
+    )
+
+
+def _empty(url_name, hour):
+    return EndpointStats(
+        url_name=url_name, hour=hour, histogram=[0] * (len(BUCKETS_MS) + 1)
+    )
+
+
+def _merge(row, samples):
+    histogram = list(row.histogram) or [0] * (len(BUCKETS_MS) + 1)
+    for _, elapsed_ms, queries, sql_ms, _ in samples:
+        histogram[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        row.count += 1
+        row.total_ms += elapsed_ms
+        row.max_ms = max(row.max_ms, elapsed_ms)
+        row.queries += queries
+        row.max_queries = max(row.max_queries, queries)
+        row.sql_ms += sql_ms
+    row.histogram = histogram
+
+
+def flush():
+    """Fold this worker's buffered samples into the EndpointStats table."""
+    global _last_flush
+    with _lock:
+        # popleft, so samples recorded meanwhile by other threads are kept
+        samples = [_buffer.popleft() for _ in range(len(_buffer))]
+        _last_flush = time.monotonic()
+    if not samples:
+        return 0
+
+    # Grouped by each sample's own hour: a flush just after the hour still
+    # files the previous hour's requests under that hour
+    groups = {}
+    for sample in samples:
+        url_name, hour = sample[0], sample[4]
+        groups.setdefault((url_name, hour), []).append(sample)
+    try:
+        with transaction.atomic():
+            # Write first: the insert takes SQLite's write lock (waiting out
+            # busy_timeout if another worker holds it), so the read below
+            # never has to upgrade to a write, which fails at once in WAL
+            # mode when another worker has committed meanwhile
+            EndpointStats.objects.bulk_create(
+                [_empty(url_name, hour) for url_name, hour in groups],
+                ignore_conflicts=True,
+            )
+            rows = EndpointStats.objects.filter(
+                hour__in={hour for _, hour in groups},
+                url_name__in={url_name for url_name, _ in groups},
+            )
+            for row in rows:
+                group = groups.get((row.url_name, row.hour))
+                if group is not None:
+                    _merge(row, group)
+                    row.save()
+    except DatabaseError:
+        # Still locked after busy_timeout; keep the samples for next time
+        logger.warning("Could not flush %d metrics sample(s)", len(samples))
+        _buffer.extend(samples)
+        return 0
+    return len(samples)
+
+
+def flush_if_due():
+    """Flush if METRICS_FLUSH_SECONDS have passed since the last flush."""
+    if time.monotonic() - _last_flush >= settings.METRICS_FLUSH_SECONDS:
+        return flush()
+    return 0
+
+
+def percentile(histogram, fraction):
+    """
+    Estimate a latency percentile (ms) from merged bucket counts.
+
+    The result is interpolated linearly inside the bucket holding the
+    requested rank, so it is accurate to that bucket's width.
+    """
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            low = BUCKETS_MS[index - 1] if index else 0.0
+            high = BUCKETS_MS[index] if index < len(BUCKETS_MS) else BUCKETS_MS[-1]
+            return low + (high - low) * (rank - seen) / count
+        seen += count
+    return float(BUCKETS_MS[-1])
+
+
+def summary(since):
+    """Per-URL-name totals and percentiles for rows from `since` onwards."""
+    merged = {}
+    for row in EndpointStats.objects.filter(hour__gte=since):
+        entry = merged.setdefault(
+            row.url_name,
+            {
+                "url_name": row.url_name,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "queries": 0,
+                "max_queries": 0,
+                "sql_ms": 0.0,
+                "histogram": [0] * (len(BUCKETS_MS) + 1),
+            },
+        )
+        entry["count"] += row.count
+        entry["total_ms"] += row.total_ms
+        entry["max_ms"] = max(entry["max_ms"], row.max_ms)
+        entry["queries"] += row.queries
+        entry["max_queries"] = max(entry["max_queries"], row.max_queries)
+        entry["sql_ms"] += row.sql_ms
+        for index, count in enumerate(row.histogram):
+            entry["histogram"][index] += count
+
+    results = []
+    for entry in merged.values():
+        count = entry["count"] or 1
+        histogram = entry.pop("histogram")
+        entry.update(
+            mean_ms=entry["total_ms"] / count,
+            p50_ms=percentile(histogram, 0.50),
+            p95_ms=percentile(histogram, 0.95),
+            p99_ms=percentile(histogram, 0.99),
+            mean_queries=entry["queries"] / count,
+            mean_sql_ms=entry["sql_ms"] / count,
+        )
+        results.append(entry)
+    return sorted(results, key=lambda entry: entry["p95_ms"], reverse=True)
+
+
+def prune(max_age_days):
+    """Delete stats rows older than `max_age_days`."""
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+    deleted, _ = EndpointStats.objects.filter(hour__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("_core", "0002_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EndpointStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url_name", models.CharField(max_length=100)),
+                ("hour", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total_ms", models.FloatField(default=0)),
+                ("max_ms", models.FloatField(default=0)),
+                ("queries", models.PositiveIntegerField(default=0)),
+                ("max_queries", models.PositiveIntegerField(default=0)),
+                ("sql_ms", models.FloatField(default=0)),
+                ("histogram", models.JSONField(default=list)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["hour"], name="Dcore_endpo_hour_12ab3e_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="endpointstats",
+            constraint=models.UniqueConstraint(
+                fields=("url_name", "hour"), name="unique_endpoint_hour"
+            ),
+        ),
+    ]
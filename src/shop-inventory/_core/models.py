@@ -11,3 +11,93 @@ class User(AbstractUser):
 
     def __str__(self):
         return "{} ({})".format(self.username, self.id)
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by the `run_jobs` worker process.
+
+    `kind` names an entry in `_core.jobs.TASKS`. Progress is `progress` out of
+    `total` steps; a finished task may leave a file in JOBS_DIR for download.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    KIND_CHOICES = [
+        ("qrcode_sheet", "QR Label Sheet"),
+        ("backup_db", "Database Backup"),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True
+    )
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result_file = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, related_name="jobs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    @property
+    def finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @property
+    def percent(self):
+        if self.status == self.SUCCEEDED:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, self.progress * 100 // self.total)
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class EndpointStats(models.Model):
+    """
+    Request timings for one URL name over one hour, flushed by _core.metrics.
+
+    Latencies are kept as counts per bucket of `_core.metrics.BUCKETS_MS`, so
+    rows from several workers and hours merge into exact bucket counts and
+    percentiles can be read off the merged histogram.
+    """
+
+    url_name = models.CharField(max_length=100)
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    queries = models.PositiveIntegerField(default=0)
+    max_queries = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    histogram = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["url_name", "hour"], name="unique_endpoint_hour"
+            )
+        ]
+        indexes = [models.Index(fields=["hour"])]
+
+    def __str__(self):
+        return f"{self.url_name} @ {self.hour:%Y-%m-%d %H:00}"
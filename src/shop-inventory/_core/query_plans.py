@@ -0,0 +1,291 @@
+"""
+Query plan analysis for the index advisor.
+
+Statements captured from a workload are grouped by shape (literals replaced
+with ?), run through SQLite's EXPLAIN QUERY PLAN, and flagged when the plan
+scans a table or builds a temporary B-tree to sort. For each flagged table an
+index is proposed from the statement's own predicates: equality columns
+first (including join columns), then one range column, then the ORDER BY
+columns. Equality on a boolean field becomes the condition of a partial index
+instead, since an index on a two-valued column narrows nothing by itself.
+
+The SQL parsing is a heuristic tuned to the ORM's quoted "table"."column"
+output; proposals are advice for a migration, not applied automatically.
+"""
+
+from collections import namedtuple
+from dataclasses import dataclass, field
+import re
+
+from django.apps import apps
+from django.db import connection, models
+
+ANALYSED = ("SELECT", "UPDATE", "DELETE")
+
+Proposal = namedtuple("Proposal", ["table", "columns", "condition"])
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"IN \((?:\?, )*\?\)")
+_PREDICATE = re.compile(
+    r'"(?P<table>\w+)"\."(?P<column>\w+)"\s*'
+    r"(?P<op>=|IN\b|>=|<=|>|<|BETWEEN\b|LIKE\b|IS\b)\s*(?P<value>'[^']*'|[\w.%-]+)?",
+    re.IGNORECASE,
+)
+# A boolean column used as a predicate on its own: WHERE [NOT] "t"."active"
+_BARE_COLUMN = re.compile(
+    r'(?P<negated>NOT\s+)?"(?P<table>\w+)"\."(?P<column>\w+)"'
+    r"(?!\s*(?:[=<>!]|IN\b|IS\b|LIKE\b|BETWEEN\b))",
+    re.IGNORECASE,
+)
+_JOIN = re.compile(r"\bON \(([^()]*)\)")
+_ORDER_COLUMN = re.compile(r'"(\w+)"\."(\w+)"')
+_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+
+
+def shape(sql):
+    """The statement with literals replaced, for grouping repeats."""
+    return _IN_LIST.sub("IN (...)", _LITERAL.sub("?", sql))
+
+
+def explain(sql):
+    """EXPLAIN QUERY PLAN rows for a statement, as detail strings."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _clauses(sql):
+    """Split a statement into its WHERE and ORDER BY text (top level only)."""
+    upper = sql.upper()
+    where_at = upper.find(" WHERE ")
+    order_at = upper.rfind(" ORDER BY ")
+    where = ""
+    if where_at != -1:
+        end = [
+            i
+            for i in (
+                order_at,
+                upper.find(" GROUP BY ", where_at),
+                upper.find(" LIMIT ", where_at),
+            )
+            if i > where_at
+        ]
+        where = sql[where_at + 7 : min(end) if end else len(sql)]
+    order = ""
+    if order_at != -1:
+        limit_at = upper.find(" LIMIT ", order_at)
+        order = sql[order_at + 10 : limit_at if limit_at != -1 else len(sql)]
+    return where, order
+
+
+def _model_for(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def _boolean_columns(model):
+    return {
+        f.column
+        for f in model._meta.concrete_fields
+        if isinstance(f, models.BooleanField)
+    }
+
+
+def existing_indexes(table):
+    """
+    Column tuples of every index on `table`, including uniques and an
+    INTEGER PRIMARY KEY, which is the rowid the table is stored by.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA table_info("{table}")')
+        indexes = [
+            (row[1],)
+            for row in cursor.fetchall()
+            if row[5] and row[2].lower() == "integer"
+        ]
+        cursor.execute(f'PRAGMA index_list("{table}")')
+        names = [row[1] for row in cursor.fetchall()]
+        for name in names:
+            cursor.execute(f'PRAGMA index_info("{name}")')
+            indexes.append(tuple(row[2] for row in cursor.fetchall()))
+    return indexes
+
+
+def propose(sql, table):
+    """
+    An index for `table` serving this statement, or None if its predicates
+    and ordering name no column of that table. A WHERE with OR gets no
+    proposal: each branch needs its own index, which is a judgement call.
+    """
+    model = _model_for(table)
+    booleans = _boolean_columns(model) if model else set()
+    where, order = _clauses(sql)
+    if " OR " in where.upper():
+        return None
+
+    equality, ranges, condition = [], [], []
+    # A join reaches this table by equality on its side of the ON clause
+    for join in _JOIN.findall(sql):
+        for match in _PREDICATE.finditer(join):
+            if match["table"] == table and match["op"] == "=":
+                equality.append(match["column"])
+    for match in _PREDICATE.finditer(where):
+        if match["table"] != table:
+            continue
+        column, op = match["column"], match["op"].upper()
+        if column in booleans and op in ("=", "IS"):
+            truthy = (match["value"] or "").upper() in ("1", "TRUE")
+            condition.append(column if truthy else f"NOT {column}")
+        elif op in ("=", "IN", "IS"):
+            equality.append(column)
+        else:
+            ranges.append(column)
+    for match in _BARE_COLUMN.finditer(where):
+        if match["table"] == table and match["column"] in booleans:
+            negated = "NOT " if match["negated"] else ""
+            condition.append(f"{negated}{match['column']}")
+    ordering = [
+        column
+        for order_table, column in _ORDER_COLUMN.findall(order)
+        if order_table == table
+    ]
+
+    columns = []
+    for column in [*equality, *ranges[:1], *ordering]:
+        if column not in columns:
+            columns.append(column)
+    if not columns:
+        return None
+    return Proposal(table, tuple(columns), " AND ".join(dict.fromkeys(condition)))
+
+
+def is_covered(proposal):
+    """True if an existing index already leads with the proposed columns."""
+    if proposal.condition:
+        return False
+    indexes = existing_indexes(proposal.table)
+    columns = proposal.columns
+    # Every index ends with the rowid, so a trailing primary key is free
+    if len(columns) > 1 and indexes and indexes[0] == columns[-1:]:
+        columns = columns[:-1]
+    return any(index[: len(columns)] == columns for index in indexes)
+
+
+def partial_indexes():
+    """Names of every partial index in the database."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = [row[0] for row in cursor.fetchall()]
+        names = set()
+        for table in tables:
+            cursor.execute(f'PRAGMA index_list("{table}")')
+            names.update(row[1] for row in cursor.fetchall() if row[4])
+    return names
+
+
+def table_rows(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        return cursor.fetchone()[0]
+
+
+@dataclass
+class Finding:
+    """One flagged statement shape and what the advisor makes of it."""
+
+    sql: str
+    count: int
+    plan: list
+    problems: list = field(default_factory=list)
+    proposals: list = field(default_factory=list)
+
+
+def analyse(statements, min_rows=1000):
+    """
+    Explain each distinct statement shape and return the flagged ones.
+
+    `statements` is an iterable of SQL strings with parameters inlined.
+    Scans of tables with fewer than `min_rows` rows are not flagged: SQLite
+    reads a small table faster than it would an index.
+    """
+    shapes = {}
+    for sql in statements:
+        if sql.lstrip().upper().startswith(ANALYSED):
+            key = shape(sql)
+            first, count = shapes.get(key, (sql, 0))
+            shapes[key] = (first, count + 1)
+
+    row_counts = {}
+    # A scan of a partial index reads only the rows its condition selects
+    partial = partial_indexes()
+    findings = []
+    for sql, count in shapes.values():
+        plan = explain(sql)
+        finding = Finding(sql, count, plan)
+        where, order = _clauses(sql)
+        # An unfiltered scan that stops at a LIMIT reads only what it returns
+        early_exit = not where and " LIMIT " in sql.upper()
+        tables = []
+        for detail in plan:
+            scan = _SCAN.match(detail)
+            if (
+                scan
+                and "VIRTUAL TABLE" not in detail
+                and scan[2] not in partial
+                and not early_exit
+            ):
+                table = scan[1]
+                if table not in row_counts:
+                    row_counts[table] = table_rows(table)
+                if row_counts[table] >= min_rows:
+                    kind = "index scan" if scan[2] else "table scan"
+                    finding.problems.append(
+                        f"{kind} of {table} ({row_counts[table]} rows)"
+                    )
+                    tables.append(table)
+            sort = _TEMP_BTREE.search(detail)
+            if sort:
+                finding.problems.append(f"temp B-tree for {sort[1].lower()}")
+                # The sort is on the leading ORDER BY table
+                ordered = [table for table, _ in _ORDER_COLUMN.findall(order)]
+                tables.extend(ordered[:1])
+        for table in dict.fromkeys(tables):
+            proposal = propose(sql, table)
+            if proposal and not is_covered(proposal):
+                finding.proposals.append(proposal)
+        if finding.problems:
+            findings.append(finding)
+    findings.sort(key=lambda finding: -finding.count)
+    return findings
+
+
+def index_name(proposal):
+    """A name for the proposed index within SQLite's and Django's limits."""
+    parts = [proposal.table.split("_", 1)[-1]]
+    if proposal.condition:
+        parts.append(proposal.condition.replace("NOT ", "not_").replace(" AND ", "_"))
+    parts.extend(column.removesuffix("_id") for column in proposal.columns)
+    return f"{'_'.join(parts)[:26].rstrip('_')}_idx"
+
+
+def model_index(proposal):
+    """The proposal as a models.Index(...) line for the model's Meta."""
+    model = _model_for(proposal.table)
+    names = {f.column: f.name for f in model._meta.concrete_fields} if model else {}
+    fields = ", ".join(f'"{names.get(column, column)}"' for column in proposal.columns)
+    condition = ""
+    if proposal.condition:
+        terms = []
+        for term in proposal.condition.split(" AND "):
+            negated = term.startswith("NOT ")
+            column = term.removeprefix("NOT ")
+            terms.append(f"{names.get(column, column)}={not negated}")
+        condition = f", condition=Q({', '.join(terms)})"
+    label = f"{model._meta.label}: " if model else ""
+    return (
+        f"{label}models.Index(fields=[{fields}]{condition}, "
+        f'name="{index_name(proposal)}")'
+    )
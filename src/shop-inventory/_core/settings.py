@@ -14,7 +14,13 @@ import os
 from datetime import datetime
 
 from pathlib import Path
-from _core import is_true, split_with_comma
+from _core import (
+    cache_config,
+    conn_max_age,
+    is_true,
+    session_engine,
+    split_with_comma,
+)
 from dotenv import load_dotenv
 
 # load_dotenv does not override existing environment variables, so in development we simply load the overrides first
@@ -81,6 +87,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "_core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -102,6 +109,8 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "_core.context_processors.user_groups",
+                "checkout.context_processors.cart",
             ],
         },
     },
@@ -116,11 +125,65 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": SQLITE_DIR / "db.sqlite3",
+        # Keep each worker's connection open between requests so the PRAGMAs
+        # and SQLite's page cache survive. Gunicorn's --max-requests recycling
+        # closes it when the worker restarts; "none" keeps it for the worker's
+        # lifetime and 0 restores Django's close-after-every-request behaviour.
+        "CONN_MAX_AGE": conn_max_age(os.getenv("DJANGO_CONN_MAX_AGE", "600")),
+        # Check a reused connection is still usable before the request uses it
+        "CONN_HEALTH_CHECKS": is_true(os.getenv("DJANGO_CONN_HEALTH_CHECKS", "true")),
     }
 }
 if DEBUG:
     DATABASES["default"]["NAME"] = SQLITE_DIR / "testdb.sqlite3"
 
+# PRAGMAs applied to every new SQLite connection (see _core.signals).
+# WAL lets gunicorn workers read while another worker writes, and busy_timeout
+# makes writers wait for the lock instead of failing with "database is locked".
+# Set any value to an empty string to leave SQLite's default in place.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("DJANGO_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DJANGO_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("DJANGO_SQLITE_BUSY_TIMEOUT", "5000"),  # ms
+    "mmap_size": os.getenv("DJANGO_SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)),
+    "cache_size": os.getenv("DJANGO_SQLITE_CACHE_SIZE", "-16000"),  # KiB if < 0
+    "temp_store": os.getenv("DJANGO_SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Caches. "default" is per-process (search results); "sessions" must be
+# shared by every gunicorn worker, so it is file-based or a local memcached
+# or redis server ("locmem" only suits a single process, such as runserver).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "sessions": cache_config(
+        os.getenv("DJANGO_SESSION_CACHE", "file"),
+        os.getenv("DJANGO_SESSION_CACHE_LOCATION", "cache/sessions"),
+        BASE_DIR,
+    ),
+}
+
+# "cached_db" reads sessions from the cache and writes through to
+# django_session, so nobody is logged out if the cache is lost; "cache" skips
+# the database entirely and "db" is Django's default.
+SESSION_ENGINE = session_engine(os.getenv("DJANGO_SESSION_ENGINE", "cached_db"))
+SESSION_CACHE_ALIAS = "sessions"
+
+# Per-endpoint request timings (see _core.metrics), flushed from each worker's
+# in-memory buffer every METRICS_FLUSH_SECONDS and kept for
+# METRICS_RETENTION_DAYS.
+METRICS_ENABLED = is_true(os.getenv("DJANGO_METRICS_ENABLED", "true"))
+METRICS_FLUSH_SECONDS = int(os.getenv("DJANGO_METRICS_FLUSH_SECONDS", "30"))
+METRICS_RETENTION_DAYS = int(os.getenv("DJANGO_METRICS_RETENTION_DAYS", "14"))
+
+# Background jobs (see _core.jobs): finished jobs and their downloadable
+# results are removed after JOB_RESULT_MAX_AGE seconds.
+JOBS_DIR = BASE_DIR / os.getenv("DJANGO_JOBS_DIR", "jobs")
+JOB_RESULT_MAX_AGE = int(os.getenv("DJANGO_JOB_RESULT_MAX_AGE", "86400"))
+
+# Stock ledger (see inventory.ledger): run_jobs snapshots changed quantities
+# every STOCK_SNAPSHOT_HOURS so point-in-time stock replays at most that much.
+STOCK_SNAPSHOT_HOURS = int(os.getenv("DJANGO_STOCK_SNAPSHOT_HOURS", "24"))
+
 # Custom User Model
 AUTH_USER_MODEL = f"{CORE_APP.name}.User"
 
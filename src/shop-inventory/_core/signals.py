@@ -1,5 +1,12 @@
 # Define Required Permissions and Groups for the App to run after migration
-from django.db.models.signals import post_migrate, post_save
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
 from django.dispatch import receiver
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
@@ -9,6 +16,23 @@ from django.conf import settings
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from .models import User
+from .db import apply_sqlite_pragmas
+from . import groups, metrics
+
+
+# Tune every new SQLite connection for concurrent gunicorn workers
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            apply_sqlite_pragmas(cursor, getattr(settings, "SQLITE_PRAGMAS", {}))
+
+
+# Fold request metrics into EndpointStats once the response has been sent
+@receiver(request_finished)
+def flush_request_metrics(sender, **kwargs):
+    if settings.METRICS_ENABLED:
+        metrics.flush_if_due()
 
 
 # Create Shop Employee Group
@@ -109,6 +133,28 @@ def add_user_to_employee_group(sender, instance, created, **kwargs):
             print('Group "Shop Employee" does not exist. User not added to any group.')
 
 
+# Drop memoized group names (see _core.groups) when membership changes
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_names(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear", "post_clear"):
+        return
+    if not reverse:
+        if action != "pre_clear":
+            groups.invalidate([instance.pk])
+    elif action == "pre_clear":
+        # pk_set is not sent for a clear; collect the members before they go
+        groups.invalidate(instance.user_set.values_list("pk", flat=True))
+    elif pk_set:
+        groups.invalidate(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_renamed_group(sender, instance, created=False, **kwargs):
+    if not created:
+        groups.invalidate(instance.user_set.values_list("pk", flat=True))
+
+
 def add_models_permissions(group, models, permissions):
     for model in models:
         content_type = ContentType.objects.get_for_model(model)
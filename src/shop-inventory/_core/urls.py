@@ -31,6 +31,12 @@ urlpatterns = [
     path("checkout/", include("checkout.urls")),
     path("login/", views.user_login, name="login"),
     path("logout/", views.user_logout, name="logout"),
+    path("jobs/<int:job_id>/", views.job_detail, name="job_detail"),
+    path("jobs/<int:job_id>/status/", views.job_status, name="job_status"),
+    path("jobs/<int:job_id>/download/", views.job_download, name="job_download"),
+    path("backup/", views.start_backup, name="start_backup"),
+    path("export/", views.export_page, name="export_page"),
+    path("export/<str:kind>.csv", views.export_csv, name="export_csv"),
 ]
 
 # Serve media files from MEDIA_ROOT. It will only work when DEBUG=True is set.
@@ -1,9 +1,20 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import login, logout, authenticate
-from django.http import HttpResponse
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.contrib import messages
-from django.contrib.auth.decorators import user_passes_test
-from .forms import CustomLoginForm
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.views.decorators.http import require_POST
+import os
+from . import exports, groups, jobs
+from .forms import CustomLoginForm, ExportForm
+from .models import Job
 
 
 # Custom group_required decorator for project-wide use
@@ -11,13 +22,16 @@ def group_required(*group_names):
     """
     Decorator that checks if a user is in at least one of the specified groups.
     Usage: @group_required('admin', 'staff')
+
+    Membership comes from the memoized group names in _core.groups, so the
+    check does not cost a query on every request.
     """
 
     def check_group(user):
         if user.is_authenticated:
             if user.is_superuser:
                 return True
-            return user.groups.filter(name__in=group_names).exists()
+            return groups.in_groups(user, *group_names)
         return False
 
     return user_passes_test(check_group, login_url="login")
@@ -80,3 +94,93 @@ def captive_portal_detect(request):
     else:
         # Manual navigation - redirect to main application
         return redirect("index")
+
+
+def _visible_job(request, job_id):
+    """Fetch a job its creator, a manager or an admin may look at."""
+    job = get_object_or_404(Job, id=job_id)
+    user = request.user
+    if job.created_by_id != user.id and not (
+        user.is_superuser or groups.in_groups(user, "Shop Manager", "Admins")
+    ):
+        raise Http404("No such job")
+    return job
+
+
+@login_required
+@group_required("Shop Employee", "Shop Manager", "Admins")
+def job_detail(request, job_id):
+    job = _visible_job(request, job_id)
+    return render(request, "core/job.html", {"job": job})
+
+
+@login_required
+@group_required("Shop Employee", "Shop Manager", "Admins")
+def job_status(request, job_id):
+    """JSON progress for the job page to poll."""
+    job = _visible_job(request, job_id)
+    return JsonResponse(
+        {
+            "id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "progress": job.progress,
+            "total": job.total,
+            "percent": job.percent,
+            "message": job.message,
+            "finished": job.finished,
+            "download_url": (
+                reverse("job_download", args=[job.id])
+                if job.status == Job.SUCCEEDED and job.result_file
+                else None
+            ),
+        }
+    )
+
+
+@login_required
+@group_required("Shop Employee", "Shop Manager", "Admins")
+def job_download(request, job_id):
+    job = _visible_job(request, job_id)
+    if job.status != Job.SUCCEEDED or not job.result_file:
+        raise Http404("Job has no result")
+    path = jobs.result_path(job)
+    if not os.path.exists(path):
+        raise Http404("Job result has expired")
+    filename = job.result_file.split("-", 1)[-1]
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=filename)
+
+
+@login_required
+@group_required("Shop Manager", "Admins")
+@require_POST
+def start_backup(request):
+    job = jobs.enqueue("backup_db", user=request.user)
+    messages.info(request, "Database backup queued.")
+    return redirect("job_detail", job_id=job.id)
+
+
+@login_required
+@group_required("Shop Manager", "Admins")
+def export_page(request):
+    return render(request, "core/exports.html", {"form": ExportForm()})
+
+
+@login_required
+@group_required("Shop Manager", "Admins")
+def export_csv(request, kind):
+    """Stream one export as CSV, filtered by the ExportForm fields."""
+    if kind not in exports.KINDS:
+        raise Http404("No such export")
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect("export_page")
+    rows = exports.rows(kind, **form.cleaned_data)
+    response = StreamingHttpResponse(
+        exports.stream(rows), content_type="text/csv; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{exports.filename(kind)}"'
+    return response
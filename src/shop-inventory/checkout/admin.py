@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Cart, CartLine, Order, OrderItem
 
 
 class OrderItemInline(admin.TabularInline):
@@ -28,3 +28,16 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_filter = ("order__date",)
     search_fields = ("order__order_number", "inventory_item__product__name")
     raw_id_fields = ("order", "inventory_item")
+
+
+class CartLineInline(admin.TabularInline):
+    model = CartLine
+    extra = 0
+    raw_id_fields = ("inventory_item",)
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_display = ("key", "created")
+    readonly_fields = ("key", "created")
+    inlines = [CartLineInline]
@@ -0,0 +1,119 @@
+"""
+Per-worker, in-memory index of sellable barcodes for the checkout scan path.
+
+Maps a normalized barcode to the Shopfloor inventory row that a scan should
+add to the cart. The index is built lazily with one read of the SellableStock
+table and kept current by the Product/Inventory/Location signals in
+checkout.signals. It also expires after INDEX_MAX_AGE seconds so changes made
+by other gunicorn workers are picked up.
+
+Stock is never trusted from the index; the cart form re-reads the row by
+primary key before accepting a scan, and calls refresh when that row has
+been sold out or moved by another worker.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from inventory.models import normalize_barcode
+from .models import SellableStock
+
+INDEX_MAX_AGE = 300
+
+BarcodeEntry = namedtuple("BarcodeEntry", ["inventory_id", "product_name", "quantity"])
+
+_lock = threading.Lock()
+_index = None
+_barcode_by_inventory = {}
+_built_at = 0.0
+
+
+def _build():
+    index = {}
+    rows = SellableStock.objects.order_by("inventory_id")
+    for inventory_id, barcode, name, quantity in rows.values_list(
+        "inventory_id", "normalized_barcode", "name", "quantity"
+    ):
+        # Keep the first row per barcode, matching the old .first() lookup
+        index.setdefault(barcode, BarcodeEntry(inventory_id, name, quantity))
+    return index
+
+
+def _store(barcode, entry):
+    _index[barcode] = entry
+    _barcode_by_inventory[entry.inventory_id] = barcode
+
+
+def _get_index():
+    global _index, _built_at
+    with _lock:
+        if _index is None or time.monotonic() - _built_at > INDEX_MAX_AGE:
+            _index = {}
+            _barcode_by_inventory.clear()
+            for barcode, entry in _build().items():
+                _store(barcode, entry)
+            _built_at = time.monotonic()
+        return _index
+
+
+def lookup(barcode):
+    """
+    Return the BarcodeEntry for a scanned barcode, or None if nothing on the
+    Shopfloor matches. A miss falls back to the database once, so products
+    enrolled by another worker are found before the index expires.
+    """
+    normalized = normalize_barcode(barcode)
+    entry = _get_index().get(normalized)
+    if entry is not None:
+        return entry
+    return _from_database(normalized)
+
+
+def refresh(barcode):
+    """
+    Look a barcode up in the database, replacing its cached entry.
+
+    For a scan whose cached row turned out to be sold out or moved by
+    another worker: the database may hold another Shopfloor row with stock.
+    """
+    return _from_database(normalize_barcode(barcode))
+
+
+def _from_database(normalized):
+    row = (
+        SellableStock.objects.filter(normalized_barcode=normalized)
+        .order_by("inventory_id")
+        .values_list("inventory_id", "name", "quantity")
+        .first()
+    )
+    entry = BarcodeEntry(*row) if row is not None else None
+    with _lock:
+        if _index is not None:
+            stale = _index.pop(normalized, None)
+            if stale is not None:
+                _barcode_by_inventory.pop(stale.inventory_id, None)
+            if entry is not None:
+                _store(normalized, entry)
+    return entry
+
+
+def update_quantity(inventory_id, quantity):
+    """Refresh the cached quantity of an indexed row, dropping it when empty."""
+    with _lock:
+        barcode = _barcode_by_inventory.get(inventory_id)
+        if barcode is None or _index is None:
+            return
+        if quantity > 0:
+            _index[barcode] = _index[barcode]._replace(quantity=quantity)
+        else:
+            del _index[barcode]
+            del _barcode_by_inventory[inventory_id]
+
+
+def invalidate():
+    """Drop the index so the next scan rebuilds it."""
+    global _index
+    with _lock:
+        _index = None
+        _barcode_by_inventory.clear()
@@ -0,0 +1,191 @@
+"""
+Server-side cart store.
+
+A cart lives in the Cart/CartLine tables; the session only holds the cart's
+key, written once when the first item is added. Adding an item is a single
+atomic increment of one CartLine row, so scans no longer rewrite the session
+row. Each line reserves its quantity for RESERVATION_SECONDS after it was last
+added to, and reserve checks and takes stock under one write lock, so two
+tills cannot both promise the last unit of an item.
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from inventory.models import Inventory
+from .models import Cart, CartLine
+
+SESSION_KEY = "cart_id"
+# How long an added line holds its stock against other carts
+RESERVATION_SECONDS = 15 * 60
+# Carts with no line touched for this long are deleted by clear_carts
+ABANDONED_SECONDS = 24 * 60 * 60
+
+ContentLine = namedtuple("ContentLine", ["product_id", "item", "quantity"])
+
+
+class CartContents:
+    """
+    Read-only view of a cart for rendering.
+
+    Every line, its inventory row and product are loaded with one query.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+
+def get_key(session, create=False):
+    """
+    Return the session's cart key, or None if it has no cart yet.
+
+    A cart left in the session by an older release (a dict of inventory id to
+    quantity under "cart") is moved into the store the first time it is seen.
+    """
+    key = session.get(SESSION_KEY)
+    legacy = session.pop("cart", None)
+    if key is None and (create or legacy):
+        key = uuid.uuid4().hex
+        session[SESSION_KEY] = key
+    if legacy:
+        for inventory_id, quantity in legacy.items():
+            if str(inventory_id).isdigit() and int(quantity) > 0:
+                add(key, int(inventory_id), int(quantity))
+    return key
+
+
+def _reserved_until():
+    return timezone.now() + timedelta(seconds=RESERVATION_SECONDS)
+
+
+def add(key, inventory_id, quantity):
+    """Atomically add `quantity` of an inventory row to the cart."""
+    updated = CartLine.objects.filter(
+        cart__key=key, inventory_item_id=inventory_id
+    ).update(quantity=F("quantity") + quantity, reserved_until=_reserved_until())
+    if updated:
+        return
+    cart, _ = Cart.objects.get_or_create(key=key)
+    try:
+        with transaction.atomic():
+            CartLine.objects.create(
+                cart=cart,
+                inventory_item_id=inventory_id,
+                quantity=quantity,
+                reserved_until=_reserved_until(),
+            )
+    except IntegrityError:
+        # Another request created the line first; add to it instead
+        CartLine.objects.filter(cart=cart, inventory_item_id=inventory_id).update(
+            quantity=F("quantity") + quantity, reserved_until=_reserved_until()
+        )
+
+
+def reserve(key, inventory_id, quantity):
+    """
+    Add `quantity` of an inventory row to the cart if the stock not held by
+    other carts covers the whole line; returns False, adding nothing, if not.
+
+    The transaction's first statement is a write, so it takes SQLite's write
+    lock before the stock is read and keeps it until the line is written:
+    another till's check cannot run between this one and its increment.
+    """
+    with transaction.atomic():
+        Cart.objects.bulk_create([Cart(key=key)], ignore_conflicts=True)
+        # Stock and both kinds of usage in one query, joined through the lines
+        mine = Q(cartline__cart__key=key)
+        row = (
+            Inventory.objects.filter(id=inventory_id)
+            .values_list("id", "quantity")
+            .annotate(
+                mine=Sum("cartline__quantity", filter=mine, default=0),
+                others=Sum(
+                    "cartline__quantity",
+                    filter=~mine & Q(cartline__reserved_until__gt=timezone.now()),
+                    default=0,
+                ),
+            )
+            .first()
+        )
+        if row is None:
+            return False
+        _, stock, in_cart, reserved = row
+        if stock < in_cart + reserved + quantity:
+            return False
+        add(key, inventory_id, quantity)
+    return True
+
+
+def remove(key, inventory_id):
+    """Drop a line from the cart; returns False if it was not there."""
+    deleted, _ = CartLine.objects.filter(
+        cart__key=key, inventory_item_id=inventory_id
+    ).delete()
+    return bool(deleted)
+
+
+def clear(key):
+    """Empty the cart, keeping its key so the session is not rewritten."""
+    CartLine.objects.filter(cart__key=key).delete()
+
+
+def quantities(key):
+    """The cart as {inventory_id (str): quantity}, as orders expect it."""
+    if key is None:
+        return {}
+    return {
+        str(inventory_id): quantity
+        for inventory_id, quantity in CartLine.objects.filter(
+            cart__key=key
+        ).values_list("inventory_item_id", "quantity")
+    }
+
+
+def line_usage(key, inventory_id):
+    """
+    Return (in this cart, reserved by other carts) for one inventory row.
+
+    Only unexpired reservations count against other carts.
+    """
+    mine = Q(cart__key=key or "")
+    usage = CartLine.objects.filter(inventory_item_id=inventory_id).aggregate(
+        mine=Sum("quantity", filter=mine),
+        others=Sum("quantity", filter=~mine & Q(reserved_until__gt=timezone.now())),
+    )
+    return usage["mine"] or 0, usage["others"] or 0
+
+
+def contents(key):
+    """Every line of the cart with its inventory row and product, for display."""
+    if key is None:
+        return CartContents([])
+    lines = (
+        CartLine.objects.filter(cart__key=key)
+        .select_related("inventory_item__product")
+        .order_by("id")
+    )
+    return CartContents(
+        [
+            ContentLine(str(line.inventory_item_id), line.inventory_item, line.quantity)
+            for line in lines
+        ]
+    )
+
+
+def clear_abandoned(max_age=ABANDONED_SECONDS):
+    """Delete carts whose lines all lapsed more than `max_age` seconds ago."""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    recent = CartLine.objects.filter(reserved_until__gt=cutoff).values("cart_id")
+    deleted, _ = Cart.objects.filter(created__lt=cutoff).exclude(id__in=recent).delete()
+    return deleted
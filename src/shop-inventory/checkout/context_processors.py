@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+from . import cart as cart_store
+
+
+def cart(request):
+    """Expose the request's cart to templates, loaded only if a template uses it."""
+    session = getattr(request, "session", None)
+    if session is None:
+        return {"cart": cart_store.CartContents([])}
+    return {
+        "cart": SimpleLazyObject(
+            lambda: cart_store.contents(cart_store.get_key(session))
+        )
+    }
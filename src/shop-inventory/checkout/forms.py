@@ -1,7 +1,10 @@
 from django import forms
 from django.db import transaction
 from inventory.models import Inventory
-from .models import Order, OrderItem
+from .models import Order
+from . import barcode_index, stock
+from . import cart as cart_store
+from .orders import commit_cart
 from django.utils import timezone
 import uuid
 
@@ -13,6 +16,11 @@ class AddToCartForm(forms.Form):
 
     def __init__(self, *args, **kwargs):
         self.cart = kwargs.pop("cart", {})
+        # With a stored cart, stock held by other carts is checked too
+        self.cart_key = kwargs.pop("cart_key", None)
+        # The scan that resolved product_id, so a stale index entry can be
+        # looked up again
+        self.scanned = kwargs.pop("barcode", None)
         super().__init__(*args, **kwargs)
 
     def clean(self):
@@ -26,34 +34,80 @@ class AddToCartForm(forms.Form):
 
         try:
             if barcode:
-                # Inventory doesn't have a barcode field - need to look up via Product
-                from inventory.models import normalize_barcode
-
-                self.inventory_item = Inventory.objects.filter(
-                    product__normalized_barcode=normalize_barcode(barcode)
-                ).first()
-                if not self.inventory_item:
+                # Resolve the barcode through the in-memory Shopfloor index
+                entry = barcode_index.lookup(barcode)
+                if not entry:
                     raise Inventory.DoesNotExist("No inventory found for barcode")
-                cleaned_data["product_id"] = self.inventory_item.id
+                product_id = entry.inventory_id
+                cleaned_data["product_id"] = product_id
                 cleaned_data["quantity"] = 1
+                self.scanned = barcode
             else:
-                self.inventory_item = Inventory.objects.get(id=product_id)
                 cleaned_data["quantity"] = quantity
 
-            # Check if adding this quantity would exceed available stock
-            cart_quantity = int(self.cart.get(str(self.inventory_item.id), 0))
-            if self.inventory_item.quantity < cart_quantity + cleaned_data["quantity"]:
-                raise forms.ValidationError(
-                    f"Insufficient quantity in inventory for {self.inventory_item.product.name}"
-                )
+            # Always re-read stock by primary key; the index may be stale
+            self.inventory_item = Inventory.objects.select_related(
+                "product", "location"
+            ).get(id=product_id)
+
+            short = self.is_short(cleaned_data["quantity"])
+            if self.scanned and (short or not self.on_shopfloor()):
+                # Another worker may have sold out or moved the row this
+                # worker's index still points at; ask the database again
+                entry = barcode_index.refresh(self.scanned)
+                if entry is not None and entry.inventory_id != self.inventory_item.id:
+                    cleaned_data["product_id"] = entry.inventory_id
+                    self.inventory_item = Inventory.objects.select_related(
+                        "product", "location"
+                    ).get(id=entry.inventory_id)
+                    short = self.is_short(cleaned_data["quantity"])
+                if not self.on_shopfloor():
+                    raise Inventory.DoesNotExist("No Shopfloor row for barcode")
+
+            if short:
+                raise self.insufficient()
 
         except Inventory.DoesNotExist:
             raise forms.ValidationError("Product not found")
 
         return cleaned_data
 
+    def on_shopfloor(self):
+        # Matches the read model's icontains filter on the location name
+        return stock.SHOPFLOOR.lower() in self.inventory_item.location.name.lower()
+
+    def is_short(self, quantity):
+        """Whether the loaded row cannot take `quantity` more for this cart."""
+        if self.cart_key is not None:
+            cart_quantity, reserved = cart_store.line_usage(
+                self.cart_key, self.inventory_item.id
+            )
+        else:
+            cart_quantity = int(self.cart.get(str(self.inventory_item.id), 0))
+            reserved = 0
+        return self.inventory_item.quantity < cart_quantity + reserved + quantity
+
+    def insufficient(self):
+        return forms.ValidationError(
+            f"Insufficient quantity in inventory for {self.inventory_item.product.name}"
+        )
+
     def save(self):
-        """Update the cart with the new item."""
+        """
+        Add the item to the stored cart, or to (and return) the `cart` dict.
+
+        Stock is checked again as the stored cart's line is written, since
+        another till may have taken it since clean(); ValidationError if so.
+        """
+        if self.cart_key is not None:
+            if not cart_store.reserve(
+                self.cart_key,
+                self.cleaned_data["product_id"],
+                self.cleaned_data["quantity"],
+            ):
+                raise self.insufficient()
+            return None
+
         product_id = str(self.cleaned_data["product_id"])
         quantity = self.cleaned_data["quantity"]
 
@@ -80,6 +134,7 @@ class ProcessOrderForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         self.cart = kwargs.pop("cart", {})
+        self.cart_key = kwargs.pop("cart_key", None)
         self.request = kwargs.pop("request", None)
         super().__init__(*args, **kwargs)
 
@@ -97,34 +152,12 @@ class ProcessOrderForm(forms.ModelForm):
         if commit:
             with transaction.atomic():
                 instance.save()
-
-                # Process each item in the cart
-                for product_id, quantity in self.cart.items():
-                    try:
-                        inventory_item = Inventory.objects.select_for_update().get(
-                            id=product_id
-                        )
-
-                        # Check if we have enough stock
-                        if inventory_item.quantity < quantity:
-                            raise forms.ValidationError(
-                                f"Insufficient stock for {inventory_item.product.name}"
-                            )
-
-                        # Create order item
-                        OrderItem.objects.create(
-                            order=instance,
-                            inventory_item=inventory_item,
-                            quantity=quantity,
-                        )
-
-                        # Update inventory
-                        inventory_item.quantity -= quantity
-                        inventory_item.save()
-
-                    except Inventory.DoesNotExist:
-                        raise forms.ValidationError(
-                            f"Product {product_id} no longer exists"
-                        )
+                commit_cart(
+                    instance,
+                    self.cart,
+                    user=self.request.user if self.request else None,
+                )
+                if self.cart_key is not None:
+                    cart_store.clear(self.cart_key)
 
         return instance
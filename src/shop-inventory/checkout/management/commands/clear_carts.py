@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from checkout import cart as cart_store
+
+
+class Command(BaseCommand):
+    help = "Delete checkout carts that have not been touched for a while"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=cart_store.ABANDONED_SECONDS,
+            help="Seconds since a cart's last reservation lapsed before it is deleted",
+        )
+
+    def handle(self, *args, **options):
+        deleted = cart_store.clear_abandoned(options["max_age"])
+        self.stdout.write(f"Removed {deleted} abandoned cart row(s)")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from checkout import rollups
+
+
+class Command(BaseCommand):
+    help = "Recreate the daily product and hourly order rollups from order history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        daily, hourly = rollups.rebuild(options["batch_size"])
+        self.stdout.write(
+            f"Rebuilt {daily} daily product row(s) and {hourly} hourly row(s)"
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from checkout import barcode_index, stock
+
+
+class Command(BaseCommand):
+    help = "Recreate the SellableStock read model from inventory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rows = stock.rebuild(options["batch_size"])
+        barcode_index.invalidate()
+        self.stdout.write(f"Rebuilt {rows} sellable stock row(s)")
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0002_product_search"),
+        ("checkout", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Cart",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=32, unique=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CartLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField()),
+                ("reserved_until", models.DateTimeField(db_index=True)),
+                (
+                    "cart",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="checkout.cart",
+                    ),
+                ),
+                (
+                    "inventory_item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="inventory.inventory",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="cartline",
+            constraint=models.UniqueConstraint(
+                fields=("cart", "inventory_item"), name="unique_cart_line"
+            ),
+        ),
+    ]
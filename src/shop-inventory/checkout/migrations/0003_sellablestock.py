@@ -0,0 +1,79 @@
+# Generated by Django 4.2.25 on 2026-10-18 03:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate(apps, schema_editor):
+    Inventory = apps.get_model("inventory", "Inventory")
+    SellableStock = apps.get_model("checkout", "SellableStock")
+    rows = Inventory.objects.filter(
+        location__name__icontains="Shopfloor", quantity__gt=0
+    ).values_list(
+        "id",
+        "product_id",
+        "product__name",
+        "product__manufacturer",
+        "product__normalized_barcode",
+        "quantity",
+    )
+    SellableStock.objects.bulk_create(
+        [
+            SellableStock(
+                inventory_id=inventory_id,
+                product_id=product_id,
+                name=name,
+                manufacturer=manufacturer,
+                normalized_barcode=barcode,
+                quantity=quantity,
+            )
+            for inventory_id, product_id, name, manufacturer, barcode, quantity in rows
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0002_product_search"),
+        ("checkout", "0002_cart"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SellableStock",
+            fields=[
+                (
+                    "inventory",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="sellable",
+                        serialize=False,
+                        to="inventory.inventory",
+                    ),
+                ),
+                ("name", models.CharField(max_length=30)),
+                ("manufacturer", models.CharField(max_length=30)),
+                ("normalized_barcode", models.CharField(max_length=36)),
+                ("quantity", models.PositiveIntegerField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="inventory.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["normalized_barcode", "inventory"],
+                        name="sellable_barcode_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
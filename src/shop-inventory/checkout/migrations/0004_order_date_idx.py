@@ -0,0 +1,16 @@
+# Generated by Django 4.2.25 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checkout", "0003_sellablestock"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["date"], name="order_date_idx"),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 4.2.25 on 2026-10-18 04:12
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+import django.db.models.deletion
+
+
+def create_in_batches(model, objects, batch_size=5000):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+def populate(apps, schema_editor):
+    OrderItem = apps.get_model("checkout", "OrderItem")
+    DailyProductUsage = apps.get_model("checkout", "DailyProductUsage")
+    HourlyOrderVolume = apps.get_model("checkout", "HourlyOrderVolume")
+    lines = OrderItem.objects.annotate(day=TruncDate("order__date"))
+    daily = (
+        lines.values_list("day", "inventory_item__product_id")
+        .annotate(items=Sum("quantity"), orders=Count("order_id", distinct=True))
+        .order_by()
+    )
+    create_in_batches(
+        DailyProductUsage,
+        (
+            DailyProductUsage(
+                day=day, product_id=product_id, items=items, orders=orders
+            )
+            for day, product_id, items, orders in daily.iterator(chunk_size=5000)
+        ),
+    )
+    hourly = (
+        lines.annotate(hour=ExtractHour("order__date"))
+        .values_list("day", "hour")
+        .annotate(orders=Count("order_id", distinct=True), items=Sum("quantity"))
+        .order_by()
+    )
+    create_in_batches(
+        HourlyOrderVolume,
+        (
+            HourlyOrderVolume(day=day, hour=hour, orders=orders, items=items)
+            for day, hour, orders, items in hourly.iterator(chunk_size=5000)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0004_stock_ledger"),
+        ("checkout", "0004_order_date_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyProductUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("items", models.PositiveIntegerField(default=0)),
+                ("orders", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="HourlyOrderVolume",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("hour", models.PositiveSmallIntegerField()),
+                ("orders", models.PositiveIntegerField(default=0)),
+                ("items", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="hourlyordervolume",
+            constraint=models.UniqueConstraint(
+                fields=("day", "hour"), name="unique_day_hour"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailyproductusage",
+            name="product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="inventory.product",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyproductusage",
+            constraint=models.UniqueConstraint(
+                fields=("day", "product"), name="unique_day_product"
+            ),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -46,6 +46,10 @@ class Order(models.Model):
     )
     date = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        # recent_orders filters and sorts by date
+        indexes = [models.Index(fields=["date"], name="order_date_idx")]
+
     def __str__(self):
         return f"Order #{self.order_number} ({self.implicit_id})"
 
@@ -57,3 +61,118 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.inventory_item.product.name} x{self.quantity} in Order #{self.order.order_number}"
+
+
+class Cart(models.Model):
+    """A point-of-sale cart; the session only holds its `key`."""
+
+    key = models.CharField(max_length=32, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Cart {self.key}"
+
+
+class CartLine(models.Model):
+    """
+    One inventory row in a cart, holding a stock reservation.
+
+    Until `reserved_until`, the line's quantity counts against the stock other
+    carts can add; afterwards it is only checked when the order is committed.
+    """
+
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="lines")
+    inventory_item = models.ForeignKey("inventory.Inventory", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    reserved_until = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cart", "inventory_item"], name="unique_cart_line"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_item_id} x{self.quantity} in {self.cart}"
+
+
+class SellableStock(models.Model):
+    """
+    Read model of the stock checkout can sell.
+
+    One row per Shopfloor inventory row with stock on hand, carrying the
+    product fields the checkout listing and the scan lookup need so both are
+    single-table reads. Kept current by checkout.stock from the Inventory,
+    Product and Location signals and from commit_cart; rebuild it with
+    `manage.py rebuild_sellable_stock`.
+    """
+
+    inventory = models.OneToOneField(
+        "inventory.Inventory",
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="sellable",
+    )
+    product = models.ForeignKey(
+        "inventory.Product", on_delete=models.CASCADE, related_name="+"
+    )
+    name = models.CharField(max_length=30)
+    manufacturer = models.CharField(max_length=30)
+    normalized_barcode = models.CharField(max_length=36)
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["normalized_barcode", "inventory"],
+                name="sellable_barcode_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name} x{self.quantity}"
+
+
+class DailyProductUsage(models.Model):
+    """
+    Items of one product sold on one day, and how many orders they were in.
+
+    Maintained by checkout.rollups as orders are committed, so reports read
+    these rows instead of walking OrderItem; rebuild them with
+    `manage.py rebuild_rollups`. Days are in the configured TIME_ZONE.
+    """
+
+    day = models.DateField()
+    product = models.ForeignKey(
+        "inventory.Product", on_delete=models.CASCADE, related_name="+"
+    )
+    items = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "product"], name="unique_day_product"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} x{self.items} on {self.day}"
+
+
+class HourlyOrderVolume(models.Model):
+    """Orders and items committed in one hour of one day; see DailyProductUsage."""
+
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    orders = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "hour"], name="unique_day_hour")
+        ]
+
+    def __str__(self):
+        return f"{self.orders} order(s) on {self.day} {self.hour:02d}:00"
@@ -0,0 +1,133 @@
+from functools import reduce
+from operator import or_
+
+from django import forms
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from inventory import ledger
+from inventory.models import Inventory, StockMovement
+from .models import OrderItem
+from . import barcode_index, rollups, stock
+
+
+class InsufficientStock(forms.ValidationError):
+    """
+    Raised when one or more cart lines cannot be filled.
+
+    `short_lines` holds (inventory_id, inventory_item, requested, available)
+    for every short line; `inventory_item` is None if the row no longer exists.
+    """
+
+    def __init__(self, short_lines):
+        messages = []
+        for inventory_id, item, requested, available in short_lines:
+            if item is None:
+                messages.append(f"Product {inventory_id} no longer exists")
+            else:
+                messages.append(
+                    f"Insufficient stock for {item.product.name} "
+                    f"(requested {requested}, available {available})"
+                )
+        super().__init__(messages)
+        self.short_lines = short_lines
+
+
+def _parse_cart(cart):
+    """Convert a session cart into {inventory_id: quantity} with int keys."""
+    quantities = {}
+    for inventory_id, quantity in cart.items():
+        quantities[int(inventory_id)] = int(quantity)
+    return quantities
+
+
+def commit_cart(order, cart, user=None):
+    """
+    Move the contents of `cart` into `order` and decrement stock.
+
+    Must run inside the caller's transaction. All cart rows are locked and read
+    in one query, stock is checked in memory, order items are written with one
+    bulk insert and stock is decremented with a single conditional UPDATE. No
+    changes are made if any line is short; InsufficientStock names every one.
+    Each line is recorded in the stock ledger as a sale by `user`, and the
+    order is added to the reporting rollups.
+    """
+    quantities = _parse_cart(cart)
+    items = (
+        Inventory.objects.select_for_update()
+        .select_related("product")
+        .in_bulk(list(quantities))
+    )
+
+    short_lines = []
+    for inventory_id, requested in quantities.items():
+        item = items.get(inventory_id)
+        available = item.quantity if item else 0
+        if available < requested:
+            short_lines.append((inventory_id, item, requested, available))
+    if short_lines:
+        raise InsufficientStock(short_lines)
+
+    order_items = OrderItem.objects.bulk_create(
+        [
+            OrderItem(order=order, inventory_item=items[inventory_id], quantity=qty)
+            for inventory_id, qty in quantities.items()
+        ]
+    )
+
+    # Guard each row with quantity >= n so a concurrent writer cannot push
+    # stock below zero between the read above and this write.
+    updated = Inventory.objects.filter(
+        reduce(
+            or_,
+            (
+                Q(id=inventory_id, quantity__gte=qty)
+                for inventory_id, qty in quantities.items()
+            ),
+        )
+    ).update(
+        quantity=Case(
+            *(
+                When(id=inventory_id, then=F("quantity") - qty)
+                for inventory_id, qty in quantities.items()
+            ),
+            default=F("quantity"),
+            output_field=PositiveIntegerField(),
+        )
+    )
+    if updated != len(quantities):
+        current = dict(
+            Inventory.objects.filter(id__in=quantities).values_list("id", "quantity")
+        )
+        raise InsufficientStock(
+            [
+                (inventory_id, items[inventory_id], qty, current.get(inventory_id, 0))
+                for inventory_id, qty in quantities.items()
+                if current.get(inventory_id, 0) < qty
+            ]
+        )
+
+    for inventory_id, qty in quantities.items():
+        items[inventory_id].quantity -= qty
+    # The UPDATE bypasses post_save, so bring the read model along by hand
+    stock.refresh_inventory(*quantities)
+    ledger.record_many(
+        ledger.movement(
+            items[inventory_id], -qty, StockMovement.SALE, user, order.order_number
+        )
+        for inventory_id, qty in quantities.items()
+    )
+    rollups.record_order(
+        order,
+        [
+            (items[inventory_id].product_id, qty)
+            for inventory_id, qty in quantities.items()
+        ],
+    )
+
+    def refresh_barcode_index():
+        # Likewise for the per-worker scan index, once the order is committed
+        for item in items.values():
+            barcode_index.update_quantity(item.id, item.quantity)
+
+    transaction.on_commit(refresh_barcode_index)
+    return order_items
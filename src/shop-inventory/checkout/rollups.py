@@ -0,0 +1,198 @@
+"""
+Order rollups for reporting.
+
+DailyProductUsage and HourlyOrderVolume hold per-day totals of the order
+history, so reports read a few rows per day instead of every OrderItem.
+commit_cart adds each order to them in the order's own transaction
+(record_order); rebuild recreates them from the history, for data loaded
+without commit_cart or orders deleted since. Days and hours are in the
+configured TIME_ZONE.
+"""
+
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractHour, TruncDate, TruncMonth
+from django.utils import timezone
+
+from inventory.models import Product
+from .models import DailyProductUsage, HourlyOrderVolume, OrderItem
+
+BATCH_SIZE = 5000
+
+
+def record_order(order, lines):
+    """
+    Add a committed order's lines, as (product_id, quantity) pairs.
+
+    Call inside the transaction that writes the order: its inserts already
+    hold SQLite's write lock, so reading the day's rows and writing them back
+    cannot interleave with another order's commit.
+    """
+    per_product = {}
+    for product_id, quantity in lines:
+        per_product[product_id] = per_product.get(product_id, 0) + quantity
+    if not per_product:
+        return
+    when = timezone.localtime(order.date)
+    day = when.date()
+
+    existing = {
+        row.product_id: row
+        for row in DailyProductUsage.objects.filter(day=day, product_id__in=per_product)
+    }
+    new = []
+    for product_id, quantity in per_product.items():
+        row = existing.get(product_id)
+        if row is None:
+            new.append(
+                DailyProductUsage(
+                    day=day, product_id=product_id, items=quantity, orders=1
+                )
+            )
+        else:
+            row.items += quantity
+            row.orders += 1
+    DailyProductUsage.objects.bulk_update(existing.values(), ["items", "orders"])
+    DailyProductUsage.objects.bulk_create(new)
+
+    items = sum(per_product.values())
+    updated = HourlyOrderVolume.objects.filter(day=day, hour=when.hour).update(
+        orders=F("orders") + 1, items=F("items") + items
+    )
+    if not updated:
+        HourlyOrderVolume.objects.create(day=day, hour=when.hour, orders=1, items=items)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """
+    Recreate both rollups from the order history.
+
+    Returns (daily product rows, hourly rows) written.
+    """
+    lines = OrderItem.objects.annotate(day=TruncDate("order__date"))
+    daily = (
+        lines.values_list("day", "inventory_item__product_id")
+        .annotate(items=Sum("quantity"), orders=Count("order_id", distinct=True))
+        .order_by()
+    )
+    hourly = (
+        lines.annotate(hour=ExtractHour("order__date"))
+        .values_list("day", "hour")
+        .annotate(orders=Count("order_id", distinct=True), items=Sum("quantity"))
+        .order_by()
+    )
+    written = [0, 0]
+    with transaction.atomic():
+        DailyProductUsage.objects.all().delete()
+        HourlyOrderVolume.objects.all().delete()
+        for batch in _batches(daily.iterator(chunk_size=batch_size), batch_size):
+            DailyProductUsage.objects.bulk_create(
+                [
+                    DailyProductUsage(
+                        day=day, product_id=product_id, items=items, orders=orders
+                    )
+                    for day, product_id, items, orders in batch
+                ]
+            )
+            written[0] += len(batch)
+        for batch in _batches(hourly.iterator(chunk_size=batch_size), batch_size):
+            HourlyOrderVolume.objects.bulk_create(
+                [
+                    HourlyOrderVolume(day=day, hour=hour, orders=orders, items=items)
+                    for day, hour, orders, items in batch
+                ]
+            )
+            written[1] += len(batch)
+    return tuple(written)
+
+
+def totals(since):
+    """Orders and items from the day `since` onwards."""
+    return HourlyOrderVolume.objects.filter(day__gte=since).aggregate(
+        order_count=Sum("orders", default=0), item_count=Sum("items", default=0)
+    )
+
+
+def by_hour(since):
+    """Orders and items per hour of the day, from `since` onwards."""
+    return list(
+        HourlyOrderVolume.objects.filter(day__gte=since)
+        .values("hour")
+        .annotate(order_count=Sum("orders"), item_count=Sum("items"))
+        .order_by("hour")
+    )
+
+
+def top_products(since, limit=20):
+    """The `limit` products with the most items sold from `since` onwards."""
+    # Group the rollup alone and name just the winners; joining Product for
+    # every row of a long window costs more than the grouping itself
+    rows = list(
+        DailyProductUsage.objects.filter(day__gte=since)
+        .values("product_id")
+        .annotate(item_count=Sum("items"), order_count=Sum("orders"))
+        .order_by("-item_count", "product_id")[:limit]
+    )
+    products = Product.objects.in_bulk([row["product_id"] for row in rows])
+    for row in rows:
+        row["product"] = products.get(row["product_id"])
+    return rows
+
+
+def _month_start(day, months_back=0):
+    month = day.year * 12 + day.month - 1 - months_back
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def year_over_year(today=None):
+    """
+    Orders and items for each of the last 12 months (this one included),
+    oldest first, each with the same month a year earlier.
+    """
+    today = today or timezone.localdate()
+    start = _month_start(today, 23)
+    months = {
+        month: (orders, items)
+        for month, orders, items in HourlyOrderVolume.objects.filter(day__gte=start)
+        .annotate(month=TruncMonth("day"))
+        .values("month")
+        .annotate(order_count=Sum("orders"), item_count=Sum("items"))
+        .values_list("month", "order_count", "item_count")
+        .order_by()
+    }
+    rows = []
+    for back in range(11, -1, -1):
+        month = _month_start(today, back)
+        orders, items = months.get(month, (0, 0))
+        prior_orders, prior_items = months.get(_month_start(today, back + 12), (0, 0))
+        rows.append(
+            {
+                "month": month,
+                "orders": orders,
+                "items": items,
+                "prior_orders": prior_orders,
+                "prior_items": prior_items,
+                "change": (
+                    (items - prior_items) * 100 / prior_items if prior_items else None
+                ),
+            }
+        )
+    return rows
+
+
+def window_start(days, today=None):
+    """The first day of a `days`-long window ending today."""
+    return (today or timezone.localdate()) - timedelta(days=days - 1)
@@ -1,9 +1,12 @@
 # Default Locations
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, post_save, post_delete
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
+from inventory.models import Product, Location, Inventory
 from .models import Order
+from . import barcode_index, stock
 
 
 def add_models_permissions(group, models, permissions):
@@ -29,3 +32,42 @@ def create_shop_manager_permissions(sender, **kwargs):
         group, created = Group.objects.get_or_create(name="Shop Manager")
         models = [Order]  # Add other related models as needed
         add_models_permissions(group, models, ["add", "change", "delete", "view"])
+
+
+# The index outlives the transaction, so only committed quantities reach it
+@receiver(post_save, sender=Inventory)
+def update_barcode_index_quantity(sender, instance, **kwargs):
+    inventory_id, quantity = instance.id, instance.quantity
+    transaction.on_commit(lambda: barcode_index.update_quantity(inventory_id, quantity))
+
+
+@receiver(post_delete, sender=Inventory)
+def remove_from_barcode_index(sender, instance, **kwargs):
+    inventory_id = instance.id
+    transaction.on_commit(lambda: barcode_index.update_quantity(inventory_id, 0))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_barcode_index(sender, **kwargs):
+    barcode_index.invalidate()
+
+
+# Keep the SellableStock read model in step; deletes cascade to it
+@receiver(post_save, sender=Inventory)
+def refresh_sellable_inventory(sender, instance, **kwargs):
+    stock.refresh_inventory(instance.id)
+
+
+@receiver(post_save, sender=Product)
+def refresh_sellable_product(sender, instance, created, **kwargs):
+    if not created:
+        stock.refresh_product(instance.id)
+
+
+@receiver(post_save, sender=Location)
+def refresh_sellable_location(sender, instance, created, **kwargs):
+    if not created:
+        stock.refresh_location(instance.id)
@@ -0,0 +1,81 @@
+"""
+Maintenance of the SellableStock read model.
+
+Every function runs in the caller's transaction, so a signal fired inside an
+atomic block (commit_cart, the stock forms) changes the read model together
+with the rows it mirrors.
+"""
+
+from django.db import transaction
+
+from inventory.models import Inventory
+from .models import SellableStock
+
+# Locations whose stock can be sold at checkout
+SHOPFLOOR = "Shopfloor"
+_FIELDS = ("product_id", "name", "manufacturer", "normalized_barcode", "quantity")
+
+
+def _sellable(inventory):
+    """Inventory rows from `inventory` that belong in the read model."""
+    return inventory.filter(location__name__icontains=SHOPFLOOR, quantity__gt=0)
+
+
+def _rows(inventory):
+    return [
+        SellableStock(
+            inventory_id=inventory_id,
+            product_id=product_id,
+            name=name,
+            manufacturer=manufacturer,
+            normalized_barcode=barcode,
+            quantity=quantity,
+        )
+        for inventory_id, product_id, name, manufacturer, barcode, quantity in (
+            _sellable(inventory).values_list(
+                "id",
+                "product_id",
+                "product__name",
+                "product__manufacturer",
+                "product__normalized_barcode",
+                "quantity",
+            )
+        )
+    ]
+
+
+def refresh(inventory):
+    """Bring the read model in line for the rows of an Inventory queryset."""
+    rows = _rows(inventory)
+    # No savepoint: inside commit_cart this is part of the order's transaction
+    with transaction.atomic(savepoint=False):
+        SellableStock.objects.filter(inventory__in=inventory.values("id")).exclude(
+            inventory_id__in=[row.inventory_id for row in rows]
+        ).delete()
+        SellableStock.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["inventory"],
+            update_fields=_FIELDS,
+        )
+
+
+def refresh_inventory(*inventory_ids):
+    refresh(Inventory.objects.filter(id__in=inventory_ids))
+
+
+def refresh_product(product_id):
+    refresh(Inventory.objects.filter(product_id=product_id))
+
+
+def refresh_location(location_id):
+    refresh(Inventory.objects.filter(location_id=location_id))
+
+
+def rebuild(batch_size=5000):
+    """Recreate the whole read model from Inventory; returns the row count."""
+    with transaction.atomic():
+        SellableStock.objects.all().delete()
+        rows = _rows(Inventory.objects.all())
+        SellableStock.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
@@ -8,5 +8,7 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("process/", views.process_order, name="process_order"),
     path("recent/", views.recent_orders, name="recent_orders"),
+    path("reports/", views.reports, name="reports"),
     path("remove/", views.remove_from_cart, name="remove_from_cart"),
+    path("search/", views.search, name="search"),
 ]
@@ -1,12 +1,27 @@
 from django.shortcuts import render, redirect
+from django.core.cache import cache
+from django.http import JsonResponse
 from django.contrib import messages
-from django.db import models
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
+import hashlib
 from django.contrib.auth.decorators import login_required, permission_required
-from inventory.models import Inventory, normalize_barcode
-from .models import Order
+from _core.views import group_required
+from inventory.search import match_tokens, search_inventory
+from .models import Order, SellableStock
 from .forms import AddToCartForm, ProcessOrderForm
+from .orders import InsufficientStock
+from . import barcode_index, rollups
+from . import cart as cart_store
+
+# Typeahead search: rows per page, most rows returned for one term, and how
+# long a term's ranked ids are reused
+SEARCH_PAGE_SIZE = 25
+SEARCH_MAX_RESULTS = 200
+SEARCH_CACHE_SECONDS = 30
+# Windows, in days, the usage report can cover
+REPORT_WINDOWS = (30, 90, 365)
 
 
 def index(request):
@@ -15,25 +30,30 @@ def index(request):
         barcode = request.POST.get("barcode")
         if barcode:
             try:
-                # Find the inventory item with matching barcode
-                inventory_item = Inventory.objects.filter(
-                    product__normalized_barcode=normalize_barcode(barcode),
-                    location__name__icontains="Shopfloor",
-                    quantity__gt=0,
-                ).first()
-
-                if inventory_item:
+                # Find the Shopfloor inventory item with matching barcode
+                entry = barcode_index.lookup(barcode)
+
+                if entry:
                     # Prepare data for the form
                     form_data = {
-                        "product_id": str(inventory_item.id),
+                        "product_id": str(entry.inventory_id),
                         "quantity": request.POST.get("quantity", 1),
                     }
-                    form = AddToCartForm(form_data, cart=get_cart(request))
+                    form = AddToCartForm(
+                        form_data,
+                        cart_key=cart_store.get_key(request.session, create=True),
+                        barcode=barcode,
+                    )
                     if form.is_valid():
-                        request.session["cart"] = form.save()
-                        messages.success(
-                            request, f"Added {inventory_item.product.name} to cart."
-                        )
+                        try:
+                            form.save()
+                            messages.success(
+                                request, f"Added {entry.product_name} to cart."
+                            )
+                        except ValidationError as e:
+                            # Another till took the stock after the check
+                            for error in e.messages:
+                                messages.error(request, error)
                     else:
                         for error in form.non_field_errors():
                             messages.error(request, error)
@@ -45,12 +65,18 @@ def index(request):
                 return redirect("checkout:index")
 
         # Handle normal add to cart (from product list)
-        form = AddToCartForm(request.POST, cart=get_cart(request))
+        form = AddToCartForm(
+            request.POST, cart_key=cart_store.get_key(request.session, create=True)
+        )
         if form.is_valid():
             try:
-                # Update cart in session
-                request.session["cart"] = form.save()
+                # Add to the stored cart; the session only holds its key
+                form.save()
                 messages.success(request, "Item added to cart.")
+            except ValidationError as e:
+                # Another till took the stock after the form was checked
+                for error in e.messages:
+                    messages.error(request, error)
             except Exception as e:
                 messages.error(request, str(e))
         else:
@@ -60,20 +86,64 @@ def index(request):
 
     # Handle GET request
     filter_term = request.GET.get("filter", "")
-    inventory_items = Inventory.objects.filter(
-        (
-            models.Q(product__name__icontains=filter_term)
-            | models.Q(product__manufacturer__icontains=filter_term)
+    inventory_items = search_inventory(_sellable_inventory(), filter_term)
+    return render(request, "checkout/index.html", {"inventory_items": inventory_items})
+
+
+def _sellable_inventory():
+    """Stock that can be added to a cart from the product list."""
+    return SellableStock.objects.all()
+
+
+def search(request):
+    """
+    JSON typeahead search over sellable stock for the checkout product list.
+
+    The ranked ids for a normalized term are cached briefly; the rows for the
+    requested page are always read fresh so quantities are current.
+    """
+    term = " ".join(match_tokens(request.GET.get("q", ""))).lower()
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    cache_key = f"checkout:search:{hashlib.md5(term.encode()).hexdigest()}"
+    ids = cache.get(cache_key)
+    if ids is None:
+        ids = list(
+            search_inventory(_sellable_inventory(), term).values_list("pk", flat=True)[
+                :SEARCH_MAX_RESULTS
+            ]
         )
-        & models.Q(location__name__icontains="Shopfloor")
-        & models.Q(quantity__gt=0)
+        cache.set(cache_key, ids, SEARCH_CACHE_SECONDS)
+
+    start = (page - 1) * SEARCH_PAGE_SIZE
+    page_ids = ids[start : start + SEARCH_PAGE_SIZE]
+    rows = _sellable_inventory().in_bulk(page_ids)
+    results = [
+        {
+            "id": item.inventory_id,
+            "name": item.name,
+            "manufacturer": item.manufacturer,
+            "quantity": item.quantity,
+        }
+        for item in (rows.get(item_id) for item_id in page_ids)
+        if item is not None
+    ]
+    return JsonResponse(
+        {
+            "query": term,
+            "page": page,
+            "has_next": start + SEARCH_PAGE_SIZE < len(ids),
+            "results": results,
+        }
     )
-    return render(request, "checkout/index.html", {"inventory_items": inventory_items})
 
 
 def get_cart(request):
-    """Retrieve the cart from the session."""
-    return request.session.get("cart", {})
+    """Retrieve the cart as {inventory_id: quantity}."""
+    return cart_store.quantities(cart_store.get_key(request.session))
 
 
 def remove_from_cart(request):
@@ -81,13 +151,9 @@ def remove_from_cart(request):
     if request.method == "POST":
         product_id = request.POST.get("product_id")
         if product_id:
-            # Get the current cart
-            cart = get_cart(request)
-
+            key = cart_store.get_key(request.session)
             # Remove the item if it exists in the cart
-            if product_id in cart:
-                del cart[product_id]
-                request.session["cart"] = cart
+            if key and product_id.isdigit() and cart_store.remove(key, int(product_id)):
                 messages.success(request, "Item removed from cart.")
             else:
                 messages.error(request, "Item not found in cart.")
@@ -96,21 +162,29 @@ def remove_from_cart(request):
 
 
 def process_order(request):
-    """Process the order based on the cart in the session."""
-    cart = get_cart(request)
+    """Process the order based on the stored cart."""
+    key = cart_store.get_key(request.session)
 
     if request.method == "POST":
-        form = ProcessOrderForm(request.POST, cart=cart, request=request)
+        form = ProcessOrderForm(
+            request.POST,
+            cart=cart_store.quantities(key),
+            cart_key=key,
+            request=request,
+        )
         if form.is_valid():
             try:
+                # Empties the cart in the same transaction as the order
                 order = form.save()
-                # Clear the cart after successful order
-                del request.session["cart"]
                 messages.success(
                     request,
                     f"Order #{order.order_number} processed successfully for user {order.implicit_id}",
                 )
                 return redirect("index")
+            except InsufficientStock as e:
+                # Report every short line, not just the first one
+                for error in e.messages:
+                    messages.error(request, error)
             except Exception as e:
                 messages.error(request, str(e))
         else:
@@ -138,3 +212,35 @@ def recent_orders(request):
     return render(
         request, "checkout/recent_orders.html", {"recent_orders": recent_orders}
     )
+
+
+@login_required
+@group_required("Shop Manager", "Admins")
+def reports(request):
+    """Usage over the chosen window and month by month, from the rollups."""
+    try:
+        days = int(request.GET.get("days", 30))
+    except ValueError:
+        days = 30
+    if days not in REPORT_WINDOWS:
+        days = 30
+    since = rollups.window_start(days)
+    hours = rollups.by_hour(since)
+    months = rollups.year_over_year()
+    return render(
+        request,
+        "checkout/reports.html",
+        {
+            "days": days,
+            "windows": REPORT_WINDOWS,
+            "since": since,
+            "totals": rollups.totals(since),
+            "hours": hours,
+            "busiest_hour": max([row["order_count"] for row in hours], default=0),
+            "products": rollups.top_products(since),
+            "months": months,
+            "busiest_month": max(
+                [max(row["items"], row["prior_items"]) for row in months]
+            ),
+        },
+    )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Location, Inventory
+from .models import Product, Location, Inventory, StockMovement
 
 
 @admin.register(Product)
@@ -23,3 +23,21 @@ class InventoryAdmin(admin.ModelAdmin):
     list_filter = ("location", "product__active")
     search_fields = ("product__name", "product__manufacturer", "location__name")
     raw_id_fields = ("product", "location")
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("created", "product", "location", "delta", "reason", "user")
+    list_filter = ("reason", "location")
+    search_fields = ("product__name", "source")
+    raw_id_fields = ("product", "location", "user")
+
+    # The ledger is append-only, and written only alongside stock changes
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
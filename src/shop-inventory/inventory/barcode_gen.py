@@ -1,80 +1,111 @@
+import os
 import uuid
 import qrcode
 from PIL import Image
 from io import BytesIO
-from PyPDF2 import PdfMerger
+from concurrent.futures import ProcessPoolExecutor
 import logging
 from tqdm import tqdm
 
+# Constants
+DPI = 600
+PAGE_WIDTH = int(8.5 * DPI)
+PAGE_HEIGHT = int(11.0 * DPI)
+# designed for Avery Presta 94503
+BARCODE_SIZE = int(0.3 * DPI)
+BARCODE_SPACING_X = int(0.72 * DPI)
+BARCODE_SPACING_Y = int(0.69 * DPI)
+BARCODE_OFFSET_X = int(0.53 * DPI)
+BARCODE_OFFSET_Y = int(0.91 * DPI)
 
-def barcode_page_generation(rows: int = 14, cols: int = 11, pages: int = 1) -> bytes:
-    logger = logging.getLogger(__name__)
-    logger.info(
-        f"Starting barcode generation: {pages} pages, {rows}x{cols} barcodes per page"
-    )
+# One QR encoder per process, reused for every code that process draws
+_qr = None
 
-    # Constants
-    dpi = 600
-    page_width = int(8.5 * dpi)
-    page_height = int(11.0 * dpi)
-    # designed for Avery Presta 94503
-    barcode_size = int(0.3 * dpi)
-    barcode_spacing_x = int(0.72 * dpi)
-    barcode_spacing_y = int(0.69 * dpi)
-    barcode_offset_x = int(0.53 * dpi)
-    barcode_offset_y = int(0.91 * dpi)
 
-    # Create QR code generator with fixed settings
-    qr = qrcode.QRCode(
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        border=0,
-    )
+def _encoder():
+    global _qr
+    if _qr is None:
+        _qr = qrcode.QRCode(
+            error_correction=qrcode.constants.ERROR_CORRECT_L,
+            border=0,
+        )
+    return _qr
+
+
+def _render_code(data):
+    """Draw one QR code at the largest whole-pixel module size that fits."""
+    qr = _encoder()
+    qr.clear()
+    qr.add_data(data)
+    qr.make(fit=True)
+    # Draw modules at their final size instead of resizing a larger image
+    qr.box_size = max(BARCODE_SIZE // qr.modules_count, 1)
+    return qr.make_image(fill_color="black", back_color="white").get_image()
 
-    # Create PDF merger for multiple pages
-    merger = PdfMerger()
 
-    # Reuse BytesIO object for pages
-    page_bytes = BytesIO()
+def _render_page(rows, cols):
+    """Render one sheet of fresh UUID codes; returns packed 1-bit pixel data."""
+    sheet_img = Image.new("1", (PAGE_WIDTH, PAGE_HEIGHT), 1)
+    for row in range(rows):
+        for col in range(cols):
+            barcode_img = _render_code(uuid.uuid4().hex)
+            # Centre the code in its label, as the old resize to BARCODE_SIZE did
+            margin = (BARCODE_SIZE - barcode_img.size[0]) // 2
+            sheet_img.paste(
+                barcode_img,
+                (
+                    BARCODE_OFFSET_X + col * BARCODE_SPACING_X + margin,
+                    BARCODE_OFFSET_Y + row * BARCODE_SPACING_Y + margin,
+                ),
+            )
+    return sheet_img.tobytes()
 
-    # Calculate total number of barcodes
-    total_barcodes = rows * cols * pages
 
-    # Create progress bar
-    with tqdm(total=total_barcodes, desc="Generating barcodes") as pbar:
-        for page in range(pages):
-            logger.info(f"Generating page {page + 1} of {pages}")
-            sheet_img = Image.new("1", (page_width, page_height), 1)
+def barcode_page_generation(
+    rows: int = 14,
+    cols: int = 11,
+    pages: int = 1,
+    workers: int | None = None,
+    progress=None,
+) -> bytes:
+    logger = logging.getLogger(__name__)
+    logger.info(
+        f"Starting barcode generation: {pages} pages, {rows}x{cols} barcodes per page"
+    )
 
-            for row in range(rows):
-                for col in range(cols):
-                    id = uuid.uuid4()
-                    qr.clear()
-                    qr.add_data(id.hex)
-                    qr.make(fit=True)
-                    barcode_img = qr.make_image(fill_color="black", back_color="white")
-                    barcode_img = barcode_img.resize((barcode_size, barcode_size))
+    if workers is None:
+        workers = max(min(pages, os.cpu_count() or 1), 1)
 
-                    sheet_img.paste(
-                        barcode_img,
-                        (
-                            barcode_offset_x + col * barcode_spacing_x,
-                            barcode_offset_y + row * barcode_spacing_y,
-                        ),
+    page_images = []
+    with tqdm(total=pages, desc="Generating barcode pages") as pbar:
+        if workers > 1:
+            # Pages are independent, so render them in parallel processes
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for data in pool.map(_render_page, [rows] * pages, [cols] * pages):
+                    page_images.append(
+                        Image.frombytes("1", (PAGE_WIDTH, PAGE_HEIGHT), data)
                     )
                     pbar.update(1)
+                    if progress:
+                        progress(len(page_images), pages)
+        else:
+            for page in range(pages):
+                logger.info(f"Generating page {page + 1} of {pages}")
+                data = _render_page(rows, cols)
+                page_images.append(
+                    Image.frombytes("1", (PAGE_WIDTH, PAGE_HEIGHT), data)
+                )
+                pbar.update(1)
+                if progress:
+                    progress(len(page_images), pages)
 
-            # Clear and reuse BytesIO for each page
-            page_bytes.truncate(0)
-            page_bytes.seek(0)
-            sheet_img.save(page_bytes, "PDF", resolution=dpi)
-            page_bytes.seek(0)
-            merger.append(page_bytes)
-
-    logger.info("Merging pages and finalizing PDF")
-    # Get final merged PDF
+    logger.info("Writing multi-page PDF")
     final_bytes = BytesIO()
-    merger.write(final_bytes)
-    merger.close()
-
-    final_bytes.seek(0)
+    page_images[0].save(
+        final_bytes,
+        "PDF",
+        resolution=DPI,
+        save_all=True,
+        append_images=page_images[1:],
+    )
     return final_bytes.getvalue()
@@ -0,0 +1,11 @@
+from .barcode_gen import barcode_page_generation
+
+LABEL_SHEET_PAGES = 10
+
+
+def qrcode_sheet(job, progress):
+    """Background task: render a PDF of blank QR label sheets."""
+    pages = job.params.get("pages", LABEL_SHEET_PAGES)
+    progress(0, pages, "Rendering label pages")
+    pdf = barcode_page_generation(pages=pages, progress=progress)
+    return "qr_labels.pdf", pdf
@@ -0,0 +1,202 @@
+"""
+Stock movement ledger and point-in-time stock.
+
+Every change the app makes to Inventory.quantity is recorded as a
+StockMovement in the same transaction as the change (record, record_many);
+apply makes a change and records it in one step.
+Snapshots fold the ledger periodically: take_snapshot writes the current
+quantity of each product/location pair that changed since the previous
+snapshot. Stock at a past moment is then the newest snapshot line for each
+pair plus the short tail of movements after that snapshot, not a replay of
+the whole ledger.
+
+Changes made outside the app (the admin, bulk loads) have no movement; the
+next snapshot picks up their result.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .models import Inventory, StockMovement, StockSnapshot, StockSnapshotLine
+
+BATCH_SIZE = 5000
+
+
+def _user(user):
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+def movement(inventory, delta, reason, user=None, source=""):
+    """An unsaved StockMovement for a change of `delta` to an inventory row."""
+    return StockMovement(
+        product_id=inventory.product_id,
+        location_id=inventory.location_id,
+        delta=delta,
+        reason=reason,
+        user=_user(user),
+        source=source[:32],
+    )
+
+
+def record(inventory, delta, reason, user=None, source=""):
+    """Record one change; call inside the transaction that makes it."""
+    if not delta:
+        return None
+    entry = movement(inventory, delta, reason, user, source)
+    entry.save()
+    return entry
+
+
+def record_many(movements):
+    """Record several changes with one insert."""
+    StockMovement.objects.bulk_create(
+        [m for m in movements if m.delta], batch_size=BATCH_SIZE
+    )
+
+
+def apply(product_id, location_id, delta, reason, user=None, source="", create=False):
+    """
+    Add `delta` to the quantity of a product at a location and record it.
+
+    The change is made in the database (quantity = quantity + delta, only
+    while that stays at or above zero) rather than written back from a value
+    read earlier, so a sale committed in between is not overwritten. The
+    UPDATE is the transaction's first statement, so it takes SQLite's write
+    lock before anything is read. With `create`, a missing row is created
+    holding `delta`.
+
+    Returns (inventory, created), or (None, False) if there is no row or the
+    change would take it below zero.
+    """
+    with transaction.atomic():
+        rows = Inventory.objects.filter(product_id=product_id, location_id=location_id)
+        created = False
+        if rows.filter(quantity__gte=-delta).update(quantity=F("quantity") + delta):
+            inventory = rows.select_related("product", "location").get()
+            # update() sends no post_save; send it so the checkout read models
+            # follow the new quantity as they would after a save()
+            post_save.send(
+                sender=Inventory,
+                instance=inventory,
+                created=False,
+                update_fields=frozenset(["quantity"]),
+                raw=False,
+                using=inventory._state.db,
+            )
+        elif create and delta >= 0 and not rows.exists():
+            inventory = Inventory.objects.create(
+                product_id=product_id, location_id=location_id, quantity=delta
+            )
+            created = True
+        else:
+            return None, False
+        record(inventory, delta, reason, user, source)
+    return inventory, created
+
+
+def _latest_lines(snapshot_id, **filters):
+    """{(product_id, location_id): quantity} as of a snapshot."""
+    newest = (
+        StockSnapshotLine.objects.filter(
+            product=OuterRef("product"),
+            location=OuterRef("location"),
+            snapshot_id__lte=snapshot_id,
+        )
+        .order_by("-snapshot_id")
+        .values("id")[:1]
+    )
+    lines = StockSnapshotLine.objects.filter(
+        snapshot_id__lte=snapshot_id, id=Subquery(newest), **filters
+    )
+    return {
+        (product_id, location_id): quantity
+        for product_id, location_id, quantity in lines.values_list(
+            "product_id", "location_id", "quantity"
+        )
+    }
+
+
+def take_snapshot():
+    """
+    Snapshot the pairs whose quantity changed since the last snapshot.
+
+    Returns (snapshot, lines written).
+    """
+    with transaction.atomic():
+        last_movement = StockMovement.objects.aggregate(last=Max("id"))["last"] or 0
+        current = {
+            (product_id, location_id): quantity
+            for product_id, location_id, quantity in Inventory.objects.values_list(
+                "product_id", "location_id", "quantity"
+            )
+        }
+        previous = StockSnapshot.objects.order_by("-id").first()
+        known = _latest_lines(previous.id) if previous else {}
+        # Rows deleted since the last snapshot now hold nothing
+        for pair, quantity in known.items():
+            current.setdefault(pair, 0)
+
+        if previous is None:
+            # The first snapshot is the baseline: every pair
+            changed = current
+        else:
+            changed = {
+                pair: quantity
+                for pair, quantity in current.items()
+                if known.get(pair, 0) != quantity
+            }
+
+        snapshot = StockSnapshot.objects.create(last_movement_id=last_movement)
+        lines = [
+            StockSnapshotLine(
+                snapshot=snapshot,
+                product_id=product_id,
+                location_id=location_id,
+                quantity=quantity,
+            )
+            for (product_id, location_id), quantity in changed.items()
+        ]
+        StockSnapshotLine.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+    return snapshot, len(lines)
+
+
+def snapshot_if_due(hours):
+    """Take a snapshot if the newest one is at least `hours` old."""
+    newest = StockSnapshot.objects.order_by("-taken").first()
+    if newest is None or timezone.now() - newest.taken >= timedelta(hours=hours):
+        return take_snapshot()
+    return None
+
+
+def stock_at(when, product=None, location=None):
+    """
+    Quantity of each product at each location at `when`, as
+    {(product_id, location_id): quantity}, leaving out pairs that held
+    nothing. Narrow it with `product` and/or `location`. Returns None if
+    `when` is before the first snapshot, where the ledger has no history.
+    """
+    snapshot = (
+        StockSnapshot.objects.filter(taken__lte=when).order_by("-taken", "-id").first()
+    )
+    if snapshot is None:
+        return None
+    filters = {}
+    if product is not None:
+        filters["product"] = product
+    if location is not None:
+        filters["location"] = location
+
+    stock = _latest_lines(snapshot.id, **filters)
+    tail = StockMovement.objects.filter(
+        id__gt=snapshot.last_movement_id, created__lte=when, **filters
+    ).values_list("product_id", "location_id", "delta")
+    for product_id, location_id, delta in tail:
+        pair = (product_id, location_id)
+        stock[pair] = stock.get(pair, 0) + delta
+    return {pair: quantity for pair, quantity in stock.items() if quantity}
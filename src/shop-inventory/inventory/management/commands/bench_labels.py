@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+import os
+import time
+
+from inventory.barcode_gen import barcode_page_generation
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark QR label sheet generation, rendering pages serially and "
+        "in parallel worker processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=10)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes used for the parallel run",
+        )
+
+    def measure(self, pages, workers):
+        start = time.perf_counter()
+        pdf = barcode_page_generation(pages=pages, workers=workers)
+        return time.perf_counter() - start, len(pdf)
+
+    def handle(self, *args, **options):
+        pages = options["pages"]
+        runs = [("serial", 1), ("parallel", options["workers"])]
+
+        self.stdout.write(f"{pages} label pages per run")
+        self.stdout.write(
+            f"{'run':<10}{'workers':>9}{'seconds':>10}{'pages/s':>10}{'PDF KiB':>10}"
+        )
+        for name, workers in runs:
+            seconds, size = self.measure(pages, workers)
+            self.stdout.write(
+                f"{name:<10}{workers:>9}{seconds:>10.2f}{pages / seconds:>10.2f}"
+                f"{size / 1024:>10.0f}"
+            )
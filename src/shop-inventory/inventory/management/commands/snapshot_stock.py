@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory import ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshot stock quantities that changed since the last snapshot, so "
+        "point-in-time stock needs only the ledger entries after it"
+    )
+
+    def handle(self, *args, **options):
+        snapshot, lines = ledger.take_snapshot()
+        self.stdout.write(f"{snapshot}: {lines} changed quantity row(s)")
@@ -0,0 +1,62 @@
+# Full-text search over product name and manufacturer (SQLite FTS5).
+
+from django.db import migrations
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE inventory_product_fts USING fts5(
+        name,
+        manufacturer,
+        content='inventory_product',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Triggers keep the index in sync with every write, including bulk ones
+    """
+    CREATE TRIGGER inventory_product_fts_insert AFTER INSERT ON inventory_product
+    BEGIN
+        INSERT INTO inventory_product_fts(rowid, name, manufacturer)
+        VALUES (new.id, new.name, new.manufacturer);
+    END
+    """,
+    """
+    CREATE TRIGGER inventory_product_fts_delete AFTER DELETE ON inventory_product
+    BEGIN
+        INSERT INTO inventory_product_fts(
+            inventory_product_fts, rowid, name, manufacturer
+        )
+        VALUES ('delete', old.id, old.name, old.manufacturer);
+    END
+    """,
+    """
+    CREATE TRIGGER inventory_product_fts_update AFTER UPDATE OF name, manufacturer
+    ON inventory_product
+    BEGIN
+        INSERT INTO inventory_product_fts(
+            inventory_product_fts, rowid, name, manufacturer
+        )
+        VALUES ('delete', old.id, old.name, old.manufacturer);
+        INSERT INTO inventory_product_fts(rowid, name, manufacturer)
+        VALUES (new.id, new.name, new.manufacturer);
+    END
+    """,
+    "INSERT INTO inventory_product_fts(inventory_product_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS inventory_product_fts_update",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_delete",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_insert",
+    "DROP TABLE IF EXISTS inventory_product_fts",
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
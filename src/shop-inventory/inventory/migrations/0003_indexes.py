@@ -0,0 +1,26 @@
+# Generated by Django 4.2.25 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0002_product_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inventory",
+            index=models.Index(
+                fields=["location", "quantity"], name="inventory_location_qty_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("active", True)),
+                fields=["name", "manufacturer"],
+                name="product_active_name_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,162 @@
+# Generated by Django 4.2.25 on 2026-10-18 04:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def baseline_snapshot(apps, schema_editor):
+    """Start the ledger's history from the stock on hand today."""
+    Inventory = apps.get_model("inventory", "Inventory")
+    StockSnapshot = apps.get_model("inventory", "StockSnapshot")
+    StockSnapshotLine = apps.get_model("inventory", "StockSnapshotLine")
+    snapshot = StockSnapshot.objects.create(last_movement_id=0)
+    StockSnapshotLine.objects.bulk_create(
+        [
+            StockSnapshotLine(
+                snapshot=snapshot,
+                product_id=product_id,
+                location_id=location_id,
+                quantity=quantity,
+            )
+            for product_id, location_id, quantity in Inventory.objects.values_list(
+                "product_id", "location_id", "quantity"
+            )
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("inventory", "0003_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "taken",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("last_movement_id", models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("delta", models.IntegerField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("restock", "Restock"),
+                            ("correction", "Count correction"),
+                            ("sale", "Sale"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("source", models.CharField(blank=True, max_length=32)),
+                ("created", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="inventory.location",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="inventory.product",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StockSnapshotLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField()),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="inventory.location",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="inventory.product",
+                    ),
+                ),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="inventory.stocksnapshot",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["product", "location", "snapshot"],
+                        name="snapshot_pair_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(baseline_snapshot, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 import re
 
 
@@ -75,6 +77,15 @@ class Product(models.Model):
 
     class Meta:
         unique_together = (("name", "manufacturer"),)
+        # The product pickers list active products by name; this index holds
+        # only those rows, so the listing skips the inactive ones entirely
+        indexes = [
+            models.Index(
+                fields=["name", "manufacturer"],
+                condition=models.Q(active=True),
+                name="product_active_name_idx",
+            ),
+        ]
 
     def __str__(self):
         return "{} ({})".format(self.name, self.manufacturer)
@@ -115,9 +126,92 @@ class Inventory(models.Model):
 
     class Meta:
         unique_together = ("product", "location")
+        # Stock with quantity on hand at a location (the sellable stock read
+        # model is built from the Shopfloor's)
+        indexes = [
+            models.Index(
+                fields=["location", "quantity"], name="inventory_location_qty_idx"
+            )
+        ]
 
     def activate(self):
         """Reactivate this inventory item (currently not used, as Inventory doesn't have active field)."""
         # Note: Inventory model doesn't have an 'active' field
         # This method exists for API consistency but doesn't do anything
         pass
+
+
+class StockMovement(models.Model):
+    """
+    One change to the quantity of a product at a location.
+
+    Append-only: rows are written by inventory.ledger in the same transaction
+    as the Inventory update they describe, and never changed afterwards.
+    """
+
+    RESTOCK = "restock"
+    CORRECTION = "correction"
+    SALE = "sale"
+    REASON_CHOICES = [
+        (RESTOCK, "Restock"),
+        (CORRECTION, "Count correction"),
+        (SALE, "Sale"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="+")
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    # What made the change: a view name, or the order number for a sale
+    source = models.CharField(max_length=32, blank=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.delta:+d} {self.reason} ({self.product_id}@{self.location_id})"
+
+
+class StockSnapshot(models.Model):
+    """
+    The point up to which the ledger has been folded into snapshot lines.
+
+    Taken by `manage.py snapshot_stock` (and daily by run_jobs): every line
+    of this snapshot and all earlier ones together give each product's
+    quantity at each location as of `last_movement_id`.
+    """
+
+    taken = models.DateTimeField(default=timezone.now, db_index=True)
+    last_movement_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Snapshot {self.taken:%Y-%m-%d %H:%M}"
+
+
+class StockSnapshotLine(models.Model):
+    """
+    A quantity as of a snapshot. Only rows that changed since the previous
+    snapshot are written, so most snapshots are small.
+    """
+
+    snapshot = models.ForeignKey(
+        StockSnapshot, on_delete=models.CASCADE, related_name="lines"
+    )
+    # Served by snapshot_pair_idx, which leads with the product
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["product", "location", "snapshot"], name="snapshot_pair_idx"
+            )
+        ]
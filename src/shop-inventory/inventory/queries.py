@@ -0,0 +1,28 @@
+from django.db.models import Q
+from .models import Location, Inventory
+from .search import match_expression, matching_product_ids
+
+
+def inventory_by_location(search_query=None):
+    """
+    Load every location with its inventory rows in a fixed number of queries.
+
+    Returns a dict mapping each Location to a list of its Inventory rows, with
+    `product` and `location` already joined. Locations without matching rows
+    are still included (with an empty list) so the page layout stays stable.
+    """
+    locations = list(Location.objects.all())
+
+    inventory_items = Inventory.objects.select_related("product", "location")
+    if search_query:
+        matches = Q(location__name__icontains=search_query)
+        expression = match_expression(search_query)
+        if expression:
+            matches |= Q(product_id__in=matching_product_ids(expression))
+        inventory_items = inventory_items.filter(matches)
+
+    grouped = {location.id: [] for location in locations}
+    for item in inventory_items.order_by("id"):
+        grouped.setdefault(item.location_id, []).append(item)
+
+    return {location: grouped[location.id] for location in locations}
@@ -0,0 +1,58 @@
+import re
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "inventory_product_fts"
+
+_TOKEN = re.compile(r"\w+")
+
+
+def match_tokens(term):
+    """Split free text into the words used for matching."""
+    return _TOKEN.findall(term or "")
+
+
+def match_expression(term):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix query and all words must match, so
+    "pea but" finds "Peanut Butter". Returns None if the term has no words.
+    """
+    tokens = match_tokens(term)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def matching_product_ids(expression):
+    """Subquery of Product ids matching an FTS5 expression."""
+    return RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (expression,)
+    )
+
+
+def search_inventory(queryset, term):
+    """
+    Filter a queryset of a model with a `product` foreign key (Inventory,
+    SellableStock) to rows whose product matches `term`, best (lowest bm25
+    rank) first. A blank term returns the queryset unchanged.
+    """
+    if not (term or "").strip():
+        return queryset
+    expression = match_expression(term)
+    if expression is None:
+        return queryset.none()
+    meta = queryset.model._meta
+    product_column = f"{meta.db_table}.{meta.get_field('product').column}"
+    # Join the FTS table directly: SQLite drives the query from the full-text
+    # matches and looks each one up by product_id, instead of scanning.
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f"{FTS_TABLE} MATCH %s",
+            f"{FTS_TABLE}.rowid = {product_column}",
+        ],
+        params=[expression],
+        select={"search_rank": f"{FTS_TABLE}.rank"},
+        order_by=["search_rank", "pk"],
+    )
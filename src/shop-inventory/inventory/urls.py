@@ -13,6 +13,7 @@ urlpatterns = [
     path("reactivate_product/", views.reactivate_product, name="reactivate_product"),
     path("reactivate_location/", views.reactivate_location, name="reactivate_location"),
     path("manager/", views.manage_inventory, name="manage_inventory"),
+    path("manager/stats/", views.endpoint_stats, name="endpoint_stats"),
     path("barcodes", views.qrcode_sheet, name="barcodes"),
     path("stock_check/", views.stock_check, name="stock_check"),
     path("stock_update", views.stock_update, name="stock_update"),
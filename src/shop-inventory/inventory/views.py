@@ -1,12 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
 from django.db import IntegrityError
-from .models import Product, Location, Inventory, normalize_barcode
-from django.http import HttpResponse
+from django.views.decorators.http import require_POST
+from django.utils import timezone
+from .models import Product, Location, Inventory, StockMovement, normalize_barcode
+from . import ledger
 from django.core import exceptions as forms
+from _core import jobs, metrics
 from _core.views import group_required
+from datetime import timedelta
 import uuid
 
 from .forms import (
@@ -24,7 +27,7 @@ from .forms import (
     NonBarcodeProductForm,
 )
 
-from .barcode_gen import barcode_page_generation
+from .queries import inventory_by_location
 
 
 @login_required
@@ -32,21 +35,8 @@ from .barcode_gen import barcode_page_generation
 def index(request):
     search_query = request.GET.get("search", None)
 
-    # Get all locations
-    locations = Location.objects.all()
     items_in_location = {}
-
-    for location in locations:
-        # If search query exists, filter inventory items for this location
-        if search_query:
-            inventory_items = Inventory.objects.filter(
-                Q(product__name__icontains=search_query)
-                | Q(location__name__icontains=search_query),
-                location=location,
-            )
-        else:
-            inventory_items = Inventory.objects.filter(location=location)
-
+    for location, inventory_items in inventory_by_location(search_query).items():
         # Store the inventory items as 'list' attribute for the location
         location.list = inventory_items
         items_in_location[location] = location
@@ -59,10 +49,7 @@ def index(request):
 @login_required
 @group_required("Shop Employee", "Shop Manager", "Admins")
 def stock_check(request):
-    locations = Location.objects.all()
-    items_in_location = {}
-    for location in locations:
-        items_in_location[location] = Inventory.objects.filter(location=location)
+    items_in_location = inventory_by_location()
     return render(
         request, "inventory/stock_check.html", {"items_in_location": items_in_location}
     )
@@ -76,23 +63,29 @@ def stock_update(request):
         if form.is_valid():
             item = Inventory.objects.get(id=form.cleaned_data["item_id"])
             try:
-                new_quantity = item.quantity + form.cleaned_data["delta_qty"]
-                if new_quantity < 0:
+                # The quantity is read back after the change, not before it
+                updated, _ = ledger.apply(
+                    item.product_id,
+                    item.location_id,
+                    form.cleaned_data["delta_qty"],
+                    StockMovement.CORRECTION,
+                    request.user,
+                    "stock_update",
+                )
+                if updated is None:
                     messages.error(
                         request, f"Cannot reduce quantity below 0 for {item}"
                     )
                 else:
-                    item.quantity = new_quantity
-                    # If product is inactive and quantity reaches 0, deactivate inventory item
-                    if new_quantity == 0 and not item.product.active:
-                        item.active = False
+                    # The last of a product marked for removal is gone
+                    if updated.quantity == 0 and not updated.product.active:
                         messages.info(
                             request,
-                            f"{item} has been deactivated as its product was marked for removal.",
+                            f"{updated} is now out of stock, and its product "
+                            "is deactivated.",
                         )
-                    item.save()
                     messages.success(
-                        request, f"{item} updated to quantity {new_quantity}."
+                        request, f"{updated} updated to quantity {updated.quantity}."
                     )
             except Exception as e:
                 messages.error(request, f"{item} could not be updated: {str(e)}")
@@ -118,15 +111,17 @@ def add_nonbarcode_product(request):
                 defaults={"barcode": str(uuid.uuid4().hex)},
             )
 
-            # Product exists, find or create inventory entry
-            inventory, inventory_created = Inventory.objects.get_or_create(
-                product=product, location=location, defaults={"quantity": 0}
+            # Find or create the inventory entry and add to it
+            ledger.apply(
+                product.id,
+                location.id,
+                quantity,
+                StockMovement.RESTOCK,
+                request.user,
+                "add_product",
+                create=True,
             )
 
-            # Update the quantity
-            inventory.quantity += quantity
-            inventory.save()
-
             action_text = "Added to existing product"
             if product_created:
                 action_text = "Created new product entry and added to inventory"
@@ -239,12 +234,39 @@ def manage_inventory(request):
     return render(request, "inventory/manage_inventory.html")
 
 
+# Windows offered on the endpoint stats page, in hours
+STATS_WINDOWS = (1, 24, 24 * 7)
+
+
+@login_required
+@group_required("Shop Manager", "Admins")
+def endpoint_stats(request):
+    """Slowest endpoints by p95 latency over the chosen window."""
+    try:
+        hours = int(request.GET.get("hours", 24))
+    except ValueError:
+        hours = 24
+    if hours not in STATS_WINDOWS:
+        hours = 24
+    # Include this worker's latest requests
+    metrics.flush()
+    since = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=hours - 1
+    )
+    return render(
+        request,
+        "inventory/endpoint_stats.html",
+        {"stats": metrics.summary(since), "hours": hours, "windows": STATS_WINDOWS},
+    )
+
+
 @login_required
 @group_required("Shop Employee", "Shop Manager", "Admins")
+@require_POST
 def qrcode_sheet(request):
-    result = barcode_page_generation(pages=10)
-    response = HttpResponse(result, content_type="application/pdf")
-    return response
+    # Rendering takes several seconds, so hand it to the job worker
+    job = jobs.enqueue("qrcode_sheet", user=request.user)
+    return redirect("job_detail", job_id=job.id)
 
 
 @login_required
@@ -498,15 +520,17 @@ def _handle_add_quantity(request):
     if form.is_valid():
         quantity = form.cleaned_data["quantity"]
         try:
-            # Use get_or_create instead of get to handle both cases
-            inventory_item, created = Inventory.objects.get_or_create(
-                product=product, location=selected_location, defaults={"quantity": 0}
+            # Handles both an existing inventory item and a new one
+            inventory_item, created = ledger.apply(
+                product.id,
+                selected_location.id,
+                quantity,
+                StockMovement.RESTOCK,
+                request.user,
+                "add_item_to_location",
+                create=True,
             )
 
-            # Update the quantity
-            inventory_item.quantity += quantity
-            inventory_item.save()
-
             action_text = (
                 "Added" if not created else "Created new inventory item and added"
             )
@@ -18,7 +18,15 @@ python manage.py collectstatic --noinput
 echo "Migrating database"
 python manage.py migrate --noinput
 
+# Start the background job worker (label sheets, backups, and hourly cleanup
+# of expired sessions and abandoned carts). It is a child of this service, so
+# stopping the service stops it along with gunicorn.
+echo "Starting job worker"
+python manage.py run_jobs >> "${APP_LOG_DIR}/jobs.log" 2>&1 &
+
 # Start Gunicorn
+# Workers keep their database connection for DJANGO_CONN_MAX_AGE seconds;
+# --max-requests recycling closes it along with the worker.
 exec gunicorn _core.wsgi:application \
     --name shop_inventory \
     --bind unix:"${APP_RUN_DIR}/pantry.sock" \
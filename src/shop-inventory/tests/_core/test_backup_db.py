@@ -0,0 +1,235 @@
+import pytest
+import os
+import sqlite3
+from io import StringIO
+import pyzipper
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from _core.management.commands import backup_db
+from _core.management.commands.backup_db import snapshot_database
+
+PASSWORD = "backup-test-password"
+
+
+@pytest.fixture
+def live_db(tmp_path):
+    """A WAL-mode database with an uncheckpointed write still in the WAL."""
+    path = tmp_path / "live.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    conn.execute("CREATE TABLE stock (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany(
+        "INSERT INTO stock (name) VALUES (?)", ((f"Item {i}",) for i in range(2000))
+    )
+    conn.commit()
+    yield path
+    conn.close()
+
+
+@pytest.fixture
+def backup_drive(tmp_path, monkeypatch, settings, live_db):
+    drive = tmp_path / "mounts" / "usb"
+    drive.mkdir(parents=True)
+    (drive / ".shopbackup").touch()
+    monkeypatch.setenv("BACKUP_MOUNT_DIR", str(tmp_path / "mounts"))
+    monkeypatch.setenv("DJANGO_BACKUP_PASSWORD", PASSWORD)
+    monkeypatch.setitem(settings.DATABASES["default"], "NAME", live_db)
+    return drive
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM stock").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _rows(data, tmp_path):
+    # Restore the snapshot as a file, as a real restore would
+    path = tmp_path / "restored.sqlite3"
+    path.write_bytes(data)
+    return _count(path)
+
+
+def test_snapshot_includes_wal_contents(live_db, tmp_path):
+    """Test the snapshot sees committed rows that are still only in the WAL"""
+    path = tmp_path / "snapshot.sqlite3"
+    size = snapshot_database(live_db, path, step_pages=4, step_sleep=0)
+    assert size == path.stat().st_size
+    assert _count(path) == 2000
+
+
+def test_snapshot_restarts_fall_back_to_one_step(
+    live_db, monkeypatch, tmp_path, caplog
+):
+    """Test a database that keeps changing is still copied"""
+    monkeypatch.setattr(backup_db, "BACKUP_MAX_RESTARTS", 0)
+    writer = sqlite3.connect(live_db, isolation_level=None)
+
+    def write_between_steps(seconds):
+        writer.execute("INSERT INTO stock (name) VALUES ('new')")
+
+    monkeypatch.setattr(backup_db.time, "sleep", write_between_steps)
+    path = tmp_path / "snapshot.sqlite3"
+    snapshot_database(live_db, path, step_pages=1, step_sleep=0)
+    writer.close()
+    assert _count(path) >= 2000
+    assert "finishing backup in one step" in caplog.text
+
+
+def test_snapshot_rejects_corrupt_database(tmp_path):
+    """Test a snapshot that fails integrity_check raises CommandError"""
+    path = tmp_path / "corrupt.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+    conn.execute("CREATE INDEX t_v ON t (v)")
+    conn.executemany("INSERT INTO t (v) VALUES (?)", ((f"v{i}",) for i in range(50)))
+    conn.commit()
+    # Point the index at a different column so its entries no longer match
+    conn.execute("PRAGMA writable_schema=ON")
+    conn.execute(
+        "UPDATE sqlite_master SET sql = 'CREATE INDEX t_v ON t (id)' WHERE name = 't_v'"
+    )
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(CommandError, match="integrity check"):
+        snapshot_database(path, tmp_path / "snapshot.sqlite3", step_sleep=0)
+
+
+def test_backup_writes_encrypted_snapshot(backup_drive, tmp_path):
+    """Test the command writes the snapshot into an encrypted archive"""
+    call_command("backup_db", "--step-sleep", "0")
+    archives = list(backup_drive.glob("shop_backup_*.zip"))
+    assert len(archives) == 1
+    assert not list(backup_drive.glob("*.partial"))
+    # The snapshot taken beside the database is removed afterwards
+    assert not list(tmp_path.glob("tmp*"))
+    with pyzipper.AESZipFile(archives[0]) as zf:
+        zf.setpassword(PASSWORD.encode())
+        assert _rows(zf.read("db.sqlite3"), tmp_path) == 2000
+
+
+@pytest.fixture
+def second_drive(backup_drive):
+    drive = backup_drive.parent / "usb2"
+    drive.mkdir()
+    (drive / ".shopbackup").touch()
+    return drive
+
+
+def test_backup_builds_archive_once_for_all_drives(
+    backup_drive, second_drive, monkeypatch
+):
+    """Test one archive is built and copied identically to every drive"""
+    builds = []
+    real_build = backup_db.build_archive
+    monkeypatch.setattr(
+        backup_db,
+        "build_archive",
+        lambda *args: builds.append(args) or real_build(*args),
+    )
+    out = StringIO()
+    call_command("backup_db", "--step-sleep", "0", stdout=out)
+    assert len(builds) == 1
+    first, second = (
+        next(drive.glob("shop_backup_*.zip")) for drive in (backup_drive, second_drive)
+    )
+    assert first.read_bytes() == second.read_bytes()
+    assert "MB/s" in out.getvalue()
+    assert "2 of 2 drive(s)" in out.getvalue()
+
+
+def test_backup_continues_past_a_failed_drive(backup_drive, second_drive, monkeypatch):
+    """Test a failing drive does not stop the others and fails a job"""
+    real_copy = backup_db.copy_verified
+
+    def copy(source, dest, sha256):
+        if str(second_drive) in dest:
+            raise OSError("drive removed")
+        return real_copy(source, dest, sha256)
+
+    monkeypatch.setattr(backup_db, "copy_verified", copy)
+    with pytest.raises(CommandError, match="usb2"):
+        call_command("backup_db", "--step-sleep", "0", progress=lambda *a, **k: None)
+    assert list(backup_drive.glob("shop_backup_*.zip"))
+    assert not list(second_drive.glob("shop_backup_*"))
+
+
+def test_copy_verified_rejects_checksum_mismatch(tmp_path):
+    """Test a copy that does not read back correctly is not kept"""
+    source = tmp_path / "source.zip"
+    source.write_bytes(b"archive")
+    dest = tmp_path / "dest.zip"
+    with pytest.raises(OSError, match="Checksum mismatch"):
+        backup_db.copy_verified(str(source), str(dest), "0" * 64)
+    assert not dest.exists()
+    assert not (tmp_path / "dest.zip.partial").exists()
+
+
+@pytest.fixture
+def mount_dir(tmp_path, monkeypatch):
+    root = tmp_path / "discover"
+    root.mkdir()
+    monkeypatch.setenv("BACKUP_MOUNT_DIR", str(root))
+    return root
+
+
+def _marked(path):
+    path.mkdir(parents=True)
+    (path / ".shopbackup").touch()
+    return str(path)
+
+
+def test_discovery_respects_max_depth(mount_dir):
+    """Test drives deeper than max_depth are not searched for"""
+    shallow = _marked(mount_dir / "usb" / "backups")
+    _marked(mount_dir / "usb2" / "a" / "b" / "c")
+    command = backup_db.Command()
+    assert command.find_backup_drives(max_depth=2) == [shallow]
+
+
+def test_discovery_skips_heavy_and_marked_directories(mount_dir):
+    """Test heavy folders and folders inside a found drive are not searched"""
+    drive = _marked(mount_dir / "usb")
+    _marked(mount_dir / "usb" / "nested")
+    _marked(mount_dir / "photos" / "DCIM")
+    _marked(mount_dir / "photos" / ".Trash-1000")
+    command = backup_db.Command()
+    assert command.find_backup_drives(max_depth=3) == [drive]
+
+
+def test_discovery_ignores_symlinks(mount_dir, tmp_path):
+    """Test symlinked directories are not followed"""
+    elsewhere = _marked(tmp_path / "elsewhere")
+    (mount_dir / "link").symlink_to(elsewhere)
+    assert backup_db.Command().find_backup_drives() == []
+
+
+def test_discovery_timeout_logs(mount_dir, caplog):
+    """Test discovery stops at its timeout with a clear log line"""
+    _marked(mount_dir / "usb")
+    assert backup_db.Command().find_backup_drives(timeout=-1) == []
+    assert "discovery timed out" in caplog.text
+
+
+def test_dry_run_reports_drives_without_backing_up(mount_dir, monkeypatch):
+    """Test --dry-run lists drives and discovery time and writes nothing"""
+    monkeypatch.delenv("DJANGO_BACKUP_PASSWORD", raising=False)
+    drive = _marked(mount_dir / "usb")
+    out = StringIO()
+    call_command("backup_db", "--dry-run", stdout=out)
+    assert drive in out.getvalue()
+    assert "Found 1 backup drive(s) in" in out.getvalue()
+    assert os.listdir(drive) == [".shopbackup"]
+
+
+@pytest.mark.parametrize("keep", ["0", "-1"])
+def test_keep_must_be_at_least_one(backup_drive, keep):
+    """Test --keep below 1 is rejected before any drive is touched"""
+    with pytest.raises(CommandError, match="at least 1"):
+        call_command("backup_db", "--keep", keep, "--step-sleep", "0")
+    assert os.listdir(backup_drive) == [".shopbackup"]
@@ -0,0 +1,196 @@
+import pytest
+import io
+import json
+import os
+import sqlite3
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from _core import backup_store
+from _core.backup_store import STORE_DIRNAME, BackupStoreError, ChunkStore
+
+PASSWORD = "backup-test-password"
+
+
+@pytest.fixture(autouse=True)
+def fast_key(monkeypatch):
+    # Key stretching is deliberately slow; tests do not need it
+    monkeypatch.setattr(backup_store, "KEY_ITERATIONS", 1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChunkStore(str(tmp_path / "store"), PASSWORD)
+
+
+def _data(size, seed=0):
+    return bytes((i * 7 + seed) % 251 for i in range(size))
+
+
+def _read(store, name):
+    buffer = io.BytesIO()
+    store.read_snapshot(name, buffer)
+    return buffer.getvalue()
+
+
+def _chunk_files(store):
+    return [
+        entry
+        for prefix in os.listdir(store.chunk_dir)
+        for entry in os.listdir(os.path.join(store.chunk_dir, prefix))
+    ]
+
+
+def test_snapshot_round_trip(store):
+    """Test a stored snapshot reads back byte for byte"""
+    data = _data(backup_store.CHUNK_SIZE * 3 + 100)
+    name, written, _ = store.write_snapshot(io.BytesIO(data), "first")
+    assert written == 4
+    assert store.snapshots() == ["first"]
+    assert _read(store, name) == data
+
+
+def test_unchanged_chunks_are_not_rewritten(store):
+    """Test a second snapshot only writes the chunks that changed"""
+    data = bytearray(_data(backup_store.CHUNK_SIZE * 4))
+    store.write_snapshot(io.BytesIO(data), "first")
+    data[backup_store.CHUNK_SIZE + 5] ^= 0xFF
+    _, written, _ = store.write_snapshot(io.BytesIO(data), "second")
+    assert written == 1
+    assert len(_chunk_files(store)) == 5
+    assert _read(store, "second") == bytes(data)
+
+
+def test_chunk_names_depend_on_password(tmp_path):
+    """Test chunk names are keyed so they do not reveal plain content hashes"""
+    data = _data(1000)
+    one = ChunkStore(str(tmp_path / "one"), "password-one")
+    two = ChunkStore(str(tmp_path / "two"), "password-two")
+    assert one.digest(data) != two.digest(data)
+
+
+def test_prune_removes_unreferenced_chunks(store):
+    """Test retention drops old snapshots and chunks only they used"""
+    store.write_snapshot(io.BytesIO(_data(1000, seed=1)), "a")
+    store.write_snapshot(io.BytesIO(_data(1000, seed=2)), "b")
+    store.write_snapshot(io.BytesIO(_data(1000, seed=2)), "c")
+    assert store.prune(keep=2) == (1, 1)
+    assert store.snapshots() == ["b", "c"]
+    assert len(_chunk_files(store)) == 1
+    assert _read(store, "c") == _data(1000, seed=2)
+
+
+def test_prune_refuses_to_keep_nothing(store):
+    """Test prune with keep below 1 raises instead of deleting every snapshot"""
+    store.write_snapshot(io.BytesIO(_data(1000)), "a")
+    with pytest.raises(ValueError):
+        store.prune(keep=0)
+    assert store.snapshots() == ["a"]
+
+
+def test_corrupt_chunk_is_detected(store, monkeypatch):
+    """Test a chunk whose contents no longer match its name is rejected"""
+    name, _, _ = store.write_snapshot(io.BytesIO(_data(1000)), "a")
+    chunk_id = store.manifest(name)["chunks"][0]
+    monkeypatch.setattr(store, "digest", lambda data: "0" * 64)
+    with pytest.raises(BackupStoreError):
+        store._read_chunk(chunk_id)
+
+
+def test_missing_snapshot(store):
+    """Test asking for an unknown snapshot raises BackupStoreError"""
+    with pytest.raises(BackupStoreError):
+        store.manifest("nope")
+
+
+def test_backup_and_restore_commands(tmp_path, monkeypatch, settings):
+    """Test backup_db --mode chunks output can be restored with restore_db"""
+    db_path = tmp_path / "live.sqlite3"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE stock (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany(
+        "INSERT INTO stock (name) VALUES (?)", ((f"Item {i}",) for i in range(500))
+    )
+    conn.commit()
+    conn.close()
+
+    drive = tmp_path / "mounts" / "usb"
+    drive.mkdir(parents=True)
+    (drive / ".shopbackup").touch()
+    monkeypatch.setenv("BACKUP_MOUNT_DIR", str(tmp_path / "mounts"))
+    monkeypatch.setenv("DJANGO_BACKUP_PASSWORD", PASSWORD)
+    monkeypatch.setitem(settings.DATABASES["default"], "NAME", db_path)
+
+    call_command("backup_db", "--mode", "chunks", "--step-sleep", "0")
+    assert (drive / STORE_DIRNAME / "snapshots").is_dir()
+    assert not list(drive.glob("shop_backup_*.zip"))
+
+    output = tmp_path / "restored.sqlite3"
+    call_command("restore_db", str(drive), "--output", str(output))
+    conn = sqlite3.connect(output)
+    assert conn.execute("SELECT COUNT(*) FROM stock").fetchone()[0] == 500
+    conn.close()
+
+    with pytest.raises(CommandError, match="--force"):
+        call_command("restore_db", str(drive), "--output", str(output))
+
+
+def test_shared_encoding_encrypts_each_chunk_once(tmp_path, monkeypatch):
+    """Test stores sharing EncodedChunks compress and encrypt a chunk once"""
+    calls = []
+    real_encode = ChunkStore.encode_chunk
+    monkeypatch.setattr(
+        ChunkStore,
+        "encode_chunk",
+        lambda self, data: calls.append(1) or real_encode(self, data),
+    )
+    data = _data(backup_store.CHUNK_SIZE * 2)
+    encoded = backup_store.EncodedChunks(readers=3)
+    for drive in ("one", "two", "three"):
+        ChunkStore(str(tmp_path / drive), PASSWORD).write_snapshot(
+            io.BytesIO(data), "snap", encoded
+        )
+    assert len(calls) == 2
+    assert _read(ChunkStore(str(tmp_path / "three"), PASSWORD), "snap") == data
+    # Every store has passed every chunk, so none are still held
+    assert encoded._blobs == {}
+
+
+def test_encoded_chunks_dropped_once_every_store_passes():
+    """Test a shared chunk is held until the last store is done with it"""
+    encoded = backup_store.EncodedChunks(readers=2)
+    assert encoded.get(0, lambda: b"blob") == b"blob"
+    encoded.passed(0)
+    assert encoded.get(0, lambda: b"rebuilt") == b"blob"
+    encoded.passed(0)
+    assert encoded._blobs == {}
+
+
+def test_failed_store_does_not_pin_chunks(tmp_path, monkeypatch):
+    """Test a store that fails part way leaves no chunks held for it"""
+    data = _data(backup_store.CHUNK_SIZE * 3)
+    encoded = backup_store.EncodedChunks(readers=2)
+    failing = ChunkStore(str(tmp_path / "one"), PASSWORD)
+
+    def drive_full(chunk_id, blob):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(failing, "_write_chunk", drive_full)
+    with pytest.raises(OSError):
+        failing.write_snapshot(io.BytesIO(data), "snap", encoded)
+    ChunkStore(str(tmp_path / "two"), PASSWORD).write_snapshot(
+        io.BytesIO(data), "snap", encoded
+    )
+    assert encoded._blobs == {}
+
+
+def test_read_snapshot_rejects_manifest_mismatch(store):
+    """Test a restore whose chunks do not add up to the manifest is refused"""
+    store.write_snapshot(io.BytesIO(_data(1000)), "a")
+    manifest = store.manifest("a")
+    manifest["size"] += 1
+    path = os.path.join(store.snapshot_dir, "a.json")
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(BackupStoreError, match="does not match"):
+        _read(store, "a")
@@ -0,0 +1,134 @@
+import csv
+import io
+from datetime import datetime
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from _core import exports
+from checkout.models import Order, OrderItem
+from inventory.models import Inventory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def history(inventory_item, product, location):
+    """Two orders a month apart, one line from the Shopfloor and one not."""
+    back_room = Inventory.objects.create(product=product, location=location, quantity=4)
+    old = Order.objects.create(
+        order_number="e0000001",
+        implicit_id="old@rowan.edu",
+        date=timezone.make_aware(datetime(2025, 3, 1, 10, 30)),
+    )
+    new = Order.objects.create(
+        order_number="e0000002",
+        implicit_id="new@rowan.edu",
+        date=timezone.make_aware(datetime(2025, 4, 1, 14, 0)),
+    )
+    OrderItem.objects.create(order=old, inventory_item=inventory_item, quantity=2)
+    OrderItem.objects.create(order=new, inventory_item=inventory_item, quantity=1)
+    OrderItem.objects.create(order=new, inventory_item=back_room, quantity=3)
+    return old, new
+
+
+def _csv(response):
+    assert isinstance(response, StreamingHttpResponse)
+    text = b"".join(response.streaming_content).decode()
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_order_export_filters_by_date_and_location(admin_client, history, shopfloor):
+    """Test the order export keeps only lines in the range and location"""
+    response = admin_client.get(
+        reverse("export_csv", args=["orders"]),
+        {"since": "2025-03-15", "until": "2025-04-01", "location": shopfloor.id},
+    )
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert "attachment" in response["Content-Disposition"]
+    header, *rows = _csv(response)
+    assert header[:3] == ["order_number", "date", "implicit_id"]
+    assert [(row[0], row[-2], row[-1]) for row in rows] == [
+        ("e0000002", "Shopfloor", "1")
+    ]
+    assert rows[0][1] == timezone.localtime(history[1].date).isoformat(
+        timespec="seconds"
+    )
+
+
+@pytest.mark.parametrize("zone", ["UTC", "America/New_York", "Asia/Tokyo"])
+def test_extreme_dates_do_not_overflow(admin_client, history, zone):
+    """Test dates at either end of the calendar act as open ends"""
+    with timezone.override(zone):
+        for since, until in (
+            ("0001-01-01", "9999-12-31"),
+            ("0001-01-01", "9999-12-30"),
+        ):
+            response = admin_client.get(
+                reverse("export_csv", args=["orders"]),
+                {"since": since, "until": until},
+            )
+            assert len(_csv(response)) == 4
+
+
+def test_exports_run_one_query(history, django_assert_num_queries):
+    """Test rows are read with a single chunked query, not one per row"""
+    with django_assert_num_queries(1):
+        rows = list(exports.rows("orders", chunk_size=1))
+    assert len(rows) == 4
+
+
+def test_stream_yields_in_chunks(monkeypatch):
+    """Test rows are written out a chunk at a time, not as one string"""
+    monkeypatch.setattr(exports, "FLUSH_ROWS", 2)
+    chunks = list(exports.stream([["a"], ["b"], ["c"]]))
+    assert chunks == ["a\r\nb\r\n", "c\r\n"]
+
+
+def test_location_narrows_inventory_and_products(admin_client, history, location):
+    """Test a location filter applies to the inventory and product exports"""
+    for kind in ("inventory", "products"):
+        response = admin_client.get(
+            reverse("export_csv", args=[kind]), {"location": location.id}
+        )
+        assert len(_csv(response)) == 2
+
+
+def test_export_rejects_bad_filters(admin_client):
+    """Test an unknown export is a 404 and a reversed range is refused"""
+    response = admin_client.get(reverse("export_csv", args=["users"]))
+    assert response.status_code == 404
+    response = admin_client.get(
+        reverse("export_csv", args=["orders"]),
+        {"since": "2025-05-01", "until": "2025-04-01"},
+    )
+    assert response.status_code == 302
+    assert response.url == reverse("export_page")
+    page = admin_client.get(response.url)
+    assert "The start date is after the end date" in page.content.decode()
+
+
+def test_export_requires_manager(client, user):
+    """Test staff outside the manager groups cannot export"""
+    client.force_login(user)
+    response = client.get(reverse("export_csv", args=["orders"]))
+    assert response.status_code == 302
+    assert "login" in response.url
+
+
+def test_export_command(tmp_path, history, shopfloor):
+    """Test the command writes the same CSV to a file or stdout"""
+    path = tmp_path / "orders.csv"
+    call_command("export_csv", "orders", "--until", "2025-03-31", "-o", str(path))
+    header, *rows = list(csv.reader(path.open()))
+    assert [row[0] for row in rows] == ["e0000001"]
+
+    out = io.StringIO()
+    call_command("export_csv", "products", "--location", "Shopfloor", stdout=out)
+    assert len(out.getvalue().splitlines()) == 2
+
+    with pytest.raises(CommandError):
+        call_command("export_csv", "inventory", "--location", "Nowhere")
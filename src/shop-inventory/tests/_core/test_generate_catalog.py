@@ -0,0 +1,80 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+
+from _core.management.commands.generate_catalog import (
+    upc_check_digit,
+    upc_e_to_upc_a,
+)
+from checkout.models import Order, OrderItem
+from inventory.models import (
+    Inventory,
+    Location,
+    Product,
+    barcode_is_upc_a,
+    barcode_is_upc_e,
+    barcode_is_uuid,
+    normalize_barcode,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def test_upc_check_digits():
+    """Test UPC-A and UPC-E check digits match published codes"""
+    assert upc_check_digit("03600029145") == "2"
+    assert upc_e_to_upc_a("0425261") == "04210000526"
+    assert upc_check_digit(upc_e_to_upc_a("0425261")) == "4"
+
+
+def _generate(*args):
+    call_command(
+        "generate_catalog",
+        "--products",
+        "300",
+        "--locations",
+        "3",
+        "--orders",
+        "200",
+        "--batch-size",
+        "64",
+        *args,
+        stdout=StringIO(),
+    )
+
+
+def test_generates_valid_catalog_and_history():
+    """Test products, locations, inventory and orders are generated"""
+    locations = Location.objects.count()
+    _generate()
+    assert Product.objects.count() == 300
+    assert Location.objects.count() == locations + 3
+    barcodes = list(Product.objects.values_list("barcode", "normalized_barcode"))
+    for barcode, normalized in barcodes:
+        assert normalized == normalize_barcode(barcode)
+        if barcode_is_upc_a(barcode):
+            assert barcode[-1] == upc_check_digit(barcode[:11])
+        elif barcode_is_upc_e(barcode):
+            assert barcode[-1] == upc_check_digit(upc_e_to_upc_a(barcode))
+        else:
+            assert barcode_is_uuid(barcode)
+    assert any(barcode.startswith("2") for barcode, _ in barcodes if len(barcode) == 12)
+
+    assert Inventory.objects.filter(location__name="Shopfloor").exists()
+    assert Order.objects.count() == 200
+    assert not Order.objects.filter(items=None).exists()
+    assert not OrderItem.objects.exclude(
+        inventory_item__location__name="Shopfloor"
+    ).exists()
+    assert Order.objects.filter(date__gte=timezone.now()).count() == 0
+
+
+def test_second_run_adds_to_existing_catalog():
+    """Test running again with the same seed adds new, non-clashing rows"""
+    _generate()
+    locations = Location.objects.count()
+    _generate()
+    assert Product.objects.count() == 600
+    assert Location.objects.count() == locations + 3
+    assert Order.objects.count() == 400
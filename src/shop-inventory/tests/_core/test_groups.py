@@ -0,0 +1,71 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.urls import reverse
+
+from _core import groups
+
+pytestmark = pytest.mark.django_db
+
+
+def _fresh(user):
+    """Reload the user, as the next request would."""
+    return get_user_model().objects.get(pk=user.pk)
+
+
+def test_group_names_are_memoized(employee_user, django_assert_num_queries):
+    """Test group names cost one query, then none for later requests"""
+    user = _fresh(employee_user)
+    with django_assert_num_queries(1):
+        assert groups.group_names(user) == {"Shop Employee"}
+        assert groups.in_groups(user, "Shop Employee", "Admins")
+    next_request_user = _fresh(employee_user)
+    with django_assert_num_queries(0):
+        assert groups.in_groups(next_request_user, "Shop Employee")
+        assert not groups.in_groups(next_request_user, "Shop Manager")
+
+
+def test_anonymous_user_has_no_groups():
+    """Test anonymous users belong to no groups without a query"""
+    assert groups.group_names(AnonymousUser()) == frozenset()
+
+
+def test_adding_and_removing_groups_invalidates(employee_user, shop_manager_group):
+    """Test m2m changes from the user side drop the cached names"""
+    assert not groups.in_groups(_fresh(employee_user), "Shop Manager")
+    employee_user.groups.add(shop_manager_group)
+    assert groups.in_groups(_fresh(employee_user), "Shop Manager")
+    employee_user.groups.remove(shop_manager_group)
+    assert not groups.in_groups(_fresh(employee_user), "Shop Manager")
+    employee_user.groups.clear()
+    assert groups.group_names(_fresh(employee_user)) == frozenset()
+
+
+def test_group_side_changes_invalidate(employee_user, shop_manager_group):
+    """Test m2m changes and renames from the group side drop the cached names"""
+    assert groups.group_names(_fresh(employee_user)) == {"Shop Employee"}
+    shop_manager_group.user_set.add(employee_user)
+    assert groups.in_groups(_fresh(employee_user), "Shop Manager")
+    shop_manager_group.user_set.clear()
+    assert not groups.in_groups(_fresh(employee_user), "Shop Manager")
+
+    employee_group = employee_user.groups.get()
+    employee_group.name = "Volunteer"
+    employee_group.save()
+    assert groups.group_names(_fresh(employee_user)) == {"Volunteer"}
+
+
+def test_manager_button_reads_cached_groups(
+    client, employee_user, shop_manager_group, django_assert_max_num_queries
+):
+    """Test the inventory index shows the manager button from cached groups"""
+    client.force_login(employee_user)
+    url = reverse("inventory:index")
+    assert b"Manager Inventory Control" not in client.get(url).content
+
+    employee_user.groups.add(shop_manager_group)
+    client.get(url)
+    # Session and user lookups; no groups query for either check
+    with django_assert_max_num_queries(4):
+        response = client.get(url)
+    assert b"Manager Inventory Control" in response.content
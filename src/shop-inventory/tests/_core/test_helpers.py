@@ -0,0 +1,64 @@
+import pytest
+from django.conf import settings
+from pathlib import Path
+from _core import cache_config, conn_max_age, session_engine
+
+
+def test_conn_max_age_seconds():
+    """Test numeric CONN_MAX_AGE values are parsed as seconds"""
+    assert conn_max_age("600") == 600
+    assert conn_max_age("0") == 0
+
+
+def test_conn_max_age_none():
+    """Test "none" keeps connections open for the worker's lifetime"""
+    assert conn_max_age("None") is None
+
+
+def test_persistent_connections_configured():
+    """Test the default database reuses connections with health checks"""
+    assert settings.DATABASES["default"]["CONN_MAX_AGE"] == 600
+    assert settings.DATABASES["default"]["CONN_HEALTH_CHECKS"] is True
+
+
+def test_session_engine_names():
+    """Test short session engine names map to Django's backends"""
+    assert session_engine("cached_db") == "django.contrib.sessions.backends.cached_db"
+    with pytest.raises(ValueError):
+        session_engine("signed_cookies")
+
+
+def test_file_cache_location_is_under_base_dir():
+    """Test file-based cache locations are resolved against the project"""
+    config = cache_config("file", "cache/sessions", Path("/srv/app"))
+    assert config["LOCATION"] == str(Path("/srv/app/cache/sessions"))
+    assert (
+        cache_config("memcached", "127.0.0.1:11211", Path("/srv"))["LOCATION"]
+        == "127.0.0.1:11211"
+    )
+    with pytest.raises(ValueError):
+        cache_config("database", "x", Path("/srv"))
+
+
+def test_sessions_read_through_shared_cache():
+    """Test sessions default to cached_db on the shared sessions cache"""
+    assert settings.SESSION_ENGINE == "django.contrib.sessions.backends.cached_db"
+    assert settings.SESSION_CACHE_ALIAS == "sessions"
+
+
+@pytest.mark.django_db
+def test_file_session_cache_skips_database_reads(
+    client, user, settings, tmp_path, django_assert_num_queries
+):
+    """Test a logged-in request loads its session from the file cache"""
+    settings.CACHES = {
+        **settings.CACHES,
+        "sessions": cache_config("file", "sessions", tmp_path),
+    }
+    client.force_login(user)
+    from django.contrib.sessions.backends.cached_db import SessionStore
+
+    session = SessionStore(client.session.session_key)
+    with django_assert_num_queries(0):
+        assert session["_auth_user_id"] == str(user.pk)
+    assert list((tmp_path / "sessions").iterdir())
@@ -0,0 +1,118 @@
+import pytest
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from _core import query_plans
+from _core.query_plans import Proposal
+from checkout.models import Order
+
+pytestmark = pytest.mark.django_db
+
+ORDERS = '"checkout_order"'
+
+
+def test_shape_groups_repeated_statements():
+    """Test statements differing only in literals share one shape"""
+    first = "SELECT * FROM t WHERE a = 1 AND b IN (1, 2, 3) AND c = 'x'"
+    second = "SELECT * FROM t WHERE a = 22 AND b IN (4) AND c = 'it''s'"
+    assert query_plans.shape(first) == query_plans.shape(second)
+
+
+def test_propose_orders_equality_range_then_sort():
+    """Test equality columns lead, then one range column, then ORDER BY"""
+    sql = (
+        f"SELECT * FROM {ORDERS} WHERE {ORDERS}.\"date\" >= '2024-01-01' "
+        f"AND {ORDERS}.\"implicit_id\" = 'a@rowan.edu' "
+        f'ORDER BY {ORDERS}."order_number" ASC'
+    )
+    assert query_plans.propose(sql, "checkout_order") == Proposal(
+        "checkout_order", ("implicit_id", "date", "order_number"), ""
+    )
+
+
+def test_propose_partial_index_for_boolean_filters():
+    """Test a boolean predicate becomes the condition of a partial index"""
+    table = '"inventory_product"'
+    sql = (
+        f'SELECT * FROM {table} WHERE NOT {table}."active" '
+        f'ORDER BY {table}."name" ASC, {table}."manufacturer" ASC'
+    )
+    proposal = query_plans.propose(sql, "inventory_product")
+    assert proposal == Proposal(
+        "inventory_product", ("name", "manufacturer"), "NOT active"
+    )
+    assert "condition=Q(active=False)" in query_plans.model_index(proposal)
+
+
+def test_propose_includes_join_columns():
+    """Test the joined table's side of an ON clause counts as equality"""
+    sql = (
+        'SELECT * FROM "inventory_inventory" INNER JOIN "inventory_location" '
+        'ON ("inventory_inventory"."location_id" = "inventory_location"."id") '
+        'WHERE "inventory_inventory"."quantity" > 0'
+    )
+    assert query_plans.propose(sql, "inventory_inventory").columns == (
+        "location_id",
+        "quantity",
+    )
+
+
+def test_existing_indexes_cover_proposals():
+    """Test a proposal already served by an index, or the rowid, is dropped"""
+    assert query_plans.is_covered(Proposal("checkout_order", ("date",), ""))
+    assert query_plans.is_covered(
+        Proposal("inventory_inventory", ("product_id", "id"), "")
+    )
+    assert not query_plans.is_covered(Proposal("checkout_order", ("implicit_id",), ""))
+
+
+def test_analyse_flags_scans():
+    """Test a scan is flagged once per shape with a proposal"""
+    statements = [
+        f"SELECT * FROM {ORDERS} WHERE {ORDERS}.\"implicit_id\" = '{n}@rowan.edu' "
+        f'ORDER BY {ORDERS}."order_number" DESC'
+        for n in range(3)
+    ]
+    (finding,) = query_plans.analyse(statements, min_rows=0)
+    assert finding.count == 3
+    assert any("scan of checkout_order" in p for p in finding.problems)
+    assert finding.proposals == [
+        Proposal("checkout_order", ("implicit_id", "order_number"), "")
+    ]
+
+
+def test_shipped_indexes_serve_the_hot_queries():
+    """Test recent orders and the product pickers no longer scan or sort"""
+    since = timezone.now().isoformat(" ")
+    statements = [
+        f"SELECT * FROM {ORDERS} WHERE {ORDERS}.\"date\" >= '{since}' "
+        f'ORDER BY {ORDERS}."date" DESC',
+        'SELECT * FROM "inventory_product" WHERE "inventory_product"."active" '
+        'ORDER BY "inventory_product"."name" ASC, '
+        '"inventory_product"."manufacturer" ASC',
+    ]
+    assert query_plans.analyse(statements, min_rows=0) == []
+
+
+def test_command_runs_workload_and_rolls_back(inventory_item):
+    """Test the workload is captured and leaves no trace in the database"""
+    out = StringIO()
+    call_command("index_advisor", "--rounds", "1", "--min-rows", "0", stdout=out)
+    assert "Analysed" in out.getvalue()
+    assert not get_user_model().objects.filter(username="index-advisor").exists()
+    assert not Order.objects.exists()
+    inventory_item.refresh_from_db()
+    assert inventory_item.quantity == 10
+
+
+def test_command_reads_sql_file(tmp_path):
+    """Test statements can be analysed from a file instead of the workload"""
+    path = tmp_path / "workload.sql"
+    path.write_text(f"SELECT * FROM {ORDERS} WHERE {ORDERS}.\"implicit_id\" = 'x'\n")
+    out = StringIO()
+    call_command(
+        "index_advisor", "--sql-file", str(path), "--min-rows", "0", stdout=out
+    )
+    assert 'fields=["implicit_id"]' in out.getvalue()
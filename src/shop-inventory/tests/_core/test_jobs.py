@@ -0,0 +1,200 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import OperationalError
+from django.urls import reverse
+from django.utils import timezone
+
+from _core import jobs
+from _core.models import Job
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def jobs_dir(settings, tmp_path):
+    settings.JOBS_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def fake_task(monkeypatch):
+    """Register a quick task that reports progress and returns a file."""
+
+    def task(job, progress):
+        if job.params.get("fail"):
+            raise RuntimeError("boom")
+        progress(1, 2, "halfway")
+        progress(2)
+        return "result.txt", b"done"
+
+    monkeypatch.setattr(jobs, "import_string", lambda path: task)
+    return task
+
+
+def test_enqueue_reuses_unfinished_job(user):
+    """Test enqueueing the same kind twice returns the queued job"""
+    first = jobs.enqueue("qrcode_sheet", user=user)
+    assert jobs.enqueue("qrcode_sheet", user=user) == first
+    first.status = Job.SUCCEEDED
+    first.save()
+    assert jobs.enqueue("qrcode_sheet", user=user) != first
+
+
+def test_enqueue_unknown_kind():
+    """Test enqueueing an unregistered job kind is rejected"""
+    with pytest.raises(ValueError):
+        jobs.enqueue("nope")
+
+
+def test_claim_next_takes_oldest_once(user):
+    """Test jobs are claimed oldest first and never twice"""
+    first = Job.objects.create(kind="qrcode_sheet")
+    second = Job.objects.create(kind="backup_db")
+    assert jobs.claim_next() == first
+    assert jobs.claim_next() == second
+    assert jobs.claim_next() is None
+    first.refresh_from_db()
+    assert first.status == Job.RUNNING
+    assert first.started_at is not None
+
+
+def test_run_records_progress_and_result(jobs_dir, fake_task):
+    """Test a successful job stores its progress and result file"""
+    Job.objects.create(kind="qrcode_sheet")
+    job = jobs.run(jobs.claim_next())
+    assert job.status == Job.SUCCEEDED
+    assert (job.progress, job.total, job.message) == (2, 2, "halfway")
+    assert job.percent == 100
+    assert (jobs_dir / job.result_file).read_bytes() == b"done"
+
+
+def test_run_records_failure(jobs_dir, fake_task):
+    """Test a task exception marks the job failed with its message"""
+    Job.objects.create(kind="qrcode_sheet", params={"fail": True})
+    job = jobs.run(jobs.claim_next())
+    assert job.status == Job.FAILED
+    assert job.message == "boom"
+    assert job.finished_at is not None
+
+
+def test_run_jobs_command_drains_queue(jobs_dir, fake_task):
+    """Test run_jobs --once runs queued jobs and fails interrupted ones"""
+    stale = Job.objects.create(kind="backup_db", status=Job.RUNNING)
+    queued = Job.objects.create(kind="qrcode_sheet")
+    call_command("run_jobs", "--once")
+    stale.refresh_from_db()
+    queued.refresh_from_db()
+    assert stale.status == Job.FAILED
+    assert queued.status == Job.SUCCEEDED
+
+
+def test_run_jobs_survives_a_locked_database(jobs_dir, fake_task, monkeypatch, caplog):
+    """Test a database error in the worker loop is logged and the loop goes on"""
+    from _core.management.commands import run_jobs
+
+    queued = Job.objects.create(kind="qrcode_sheet")
+    real_claim = jobs.claim_next
+    calls = []
+
+    def claim_next():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("database is locked")
+        return real_claim()
+
+    monkeypatch.setattr(jobs, "claim_next", claim_next)
+    monkeypatch.setattr(run_jobs.time, "sleep", lambda seconds: None)
+    call_command("run_jobs", "--once")
+    queued.refresh_from_db()
+    assert queued.status == Job.SUCCEEDED
+    assert "database is locked" in caplog.text
+
+
+def test_run_jobs_clears_expired_sessions(jobs_dir):
+    """Test run_jobs housekeeping deletes expired django_session rows"""
+    from django.contrib.sessions.models import Session
+
+    Session.objects.create(
+        session_key="expired",
+        session_data="",
+        expire_date=timezone.now() - timedelta(minutes=1),
+    )
+    Session.objects.create(
+        session_key="current",
+        session_data="",
+        expire_date=timezone.now() + timedelta(minutes=20),
+    )
+    call_command("run_jobs", "--once")
+    assert list(Session.objects.values_list("session_key", flat=True)) == ["current"]
+
+
+def test_prune_removes_old_jobs_and_files(jobs_dir):
+    """Test prune deletes old finished jobs along with their result files"""
+    old = Job.objects.create(
+        kind="qrcode_sheet",
+        status=Job.SUCCEEDED,
+        result_file="1-old.pdf",
+        finished_at=timezone.now() - timedelta(days=2),
+    )
+    recent = Job.objects.create(
+        kind="qrcode_sheet", status=Job.SUCCEEDED, finished_at=timezone.now()
+    )
+    (jobs_dir / old.result_file).write_bytes(b"x")
+    assert jobs.prune(86400) == 1
+    assert not (jobs_dir / old.result_file).exists()
+    assert list(Job.objects.all()) == [recent]
+
+
+def test_job_status_endpoint(client, employee_user, jobs_dir, fake_task):
+    """Test the status endpoint reports progress and a download link"""
+    client.force_login(employee_user)
+    job = jobs.enqueue("qrcode_sheet", user=employee_user)
+    data = client.get(reverse("job_status", args=[job.id])).json()
+    assert data["status"] == "queued"
+    assert data["download_url"] is None
+
+    jobs.run(jobs.claim_next())
+    data = client.get(reverse("job_status", args=[job.id])).json()
+    assert data["finished"]
+    assert data["percent"] == 100
+    response = client.get(data["download_url"])
+    assert b"".join(response.streaming_content) == b"done"
+
+
+def test_job_detail_page(client, employee_user):
+    """Test the job page renders for the job's creator"""
+    client.force_login(employee_user)
+    job = jobs.enqueue("qrcode_sheet", user=employee_user)
+    response = client.get(reverse("job_detail", args=[job.id]))
+    assert response.status_code == 200
+    assert b"QR Label Sheet" in response.content
+
+
+def test_job_hidden_from_other_employees(client, employee_user, user):
+    """Test employees cannot see another user's jobs"""
+    job = jobs.enqueue("qrcode_sheet", user=user)
+    client.force_login(employee_user)
+    response = client.get(reverse("job_status", args=[job.id]))
+    assert response.status_code == 404
+
+
+def test_start_backup_requires_manager(client, employee_user, admin_user):
+    """Test only managers and admins can queue a backup"""
+    client.force_login(employee_user)
+    client.post(reverse("start_backup"))
+    assert not Job.objects.exists()
+
+    client.force_login(admin_user)
+    response = client.post(reverse("start_backup"))
+    job = Job.objects.get(kind="backup_db")
+    assert response.url == reverse("job_detail", args=[job.id])
+
+
+def test_backup_job_fails_without_password(monkeypatch):
+    """Test a backup job fails visibly when no password is configured"""
+    monkeypatch.delenv("DJANGO_BACKUP_PASSWORD", raising=False)
+    Job.objects.create(kind="backup_db")
+    job = jobs.run(jobs.claim_next())
+    assert job.status == Job.FAILED
+    assert "DJANGO_BACKUP_PASSWORD" in job.message
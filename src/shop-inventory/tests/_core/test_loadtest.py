@@ -0,0 +1,77 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+
+from _core.loadtest import Response, Results
+from checkout.models import Order
+from inventory.models import Product
+
+
+def test_results_report_tail_latency_and_locks():
+    """Test results count errors and lock messages per action"""
+    results = Results()
+    ok = Response(200, {}, b"<html>Added</html>")
+    locked = Response(200, {}, b"<li>database is locked</li>")
+    for ms in range(1, 101):
+        results.add("scan", ms / 1000, ok)
+    results.add("process_order", 0.5, locked)
+    results.add("process_order", 0.1, Response(500, {}, b""))
+    rows = {row[0]: row for row in results.rows(10)}
+    action, count, rps, p50, p95, p99, errors, lock_count = rows["scan"]
+    assert (count, rps, errors, lock_count) == (100, 10.0, 0, 0)
+    assert p50 == pytest.approx(50.5)
+    assert p95 < p99 <= 100
+    assert rows["process_order"][6:] == (1, 1)
+
+
+@pytest.mark.django_db
+def test_load_test_needs_prepared_products():
+    """Test running without --prepare explains what is missing"""
+    with pytest.raises(CommandError, match="--prepare"):
+        call_command("load_test", "--seconds", "0", "--force")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_test_drives_a_live_server(live_server):
+    """Test a short shift scans, commits orders and updates stock"""
+    sizes = ["--employees", "1", "--managers", "1", "--force"]
+    out = StringIO()
+    call_command("load_test", "--prepare", "--products", "3", *sizes, stdout=out)
+    password = out.getvalue().split("Generated password: ")[1].strip()
+    out = StringIO()
+    call_command(
+        "load_test",
+        "--url",
+        live_server.url,
+        "--seconds",
+        "1.5",
+        "--think",
+        "0",
+        "--scans-per-order",
+        "2",
+        "--password",
+        password,
+        *sizes,
+        stdout=out,
+    )
+    report = out.getvalue()
+    for action in ("scan", "process_order", "stock_update"):
+        assert action in report
+    assert "'database is locked' on 0" in report
+    assert Order.objects.exists()
+
+    call_command("load_test", "--cleanup", stdout=StringIO())
+    assert not Order.objects.exists()
+    assert not Product.objects.filter(manufacturer="Load Test").exists()
+    assert (
+        not get_user_model().objects.filter(username__startswith="loadtest-").exists()
+    )
+
+
+def test_load_test_refuses_production_settings(settings):
+    """Test writing load test data needs --force with DEBUG off"""
+    settings.DEBUG = False
+    with pytest.raises(CommandError, match="--force"):
+        call_command("load_test", "--prepare")
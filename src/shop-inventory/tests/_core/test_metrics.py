@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import Group
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from _core import metrics
+from _core.models import EndpointStats
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def metrics_on(settings):
+    settings.METRICS_ENABLED = True
+    settings.METRICS_FLUSH_SECONDS = 3600
+    metrics._buffer.clear()
+    yield
+    metrics._buffer.clear()
+
+
+@pytest.fixture
+def manager_client(client, user):
+    manager_group, _ = Group.objects.get_or_create(name="Shop Manager")
+    user.groups.add(manager_group)
+    client.force_login(user)
+    return client
+
+
+def test_middleware_records_url_name_and_queries(client, user, inventory_item):
+    """Test each resolved request is buffered with its query count"""
+    client.force_login(user)
+    client.get(reverse("inventory:index"))
+    client.get("/no-such-page/")
+    assert len(metrics._buffer) == 1
+    url_name, elapsed_ms, queries, sql_ms, hour = metrics._buffer[0]
+    assert hour.minute == hour.second == 0
+    assert url_name == "inventory:index"
+    assert elapsed_ms > 0
+    assert queries > 0
+    assert 0 <= sql_ms <= elapsed_ms
+
+
+def test_flush_merges_into_hourly_rows():
+    """Test flushing twice adds to the same row for the hour"""
+    metrics.record("checkout:index", 4.0, 3, 1.0)
+    metrics.record("checkout:index", 40.0, 5, 2.0)
+    assert metrics.flush() == 2
+    metrics.record("checkout:index", 400.0, 9, 3.0)
+    metrics.flush()
+    row = EndpointStats.objects.get()
+    assert row.count == 3
+    assert row.queries == 17
+    assert row.max_queries == 9
+    assert row.max_ms == 400.0
+    assert sum(row.histogram) == 3
+    assert metrics.flush() == 0
+
+
+def test_flush_files_samples_under_their_own_hour():
+    """Test a sample from before the hour boundary keeps its hour at flush"""
+    hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+    metrics.record("checkout:index", 4.0, 3, 1.0, hour - timedelta(hours=1))
+    metrics.record("checkout:index", 40.0, 5, 2.0, hour)
+    assert metrics.flush() == 2
+    rows = EndpointStats.objects.order_by("hour")
+    assert [(row.hour, row.count) for row in rows] == [
+        (hour - timedelta(hours=1), 1),
+        (hour, 1),
+    ]
+    assert [row.max_ms for row in rows] == [4.0, 40.0]
+
+
+def test_flush_takes_the_write_lock_before_reading():
+    """Test the flush writes first, so its read never upgrades to a write"""
+    metrics.record("checkout:index", 4.0, 3, 1.0)
+    with CaptureQueriesContext(connection) as captured:
+        metrics.flush()
+    statements = [
+        q["sql"] for q in captured.captured_queries if "SAVEPOINT" not in q["sql"]
+    ]
+    assert statements[0].startswith("INSERT OR IGNORE")
+
+
+def test_flush_keeps_samples_when_locked(monkeypatch):
+    """Test a locked database leaves the samples buffered for the next flush"""
+
+    def locked(*args, **kwargs):
+        raise OperationalError("database is locked")
+
+    metrics.record("checkout:index", 4.0, 3, 1.0)
+    monkeypatch.setattr(EndpointStats.objects, "bulk_create", locked)
+    assert metrics.flush() == 0
+    assert len(metrics._buffer) == 1
+    monkeypatch.undo()
+    assert metrics.flush() == 1
+    assert EndpointStats.objects.get().count == 1
+
+
+def test_flush_runs_after_the_response(client, user, settings, monkeypatch):
+    """Test a due flush happens once the request has finished, not inside it"""
+    settings.METRICS_FLUSH_SECONDS = 0
+
+    def fail(*args, **kwargs):
+        raise OperationalError("database is locked")
+
+    client.force_login(user)
+    monkeypatch.setattr(EndpointStats.objects, "bulk_create", fail)
+    response = client.get(reverse("inventory:index"))
+    assert response.status_code == 200
+    monkeypatch.undo()
+    client.get(reverse("inventory:index"))
+    assert EndpointStats.objects.get(url_name="inventory:index").count == 2
+
+
+def test_buffer_is_bounded():
+    """Test the ring buffer drops the oldest samples when full"""
+    for i in range(metrics.BUFFER_SIZE + 10):
+        metrics.record("a", float(i), 0, 0.0)
+    assert len(metrics._buffer) == metrics.BUFFER_SIZE
+    assert metrics._buffer[0][1] == 10.0
+
+
+def test_percentile_from_histogram():
+    """Test percentiles are read from the bucket holding the requested rank"""
+    histogram = [0] * (len(metrics.BUCKETS_MS) + 1)
+    histogram[metrics.BUCKETS_MS.index(10)] = 90
+    histogram[metrics.BUCKETS_MS.index(500)] = 10
+    assert 7.5 < metrics.percentile(histogram, 0.50) <= 10
+    assert 300 < metrics.percentile(histogram, 0.99) <= 500
+    assert metrics.percentile([0] * len(histogram), 0.5) == 0.0
+
+
+def test_stats_page_lists_slowest_first(manager_client):
+    """Test the manager stats page orders endpoints by p95 latency"""
+    for _ in range(20):
+        metrics.record("checkout:index", 5.0, 3, 1.0)
+        metrics.record("inventory:index", 250.0, 12, 20.0)
+    response = manager_client.get(reverse("inventory:endpoint_stats"))
+    assert response.status_code == 200
+    names = [row["url_name"] for row in response.context["stats"]]
+    assert names.index("inventory:index") < names.index("checkout:index")
+    assert b"inventory:index" in response.content
+
+
+def test_stats_page_is_for_managers(client, employee_user):
+    """Test employees cannot open the stats page"""
+    client.force_login(employee_user)
+    response = client.get(reverse("inventory:endpoint_stats"))
+    assert response.status_code == 302
@@ -46,3 +46,24 @@ def test_group_creation():
     # Groups should be created by signals
     assert Group.objects.filter(name="Shop Employee").exists()
     assert Group.objects.filter(name="Shop Manager").exists()
+
+
+def test_sqlite_pragmas_applied_on_connection():
+    """Test the connection_created hook applies SQLITE_PRAGMAS"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone()[0] == 5000
+        cursor.execute("PRAGMA temp_store")
+        assert cursor.fetchone()[0] == 2  # MEMORY
+
+
+def test_sqlite_pragma_statements_skip_blank_values():
+    """Test blank pragma values are left at SQLite's default"""
+    from _core.db import sqlite_pragma_statements
+
+    statements = sqlite_pragma_statements(
+        {"journal_mode": "WAL", "mmap_size": "", "cache_size": None}
+    )
+    assert statements == ["PRAGMA journal_mode = WAL"]
@@ -0,0 +1,178 @@
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from inventory.models import Product, Location, Inventory
+from checkout import barcode_index, stock
+from checkout import cart as cart_store
+
+pytestmark = pytest.mark.django_db
+
+
+def test_lookup_found(inventory_item):
+    """Test a Shopfloor barcode resolves to its inventory row"""
+    entry = barcode_index.lookup("123456789012")
+    assert entry.inventory_id == inventory_item.id
+    assert entry.product_name == inventory_item.product.name
+    assert entry.quantity == inventory_item.quantity
+
+
+def test_lookup_not_found(inventory_item):
+    """Test unknown barcodes return None"""
+    assert barcode_index.lookup("999999999999") is None
+
+
+def test_lookup_ignores_other_locations(product, location):
+    """Test stock outside the Shopfloor is not sellable"""
+    Inventory.objects.create(product=product, location=location, quantity=5)
+    assert barcode_index.lookup(product.barcode) is None
+
+
+def test_lookup_normalizes_variable_weight(shopfloor):
+    """Test number system 2 barcodes match regardless of the weight digits"""
+    product = Product.objects.create(
+        name="Deli Meat", manufacturer="Store", barcode="212345012345"
+    )
+    inventory = Inventory.objects.create(
+        product=product, location=shopfloor, quantity=3
+    )
+    assert barcode_index.lookup("212345067890").inventory_id == inventory.id
+
+
+def test_warm_lookup_runs_no_queries(django_assert_num_queries, inventory_item):
+    """Test a warm index answers without touching the database"""
+    barcode_index.lookup("123456789012")
+    with django_assert_num_queries(0):
+        entry = barcode_index.lookup("123456789012")
+    assert entry.inventory_id == inventory_item.id
+
+
+def test_miss_falls_back_to_database(
+    django_assert_num_queries, inventory_item, shopfloor
+):
+    """Test rows added after the index was built are still found"""
+    barcode_index.lookup("123456789012")
+    # Simulate another worker enrolling a product: no signal reaches this index
+    Inventory.objects.filter(id=inventory_item.id).update(quantity=0)
+    Product.objects.bulk_create(
+        [
+            Product(
+                name="Late",
+                manufacturer="Maker",
+                barcode="555555555555",
+                normalized_barcode="555555555555",
+            )
+        ]
+    )
+    product = Product.objects.get(barcode="555555555555")
+    (late,) = Inventory.objects.bulk_create(
+        [Inventory(product=product, location=shopfloor, quantity=2)]
+    )
+    # The other worker's signals keep the shared read model current
+    stock.refresh_inventory(late.id)
+    entry = barcode_index.lookup("555555555555")
+    assert entry.product_name == "Late"
+    with django_assert_num_queries(0):
+        barcode_index.lookup("555555555555")
+
+
+def test_inventory_save_updates_quantity(
+    inventory_item, django_capture_on_commit_callbacks
+):
+    """Test Inventory saves keep the cached quantity current"""
+    barcode_index.lookup("123456789012")
+    with django_capture_on_commit_callbacks(execute=True):
+        inventory_item.quantity = 4
+        inventory_item.save()
+    assert barcode_index.lookup("123456789012").quantity == 4
+
+
+def test_inventory_empty_is_dropped(inventory_item, django_capture_on_commit_callbacks):
+    """Test rows that sell out are no longer returned"""
+    barcode_index.lookup("123456789012")
+    with django_capture_on_commit_callbacks(execute=True):
+        inventory_item.quantity = 0
+        inventory_item.save()
+    assert barcode_index.lookup("123456789012") is None
+
+
+def test_rolled_back_save_leaves_index_alone(inventory_item):
+    """Test a quantity that is never committed never reaches the index"""
+    barcode_index.lookup("123456789012")
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            inventory_item.quantity = 4
+            inventory_item.save()
+            raise RuntimeError("rolled back")
+    assert barcode_index.lookup("123456789012").quantity == 10
+
+
+def test_product_save_invalidates(inventory_item):
+    """Test product renames are reflected on the next scan"""
+    barcode_index.lookup("123456789012")
+    product = inventory_item.product
+    product.name = "Renamed"
+    product.save()
+    assert barcode_index.lookup("123456789012").product_name == "Renamed"
+
+
+def test_scan_uses_one_inventory_query(
+    client, django_assert_max_num_queries, inventory_item
+):
+    """Test a warm scan reads inventory by primary key and skips the session"""
+    barcode_index.lookup("123456789012")
+    client.post(reverse("checkout:index"), {"barcode": "123456789012"})
+
+    # Inventory row and cart usage for the form; then, inside a savepoint,
+    # the cart insert that takes the write lock, stock with usage again, and
+    # one cart line increment
+    with django_assert_max_num_queries(7) as captured:
+        response = client.post(reverse("checkout:index"), {"barcode": "123456789012"})
+    assert response.status_code == 302
+    inventory_queries = [
+        q["sql"] for q in captured.captured_queries if "inventory_inventory" in q["sql"]
+    ]
+    # The primary key read, and the stock re-read under the write lock
+    assert len(inventory_queries) == 2
+    assert not any(
+        'UPDATE "django_session"' in q["sql"] for q in captured.captured_queries
+    )
+    key = client.session["cart_id"]
+    assert cart_store.quantities(key) == {str(inventory_item.id): 2}
+
+
+@pytest.fixture
+def second_shopfloor_row(product):
+    """A row of the same product on another Shopfloor location."""
+    annex = Location.objects.create(name="Shopfloor Annex")
+    return Inventory.objects.create(product=product, location=annex, quantity=3)
+
+
+def _sold_out_elsewhere(inventory):
+    """Empty a row the way another worker would: no signal reaches this index."""
+    Inventory.objects.filter(id=inventory.id).update(quantity=0)
+    stock.refresh_inventory(inventory.id)
+
+
+def test_scan_retries_a_row_sold_out_by_another_worker(
+    client, inventory_item, second_shopfloor_row
+):
+    """Test a stale cached row is looked up again instead of reported short"""
+    assert barcode_index.lookup("123456789012").inventory_id == inventory_item.id
+    _sold_out_elsewhere(inventory_item)
+    client.post(reverse("checkout:index"), {"barcode": "123456789012"})
+    key = client.session["cart_id"]
+    assert cart_store.quantities(key) == {str(second_shopfloor_row.id): 1}
+    assert barcode_index.lookup("123456789012").inventory_id == second_shopfloor_row.id
+
+
+def test_scan_of_row_moved_off_the_shopfloor(client, inventory_item, location):
+    """Test a cached row moved to storage by another worker is not sold"""
+    barcode_index.lookup("123456789012")
+    Inventory.objects.filter(id=inventory_item.id).update(location=location)
+    stock.refresh_inventory(inventory_item.id)
+    response = client.post(
+        reverse("checkout:index"), {"barcode": "123456789012"}, follow=True
+    )
+    assert "Product not found" in response.content.decode()
+    assert cart_store.quantities(client.session["cart_id"]) == {}
+    assert barcode_index.lookup("123456789012") is None
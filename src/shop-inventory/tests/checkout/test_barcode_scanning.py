@@ -1,4 +1,5 @@
 import pytest
+from checkout import cart as cart_store
 from django.urls import reverse
 from inventory.models import Product, Location, Inventory
 
@@ -19,7 +20,7 @@ def test_barcode_scan_success(client, inventory_item):
     assert response.status_code == 302
 
     # Check cart was updated
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert str(inventory_item.id) in cart
 
 
@@ -37,7 +38,7 @@ def test_barcode_scan_not_found(client, shopfloor):
     assert response.status_code == 302
 
     # Check cart is empty
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert not cart
 
 
@@ -79,7 +80,7 @@ def test_remove_from_cart(client, inventory_item):
     assert response.status_code == 302
 
     # Check item was removed
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert str(inventory_item.id) not in cart
 
 
@@ -0,0 +1,168 @@
+import pytest
+from datetime import timedelta
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from inventory.models import Product, Inventory
+from checkout import cart as cart_store
+from checkout.forms import AddToCartForm
+from checkout.models import Cart, CartLine
+
+pytestmark = pytest.mark.django_db
+
+
+def _client_cart(client):
+    """Give the client's session a stored cart and return its key."""
+    session = client.session
+    key = cart_store.get_key(session, create=True)
+    session.save()
+    return key
+
+
+def _stock_cart(client, shopfloor, lines):
+    """Put `lines` distinct Shopfloor items into the client's cart."""
+    key = _client_cart(client)
+    for index in range(lines):
+        product = Product.objects.create(
+            name=f"Cart Item {index}",
+            manufacturer="Cart Maker",
+            barcode=f"{index:012d}",
+        )
+        inventory = Inventory.objects.create(
+            product=product, location=shopfloor, quantity=5
+        )
+        cart_store.add(key, inventory.id, 1)
+    return key
+
+
+def test_cart_contents_single_query(django_assert_num_queries, inventory_item):
+    """Test every cart line and its product are loaded with one query"""
+    cart_store.add("k", inventory_item.id, 2)
+    with django_assert_num_queries(1):
+        contents = cart_store.contents("k")
+        assert contents.lines[0].item.product.name == inventory_item.product.name
+    assert contents.lines[0].quantity == 2
+    assert contents.lines[0].product_id == str(inventory_item.id)
+    assert len(contents) == 1
+
+
+def test_empty_cart():
+    """Test a missing cart is falsy and renders no lines"""
+    contents = cart_store.contents(None)
+    assert not contents
+    assert contents.lines == []
+    assert cart_store.quantities(None) == {}
+
+
+def test_add_increments_one_line(inventory_item):
+    """Test adding the same item twice increments a single line"""
+    cart_store.add("k", inventory_item.id, 1)
+    cart_store.add("k", inventory_item.id, 2)
+    assert CartLine.objects.count() == 1
+    assert cart_store.quantities("k") == {str(inventory_item.id): 3}
+
+
+def test_remove_and_clear(inventory_item, product, location):
+    """Test lines can be removed one at a time or all at once"""
+    other = Inventory.objects.create(product=product, location=location, quantity=3)
+    cart_store.add("k", inventory_item.id, 1)
+    cart_store.add("k", other.id, 1)
+    assert cart_store.remove("k", inventory_item.id)
+    assert not cart_store.remove("k", inventory_item.id)
+    assert cart_store.quantities("k") == {str(other.id): 1}
+    cart_store.clear("k")
+    assert cart_store.quantities("k") == {}
+    assert Cart.objects.filter(key="k").exists()
+
+
+def test_legacy_session_cart_is_imported(client, inventory_item):
+    """Test a cart left in the session by an older release moves to the store"""
+    session = client.session
+    session["cart"] = {str(inventory_item.id): 3}
+    session.save()
+    response = client.get(reverse("checkout:index"))
+    assert b"x3" in response.content
+    assert "cart" not in client.session
+    assert cart_store.quantities(client.session["cart_id"]) == {
+        str(inventory_item.id): 3
+    }
+
+
+def test_reservations_hold_stock_against_other_carts(inventory_item):
+    """Test stock reserved by another cart cannot be added again"""
+    cart_store.add("other", inventory_item.id, 8)
+    form = AddToCartForm({"product_id": inventory_item.id, "quantity": 3}, cart_key="k")
+    assert not form.is_valid()
+    form = AddToCartForm({"product_id": inventory_item.id, "quantity": 2}, cart_key="k")
+    assert form.is_valid()
+
+
+def test_save_rechecks_stock_taken_after_clean(inventory_item):
+    """Test stock another till reserves after clean() is not promised twice"""
+    form = AddToCartForm({"product_id": inventory_item.id, "quantity": 3}, cart_key="k")
+    assert form.is_valid()
+    cart_store.add("other", inventory_item.id, 8)
+    with pytest.raises(ValidationError, match="Insufficient quantity"):
+        form.save()
+    assert cart_store.quantities("k") == {}
+
+
+def test_reserve_takes_the_write_lock_before_reading(inventory_item):
+    """Test reserve writes first, so its stock check runs under the write lock"""
+    with CaptureQueriesContext(connection) as captured:
+        assert cart_store.reserve("k", inventory_item.id, 2)
+    statements = [
+        q["sql"] for q in captured.captured_queries if "SAVEPOINT" not in q["sql"]
+    ]
+    assert statements[0].startswith("INSERT OR IGNORE")
+    assert cart_store.quantities("k") == {str(inventory_item.id): 2}
+    assert not cart_store.reserve("k", inventory_item.id, 9)
+    assert cart_store.quantities("k") == {str(inventory_item.id): 2}
+
+
+def test_expired_reservations_release_stock(inventory_item):
+    """Test a lapsed reservation no longer holds stock"""
+    cart_store.add("other", inventory_item.id, 8)
+    CartLine.objects.update(reserved_until=timezone.now() - timedelta(seconds=1))
+    assert cart_store.line_usage("k", inventory_item.id) == (0, 0)
+    form = AddToCartForm({"product_id": inventory_item.id, "quantity": 3}, cart_key="k")
+    assert form.is_valid()
+
+
+def test_scan_does_not_rewrite_session(client, inventory_item):
+    """Test adding to an existing cart leaves the session row untouched"""
+    _client_cart(client)
+    data = client.session.load()
+    for _ in range(2):
+        client.post(
+            reverse("checkout:index"), {"product_id": inventory_item.id, "quantity": 1}
+        )
+    assert client.session.load() == data
+    assert cart_store.quantities(data["cart_id"]) == {str(inventory_item.id): 2}
+
+
+def test_clear_carts_command(inventory_item):
+    """Test clear_carts removes carts whose reservations lapsed long ago"""
+    cart_store.add("old", inventory_item.id, 1)
+    cart_store.add("new", inventory_item.id, 1)
+    long_ago = timezone.now() - timedelta(days=2)
+    Cart.objects.filter(key="old").update(created=long_ago)
+    CartLine.objects.filter(cart__key="old").update(reserved_until=long_ago)
+    call_command("clear_carts")
+    assert list(Cart.objects.values_list("key", flat=True)) == ["new"]
+
+
+@pytest.mark.parametrize("lines", [1, 30])
+def test_checkout_index_query_count(
+    client, shopfloor, django_assert_max_num_queries, lines
+):
+    """Test checkout:index query count does not grow with the cart"""
+    _stock_cart(client, shopfloor, lines)
+    # Session read, inventory listing, cart lines
+    with django_assert_max_num_queries(3):
+        response = client.get(reverse("checkout:index"))
+    assert response.status_code == 200
+    assert b"Cart Item 0" in response.content
@@ -6,6 +6,7 @@ barcode scanning, UPC-A type 2 normalization, and order processing.
 """
 
 import pytest
+from checkout import cart as cart_store
 from django.urls import reverse
 from inventory.models import Product, Location, Inventory
 from checkout.models import Order, OrderItem
@@ -62,7 +63,7 @@ def test_checkout_complete_workflow(client, shopfloor):
     assert response.status_code == 302
 
     # Verify cart has item with quantity 1
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert str(inventory1.id) in cart
     assert cart[str(inventory1.id)] == 1
 
@@ -71,7 +72,7 @@ def test_checkout_complete_workflow(client, shopfloor):
     assert response.status_code == 302
 
     # Verify cart now has quantity 2
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert cart[str(inventory1.id)] == 2
 
     # Step 3: Scan different barcode
@@ -79,7 +80,7 @@ def test_checkout_complete_workflow(client, shopfloor):
     assert response.status_code == 302
 
     # Verify cart has 2 items
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert len(cart) == 2
     assert str(inventory2.id) in cart
     assert cart[str(inventory2.id)] == 1
@@ -146,7 +147,7 @@ def test_checkout_upc_a_type_2_normalization(client, shopfloor):
     response = client.post(url, {"barcode": "234567123456", "quantity": 1})
     assert response.status_code == 302
 
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert str(inventory.id) in cart
     assert cart[str(inventory.id)] == 1
 
@@ -156,7 +157,7 @@ def test_checkout_upc_a_type_2_normalization(client, shopfloor):
     assert response.status_code == 302
 
     # Verify cart still has only 1 item, with quantity increased to 2
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert len(cart) == 1
     assert str(inventory.id) in cart
     assert cart[str(inventory.id)] == 2
@@ -221,7 +222,7 @@ def test_checkout_multiple_items_single_order(client, shopfloor):
             response = client.post(url, {"barcode": products[i].barcode, "quantity": 1})
 
     # Verify cart has 3 items
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert len(cart) == 3
     for i, qty in enumerate(quantities):
         assert cart[str(inventories[i].id)] == qty
@@ -285,7 +286,7 @@ def test_checkout_insufficient_stock_during_order(client, shopfloor):
     assert not Order.objects.filter(implicit_id="greedy@rowan.edu").exists()
 
     # Verify cart still exists (order failed)
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert str(inventory.id) in cart
     assert cart[str(inventory.id)] == 5
 
@@ -0,0 +1,105 @@
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.messages import get_messages
+from inventory.models import Product, Inventory
+from checkout.models import Order, OrderItem
+from checkout.orders import InsufficientStock, commit_cart
+from checkout import barcode_index
+
+pytestmark = pytest.mark.django_db
+
+
+def _new_order():
+    return Order.objects.create(
+        order_number="abcd1234", implicit_id="test@rowan.edu", date=timezone.now()
+    )
+
+
+def _stock(shopfloor, count, quantity=5):
+    items = []
+    for index in range(count):
+        product = Product.objects.create(
+            name=f"Order Item {index}",
+            manufacturer="Order Maker",
+            barcode=f"{index + 1:012d}",
+        )
+        items.append(
+            Inventory.objects.create(
+                product=product, location=shopfloor, quantity=quantity
+            )
+        )
+    return items
+
+
+def test_commit_cart_decrements_stock(shopfloor):
+    """Test committing a cart writes order items and decrements stock"""
+    first, second = _stock(shopfloor, 2)
+    order = _new_order()
+    commit_cart(order, {str(first.id): 2, str(second.id): 5})
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert first.quantity == 3
+    assert second.quantity == 0
+    assert order.items.get(inventory_item=first).quantity == 2
+    assert order.items.get(inventory_item=second).quantity == 5
+
+
+def test_commit_cart_reports_every_short_line(shopfloor):
+    """Test all short and missing lines are reported and nothing is written"""
+    first, second, third = _stock(shopfloor, 3, quantity=2)
+    order = _new_order()
+    cart = {str(first.id): 1, str(second.id): 3, str(third.id): 4, "99999": 1}
+
+    with pytest.raises(InsufficientStock) as excinfo:
+        with transaction.atomic():
+            commit_cart(order, cart)
+
+    short = {line[0]: line[2:] for line in excinfo.value.short_lines}
+    assert short == {second.id: (3, 2), third.id: (4, 2), 99999: (1, 0)}
+    assert len(excinfo.value.messages) == 3
+    assert not OrderItem.objects.exists()
+    first.refresh_from_db()
+    assert first.quantity == 2
+
+
+def test_commit_cart_query_count(django_assert_num_queries, shopfloor):
+    """Test the number of queries does not grow with the cart"""
+    items = _stock(shopfloor, 20)
+    order = _new_order()
+    # Lock and read, insert items, decrement; then read, prune and upsert the
+    # SellableStock rows, insert the ledger movements; then read and insert
+    # the day's product rollups and update, then insert, the hour's
+    with django_assert_num_queries(11):
+        commit_cart(order, {str(item.id): 1 for item in items})
+    assert order.items.count() == 20
+
+
+def test_commit_cart_refreshes_barcode_index(
+    django_capture_on_commit_callbacks, inventory_item
+):
+    """Test the scan index sees the new quantity once the order commits"""
+    barcode_index.lookup(inventory_item.product.barcode)
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            commit_cart(_new_order(), {str(inventory_item.id): 10})
+    assert barcode_index.lookup(inventory_item.product.barcode) is None
+
+
+def test_process_order_reports_short_lines(client, shopfloor):
+    """Test the checkout view shows one message per short line"""
+    first, second = _stock(shopfloor, 2, quantity=1)
+    session = client.session
+    session["cart"] = {str(first.id): 2, str(second.id): 3}
+    session.save()
+
+    response = client.post(
+        reverse("checkout:process_order"), {"implicit_id": "test@rowan.edu"}
+    )
+    assert response.status_code == 302
+    errors = [str(m) for m in get_messages(response.wsgi_request)]
+    assert any("Order Item 0" in error for error in errors)
+    assert any("Order Item 1" in error for error in errors)
+    assert not Order.objects.exists()
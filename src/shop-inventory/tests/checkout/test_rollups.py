@@ -0,0 +1,125 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from inventory.models import Inventory, Product
+from checkout import rollups
+from checkout.models import DailyProductUsage, HourlyOrderVolume, Order, OrderItem
+from checkout.orders import commit_cart
+
+pytestmark = pytest.mark.django_db
+
+
+def _order(number, date=None):
+    return Order.objects.create(
+        order_number=number,
+        implicit_id="test@rowan.edu",
+        date=date or timezone.now(),
+    )
+
+
+def _daily():
+    return sorted(
+        DailyProductUsage.objects.values_list("day", "product_id", "items", "orders")
+    )
+
+
+def _hourly():
+    return sorted(
+        HourlyOrderVolume.objects.values_list("day", "hour", "orders", "items")
+    )
+
+
+@pytest.fixture
+def second_item(shopfloor):
+    product = Product.objects.create(
+        name="Rollup Rice", manufacturer="Grain Co", barcode="222222222222"
+    )
+    return Inventory.objects.create(product=product, location=shopfloor, quantity=10)
+
+
+def test_commit_cart_updates_rollups(inventory_item, second_item):
+    """Test each committed order adds its items and one order per product"""
+    commit_cart(_order("r0110001"), {str(inventory_item.id): 2})
+    commit_cart(_order("r0110002"), {str(inventory_item.id): 1, str(second_item.id): 3})
+    now = timezone.localtime()
+    day = now.date()
+    assert _daily() == sorted(
+        [
+            (day, inventory_item.product_id, 3, 2),
+            (day, second_item.product_id, 3, 1),
+        ]
+    )
+    assert _hourly() == [(day, now.hour, 2, 6)]
+
+
+def test_rebuild_matches_incremental(inventory_item, second_item):
+    """Test a rebuild from history gives the rows commit_cart maintained"""
+    long_ago = timezone.now() - timedelta(days=400)
+    commit_cart(_order("r0110003", long_ago), {str(inventory_item.id): 4})
+    commit_cart(_order("r0110004"), {str(inventory_item.id): 1, str(second_item.id): 2})
+    commit_cart(_order("r0110005"), {str(second_item.id): 1})
+    incremental = (_daily(), _hourly())
+
+    out = StringIO()
+    call_command("rebuild_rollups", stdout=out)
+    assert (_daily(), _hourly()) == incremental
+    assert "Rebuilt 3 daily product row(s) and 2 hourly row(s)" in out.getvalue()
+
+
+def test_rebuild_picks_up_bulk_loaded_orders(inventory_item):
+    """Test orders written without commit_cart are folded in by a rebuild"""
+    order = _order("r0110006")
+    OrderItem.objects.create(order=order, inventory_item=inventory_item, quantity=5)
+    assert not DailyProductUsage.objects.exists()
+    rollups.rebuild()
+    assert rollups.totals(timezone.localdate()) == {
+        "order_count": 1,
+        "item_count": 5,
+    }
+
+
+def test_year_over_year_pairs_months(inventory_item):
+    """Test each month is shown beside the same month a year earlier"""
+    today = timezone.localdate()
+    HourlyOrderVolume.objects.create(
+        day=today.replace(day=1), hour=10, orders=3, items=9
+    )
+    HourlyOrderVolume.objects.create(
+        day=today.replace(year=today.year - 1, day=1), hour=11, orders=2, items=6
+    )
+    months = rollups.year_over_year(today)
+    assert len(months) == 12
+    current = months[-1]
+    assert (current["items"], current["prior_items"], current["change"]) == (
+        9,
+        6,
+        50.0,
+    )
+    assert months[0]["change"] is None
+
+
+def test_reports_page_reads_only_rollups(client, admin_user, inventory_item):
+    """Test the reports page renders without touching the order tables"""
+    commit_cart(_order("r0110007"), {str(inventory_item.id): 2})
+    client.force_login(admin_user)
+    client.get(reverse("checkout:reports"))
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(reverse("checkout:reports"), {"days": 365})
+    assert response.status_code == 200
+    assert response.context["totals"] == {"order_count": 1, "item_count": 2}
+    assert response.context["products"][0]["product_id"] == inventory_item.product_id
+    assert not any(
+        "checkout_order" in query["sql"] for query in captured.captured_queries
+    )
+
+
+def test_reports_page_requires_manager(client, user):
+    """Test staff outside the manager groups cannot open the reports"""
+    client.force_login(user)
+    response = client.get(reverse("checkout:reports"))
+    assert response.status_code == 302
@@ -0,0 +1,89 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from inventory.models import Product, Inventory
+from checkout import views
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _stock(shopfloor, count, name="Soup"):
+    items = []
+    for index in range(count):
+        product = Product.objects.create(
+            name=f"{name} {index}", manufacturer="Campbell", barcode=f"{index:012d}"
+        )
+        items.append(
+            Inventory.objects.create(product=product, location=shopfloor, quantity=4)
+        )
+    return items
+
+
+def test_search_returns_matching_rows(client, inventory_item):
+    """Test the endpoint returns matching Shopfloor rows as JSON"""
+    response = client.get(reverse("checkout:search"), {"q": "test ite"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["query"] == "test ite"
+    assert data["results"] == [
+        {
+            "id": inventory_item.id,
+            "name": "Test Item",
+            "manufacturer": "Test Manufacturer",
+            "quantity": 10,
+        }
+    ]
+    assert data["has_next"] is False
+
+
+def test_search_no_match(client, inventory_item):
+    """Test unknown terms return an empty result list"""
+    response = client.get(reverse("checkout:search"), {"q": "zzz"})
+    assert response.json()["results"] == []
+
+
+def test_search_is_paginated_and_capped(client, shopfloor, monkeypatch):
+    """Test results are split into pages and capped overall"""
+    monkeypatch.setattr(views, "SEARCH_PAGE_SIZE", 2)
+    monkeypatch.setattr(views, "SEARCH_MAX_RESULTS", 5)
+    _stock(shopfloor, 7)
+
+    first = client.get(reverse("checkout:search"), {"q": "soup"}).json()
+    assert len(first["results"]) == 2
+    assert first["has_next"] is True
+
+    last = client.get(reverse("checkout:search"), {"q": "soup", "page": 3}).json()
+    assert len(last["results"]) == 1
+    assert last["has_next"] is False
+
+
+def test_search_caches_ids_by_normalized_term(
+    client, shopfloor, django_assert_num_queries
+):
+    """Test equivalent terms share one cached search and rows stay fresh"""
+    item = _stock(shopfloor, 1)[0]
+    client.get(reverse("checkout:search"), {"q": "Soup"})
+
+    item.quantity = 1
+    item.save()
+    # Only the page rows are read; the search itself comes from the cache
+    with django_assert_num_queries(1):
+        response = client.get(reverse("checkout:search"), {"q": "  soup!"})
+    assert response.json()["results"][0]["quantity"] == 1
+
+
+def test_checkout_page_wires_up_typeahead(client):
+    """Test the checkout page points its filter box at the search endpoint"""
+    response = client.get(reverse("checkout:index"))
+    assert reverse("checkout:search").encode() in response.content
+    # Later pages are reachable, and clearing the box restores the full list
+    assert b'"&page="' in response.content
+    assert b"Show more" in response.content
+    assert b"rows.replaceChildren(...initialRows)" in response.content
@@ -0,0 +1,106 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from inventory.models import Inventory, Location, Product
+from checkout import barcode_index
+from checkout.models import Order, SellableStock
+from checkout.orders import commit_cart
+
+pytestmark = pytest.mark.django_db
+
+
+def _sellable():
+    return dict(SellableStock.objects.values_list("inventory_id", "quantity"))
+
+
+def test_inventory_save_updates_read_model(inventory_item):
+    """Test saving a Shopfloor row adds it, and emptying it removes it"""
+    row = SellableStock.objects.get(inventory=inventory_item)
+    assert (row.name, row.normalized_barcode, row.quantity) == (
+        inventory_item.product.name,
+        inventory_item.product.normalized_barcode,
+        10,
+    )
+    inventory_item.quantity = 0
+    inventory_item.save()
+    assert _sellable() == {}
+    inventory_item.quantity = 4
+    inventory_item.save()
+    assert _sellable() == {inventory_item.id: 4}
+
+
+def test_other_locations_are_not_sellable(product, location):
+    """Test stock away from the Shopfloor is left out"""
+    Inventory.objects.create(product=product, location=location, quantity=5)
+    assert _sellable() == {}
+
+
+def test_product_and_location_changes_are_followed(inventory_item, shopfloor):
+    """Test renaming a product or the Shopfloor updates the read model"""
+    product = inventory_item.product
+    product.name = "Renamed"
+    product.save()
+    assert SellableStock.objects.get().name == "Renamed"
+    shopfloor.name = "Back Room"
+    shopfloor.save()
+    assert _sellable() == {}
+    shopfloor.name = "Shopfloor"
+    shopfloor.save()
+    assert _sellable() == {inventory_item.id: 10}
+
+
+def test_deletes_cascade(inventory_item):
+    """Test deleting the inventory row removes its read model row"""
+    inventory_item.delete()
+    assert not SellableStock.objects.exists()
+
+
+def test_commit_cart_updates_read_model(
+    inventory_item, django_capture_on_commit_callbacks
+):
+    """Test committing an order decrements the read model in the same transaction"""
+    order = Order.objects.create(order_number="0000aaaa", implicit_id="a@rowan.edu")
+    with django_capture_on_commit_callbacks(execute=True):
+        commit_cart(order, {str(inventory_item.id): 4})
+    assert _sellable() == {inventory_item.id: 6}
+    order = Order.objects.create(order_number="0000bbbb", implicit_id="b@rowan.edu")
+    commit_cart(order, {str(inventory_item.id): 6})
+    assert _sellable() == {}
+
+
+def test_rebuild_command(inventory_item, shopfloor):
+    """Test the rebuild command recreates rows written behind the model's back"""
+    product = Product.objects.create(name="Bulk", manufacturer="Loader", barcode="1")
+    Inventory.objects.bulk_create(
+        [Inventory(product=product, location=shopfloor, quantity=3)]
+    )
+    SellableStock.objects.filter(inventory=inventory_item).update(quantity=99)
+    out = StringIO()
+    call_command("rebuild_sellable_stock", stdout=out)
+    bulk = Inventory.objects.get(product=product)
+    assert _sellable() == {inventory_item.id: 10, bulk.id: 3}
+    assert "Rebuilt 2" in out.getvalue()
+
+
+def test_scan_lookup_reads_one_table(inventory_item, django_assert_num_queries):
+    """Test building the scan index and a miss are one single-table query each"""
+    barcode_index.invalidate()
+    with django_assert_num_queries(1) as captured:
+        assert barcode_index.lookup("123456789012").inventory_id == inventory_item.id
+    with django_assert_num_queries(1) as missed:
+        assert barcode_index.lookup("999999999999") is None
+    for query in captured.captured_queries + missed.captured_queries:
+        assert "JOIN" not in query["sql"]
+
+
+def test_listing_reads_one_table(client, inventory_item, location):
+    """Test the checkout listing and search do not join inventory or product"""
+    Location.objects.create(name="Shopfloor Annex")
+    response = client.get(reverse("checkout:index") + "?filter=Test")
+    assert [item.inventory_id for item in response.context["inventory_items"]] == [
+        inventory_item.id
+    ]
+    data = client.get(reverse("checkout:search"), {"q": "Test"}).json()
+    assert data["results"][0]["id"] == inventory_item.id
+    assert "inventory_inventory" not in str(response.context["inventory_items"].query)
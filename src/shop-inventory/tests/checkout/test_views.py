@@ -1,4 +1,5 @@
 import pytest
+from checkout import cart as cart_store
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
@@ -52,7 +53,7 @@ def test_add_to_cart(client, inventory_item_floor):
     assert response.status_code == 302
 
     # Refresh session data
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert str(inventory_item_floor.id) in cart
     assert cart[str(inventory_item_floor.id)] == 1
 
@@ -73,7 +74,7 @@ def test_add_to_cart_exceeding_quantity(client, inventory_item_floor):
     assert response.status_code == 302
 
     # Cart should be empty as the request should fail
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert not cart
 
 
@@ -136,6 +137,6 @@ def test_cart_manipulation(client, inventory_item_floor):
     client.post(reverse("checkout:index"), data2)
 
     # Refresh session data
-    cart = client.session.get("cart", {})
+    cart = cart_store.quantities(client.session.get("cart_id"))
     assert str(inventory_item_floor.id) in cart
     assert cart[str(inventory_item_floor.id)] == 3  # Should be cumulative
@@ -12,7 +12,7 @@ def test_checkout_index_with_filter(client, inventory_item):
     """Test checkout index with product filter"""
     response = client.get(reverse("checkout:index") + "?filter=Test")
     assert response.status_code == 200
-    assert inventory_item in response.context["inventory_items"]
+    assert inventory_item.sellable in response.context["inventory_items"]
 
 
 def test_process_order_form_validation_error(client, inventory_item):
@@ -7,6 +7,39 @@ import pytest
 from django.contrib.auth import get_user_model
 
 
+@pytest.fixture(autouse=True)
+def reset_barcode_index():
+    """Start every test with an empty per-process barcode index.
+
+    Test transactions are rolled back without firing signals, so an index
+    built in one test could otherwise leak rows into the next.
+    """
+    from checkout import barcode_index
+
+    barcode_index.invalidate()
+    yield
+    barcode_index.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def session_cache(settings):
+    """Keep test sessions in local memory instead of the file cache."""
+    settings.CACHES = {
+        **settings.CACHES,
+        "sessions": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    yield
+    from django.core.cache import caches
+
+    caches["sessions"].clear()
+
+
+@pytest.fixture(autouse=True)
+def no_metrics(settings):
+    """Leave request metrics off so flushes cannot add to query counts."""
+    settings.METRICS_ENABLED = False
+
+
 @pytest.fixture
 def user():
     """Create a standard user for testing."""
@@ -1,4 +1,6 @@
 import pytest
+from io import BytesIO
+from PyPDF2 import PdfReader
 from inventory.forms import (
     AddProductForm,
     AddLocationForm,
@@ -111,3 +113,9 @@ def test_barcode_generation():
     assert result is not None
     assert isinstance(result, bytes)  # Should return PDF bytes
     assert result.startswith(b"%PDF")  # Should be a PDF file
+
+
+def test_barcode_generation_multiple_pages():
+    """Test parallel barcode generation writes one PDF page per sheet"""
+    result = barcode_page_generation(rows=1, cols=2, pages=3, workers=2)
+    assert len(PdfReader(BytesIO(result)).pages) == 3
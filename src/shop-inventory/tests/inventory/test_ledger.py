@@ -0,0 +1,207 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from inventory import ledger
+from inventory.models import Inventory, StockMovement, StockSnapshot
+from checkout.models import Order, SellableStock
+from checkout.orders import commit_cart
+
+pytestmark = pytest.mark.django_db
+
+
+def _movements():
+    return list(
+        StockMovement.objects.order_by("id").values_list("delta", "reason", "source")
+    )
+
+
+def _at(moment, inventory_item, **filters):
+    return ledger.stock_at(moment, **filters).get(
+        (inventory_item.product_id, inventory_item.location_id)
+    )
+
+
+def test_stock_update_records_correction(client, admin_user, inventory_item):
+    """Test a stock update records its delta, user and source"""
+    client.force_login(admin_user)
+    client.post(
+        reverse("inventory:stock_update"),
+        {"item_id": inventory_item.id, "delta_qty": -3},
+    )
+    movement = StockMovement.objects.get()
+    assert (movement.delta, movement.reason, movement.source) == (
+        -3,
+        StockMovement.CORRECTION,
+        "stock_update",
+    )
+    assert movement.user == admin_user
+    assert movement.product_id == inventory_item.product_id
+
+
+def test_stock_update_rolls_back_with_ledger(
+    client, admin_user, inventory_item, monkeypatch
+):
+    """Test the quantity is not changed if its movement cannot be written"""
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("ledger unavailable")
+
+    monkeypatch.setattr(ledger, "record", fail)
+    client.force_login(admin_user)
+    client.post(
+        reverse("inventory:stock_update"),
+        {"item_id": inventory_item.id, "delta_qty": 5},
+    )
+    inventory_item.refresh_from_db()
+    assert inventory_item.quantity == 10
+
+
+def test_apply_keeps_a_concurrent_sale(inventory_item, user):
+    """Test a correction adds to the current quantity, not a stale read"""
+    stale = Inventory.objects.get(id=inventory_item.id)
+    commit_cart(
+        Order.objects.create(order_number="5a1e0001", implicit_id="a@rowan.edu"),
+        {str(inventory_item.id): 3},
+    )
+    updated, created = ledger.apply(
+        stale.product_id, stale.location_id, 2, StockMovement.CORRECTION, user
+    )
+    assert (updated.quantity, created) == (9, False)
+    inventory_item.refresh_from_db()
+    assert inventory_item.quantity == 9
+    assert sum(delta for delta, _, _ in _movements()) == 9 - 10
+
+
+def test_apply_refuses_to_go_below_zero(client, admin_user, inventory_item):
+    """Test a correction past zero changes nothing and records nothing"""
+    client.force_login(admin_user)
+    client.post(
+        reverse("inventory:stock_update"),
+        {"item_id": inventory_item.id, "delta_qty": -11},
+    )
+    inventory_item.refresh_from_db()
+    assert inventory_item.quantity == 10
+    assert not StockMovement.objects.exists()
+
+
+def test_apply_keeps_read_models_in_step(inventory_item):
+    """Test the sellable stock row follows a change made by apply"""
+    ledger.apply(
+        inventory_item.product_id,
+        inventory_item.location_id,
+        -4,
+        StockMovement.CORRECTION,
+    )
+    assert SellableStock.objects.get(inventory=inventory_item).quantity == 6
+
+
+def test_restocks_are_recorded(client, admin_user, location, product):
+    """Test both ways of adding stock record a restock"""
+    client.force_login(admin_user)
+    client.post(
+        reverse("inventory:add_product"),
+        {
+            "name": "Loose Apples",
+            "manufacturer": "Orchard",
+            "location": location.id,
+            "quantity": 15,
+        },
+    )
+    session = client.session
+    session["selected_location_id"] = location.id
+    session["current_product_id"] = product.id
+    session.save()
+    client.post(
+        reverse("inventory:add_item_to_location"),
+        {"action": "add_quantity", "quantity": 4},
+    )
+    assert _movements() == [
+        (15, StockMovement.RESTOCK, "add_product"),
+        (4, StockMovement.RESTOCK, "add_item_to_location"),
+    ]
+
+
+def test_orders_record_sales(inventory_item, user):
+    """Test each order line is recorded as a sale against the order"""
+    order = Order.objects.create(order_number="5a1e5a1e", implicit_id="a@rowan.edu")
+    commit_cart(order, {str(inventory_item.id): 3}, user=user)
+    movement = StockMovement.objects.get()
+    assert (movement.delta, movement.reason, movement.source, movement.user) == (
+        -3,
+        StockMovement.SALE,
+        "5a1e5a1e",
+        user,
+    )
+
+
+def test_snapshots_write_only_changed_rows(inventory_item, product, location):
+    """Test a snapshot after the first stores just the rows that changed"""
+    other = Inventory.objects.create(product=product, location=location, quantity=2)
+    _, baseline = ledger.take_snapshot()
+    assert baseline >= 2
+    inventory_item.quantity = 7
+    inventory_item.save()
+    _, changed = ledger.take_snapshot()
+    assert changed == 1
+    other.delete()
+    snapshot, changed = ledger.take_snapshot()
+    assert changed == 1
+    assert snapshot.lines.get().quantity == 0
+
+
+def _move(inventory_item, delta, created=None):
+    """Change the quantity and record it, as the views do."""
+    inventory_item.quantity += delta
+    inventory_item.save()
+    entry = ledger.record(inventory_item, delta, StockMovement.CORRECTION)
+    if created is not None:
+        StockMovement.objects.filter(id=entry.id).update(created=created)
+
+
+def _snapshot(taken):
+    snapshot, _ = ledger.take_snapshot()
+    StockSnapshot.objects.filter(id=snapshot.id).update(taken=taken)
+
+
+def test_stock_at_reconstructs_past_quantities(inventory_item):
+    """Test past stock is the newest snapshot plus the movements after it"""
+    now = timezone.now()
+    days = [now - timedelta(days=n) for n in range(7)]
+    # The baseline snapshot taken by the migration
+    StockSnapshot.objects.update(taken=days[5])
+    _snapshot(days[3])
+    _move(inventory_item, -4, created=days[2])
+    _snapshot(now - timedelta(hours=36))
+    _move(inventory_item, +6, created=days[1])
+
+    assert ledger.stock_at(days[6]) is None
+    assert _at(days[3], inventory_item) == 10
+    assert _at(days[2], inventory_item) == 6
+    assert _at(days[1], inventory_item) == 12
+    assert _at(now, inventory_item, location=inventory_item.location) == 12
+    assert _at(now, inventory_item, product=inventory_item.product) == 12
+
+
+def test_stock_at_reads_only_the_tail(inventory_item, django_assert_num_queries):
+    """Test a lookup is a fixed number of queries however long the ledger"""
+    for _ in range(20):
+        _move(inventory_item, 1)
+    ledger.take_snapshot()
+    _move(inventory_item, 1)
+    # Newest snapshot, its lines, the movements after it
+    with django_assert_num_queries(3):
+        stock = ledger.stock_at(timezone.now(), product=inventory_item.product)
+    assert stock == {(inventory_item.product_id, inventory_item.location_id): 31}
+
+
+def test_snapshot_command_and_schedule(inventory_item):
+    """Test snapshots are taken on demand and when the interval has passed"""
+    out = StringIO()
+    call_command("snapshot_stock", stdout=out)
+    assert "changed quantity row(s)" in out.getvalue()
+    assert ledger.snapshot_if_due(24) is None
+    StockSnapshot.objects.update(taken=timezone.now() - timedelta(hours=25))
+    assert ledger.snapshot_if_due(24) is not None
@@ -0,0 +1,65 @@
+import pytest
+from django.urls import reverse
+from inventory.models import Product, Location, Inventory
+from inventory.queries import inventory_by_location
+
+pytestmark = pytest.mark.django_db
+
+# Session, user and group lookups plus the two loader queries.
+MAX_VIEW_QUERIES = 6
+
+
+def _create_stock(locations, products_per_location, start=0):
+    """Create `locations` locations each holding `products_per_location` products."""
+    for loc_index in range(start, start + locations):
+        location = Location.objects.create(name=f"Bulk Location {loc_index}")
+        for prod_index in range(products_per_location):
+            product = Product.objects.create(
+                name=f"Bulk {loc_index}-{prod_index}",
+                manufacturer="Bulk Manufacturer",
+                barcode=f"{loc_index:06d}{prod_index:06d}",
+            )
+            Inventory.objects.create(product=product, location=location, quantity=1)
+
+
+def test_inventory_by_location_groups_items(inventory_item, location):
+    """Test rows are grouped under their location and empty locations are kept"""
+    result = inventory_by_location()
+    assert result[inventory_item.location] == [inventory_item]
+    assert result[location] == []
+
+
+def test_inventory_by_location_search(inventory_item, location):
+    """Test the search filter matches product and location names"""
+    result = inventory_by_location("Test Item")
+    assert result[inventory_item.location] == [inventory_item]
+
+    result = inventory_by_location("no such thing")
+    assert location in result
+    assert all(items == [] for items in result.values())
+
+
+def test_inventory_by_location_query_count(django_assert_num_queries, inventory_item):
+    """Test the loader uses two queries and products are already joined"""
+    _create_stock(locations=3, products_per_location=4)
+    with django_assert_num_queries(2):
+        result = inventory_by_location()
+        names = [item.product.name for items in result.values() for item in items]
+    assert len(names) == 13
+
+
+@pytest.mark.parametrize("view_name", ["inventory:index", "inventory:stock_check"])
+def test_view_query_count_is_constant(
+    client, user, django_assert_max_num_queries, view_name
+):
+    """Test the per-location views run a bounded number of queries"""
+    client.force_login(user)
+    _create_stock(locations=2, products_per_location=2)
+    with django_assert_max_num_queries(MAX_VIEW_QUERIES):
+        response = client.get(reverse(view_name))
+    assert response.status_code == 200
+
+    _create_stock(locations=8, products_per_location=10, start=2)
+    with django_assert_max_num_queries(MAX_VIEW_QUERIES):
+        response = client.get(reverse(view_name))
+    assert response.status_code == 200
@@ -0,0 +1,89 @@
+import pytest
+from django.urls import reverse
+from inventory.models import Product, Inventory
+from inventory.search import match_expression, search_inventory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalog(shopfloor):
+    """A few products with overlapping words, all on the Shopfloor."""
+    rows = [
+        ("Peanut Butter", "Jif"),
+        ("Butter Crackers", "Ritz"),
+        ("Creamy Peanut Butter", "Skippy"),
+        ("Pasta", "Barilla"),
+    ]
+    items = {}
+    for index, (name, manufacturer) in enumerate(rows):
+        product = Product.objects.create(
+            name=name, manufacturer=manufacturer, barcode=f"{index + 1:012d}"
+        )
+        items[name] = Inventory.objects.create(
+            product=product, location=shopfloor, quantity=3
+        )
+    return items
+
+
+def _names(queryset):
+    return [item.product.name for item in queryset]
+
+
+def test_match_expression():
+    """Test words become quoted prefix terms and punctuation is dropped"""
+    assert match_expression("pea but") == '"pea"* "but"*'
+    assert match_expression('pea"nut') == '"pea"* "nut"*'
+    assert match_expression("  --  ") is None
+
+
+def test_search_prefix_and_multi_token(catalog):
+    """Test every word must match as a prefix of name or manufacturer"""
+    results = _names(search_inventory(Inventory.objects.all(), "pea but"))
+    assert sorted(results) == ["Creamy Peanut Butter", "Peanut Butter"]
+    assert _names(search_inventory(Inventory.objects.all(), "rit")) == [
+        "Butter Crackers"
+    ]
+
+
+def test_search_is_ranked(catalog):
+    """Test closer matches come first"""
+    results = _names(search_inventory(Inventory.objects.all(), "butter"))
+    assert results[-1] == "Creamy Peanut Butter"
+    assert len(results) == 3
+
+
+def test_search_blank_and_unmatchable_terms(catalog):
+    """Test blank terms do not filter and word-less terms match nothing"""
+    assert search_inventory(Inventory.objects.all(), "").count() == 4
+    assert search_inventory(Inventory.objects.all(), "%%").count() == 0
+
+
+def test_search_follows_product_changes(catalog):
+    """Test the index is updated on product save and delete"""
+    product = catalog["Pasta"].product
+    product.name = "Spaghetti"
+    product.save()
+    assert _names(search_inventory(Inventory.objects.all(), "spag")) == ["Spaghetti"]
+    assert not search_inventory(Inventory.objects.all(), "pasta").exists()
+
+    product.delete()
+    assert not search_inventory(Inventory.objects.all(), "spag").exists()
+
+
+def test_checkout_filter_uses_search(client, catalog):
+    """Test the checkout product list is filtered by full-text search"""
+    response = client.get(reverse("checkout:index") + "?filter=skip")
+    assert _names(response.context["inventory_items"]) == ["Creamy Peanut Butter"]
+
+
+def test_inventory_index_search_matches_manufacturer(client, user, catalog):
+    """Test the inventory search matches products by manufacturer too"""
+    client.force_login(user)
+    response = client.get(reverse("inventory:index") + "?search=barilla")
+    found = [
+        item.product.name
+        for location in response.context["items_in_location"]
+        for item in location.list
+    ]
+    assert found == ["Pasta"]
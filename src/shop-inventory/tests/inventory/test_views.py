@@ -61,6 +61,22 @@ def test_stock_update_view_negative(client, user, inventory_item):
     assert inventory_item.quantity == initial_quantity  # Quantity shouldn't change
 
 
+def test_stock_update_empties_inactive_product(client, user, inventory_item):
+    """Test selling out a deactivated product reports it as out of stock"""
+    from django.contrib.messages import get_messages
+
+    inventory_item.product.active = False
+    inventory_item.product.save()
+    client.force_login(user)
+    data = {"item_id": inventory_item.id, "delta_qty": -inventory_item.quantity}
+    response = client.post(reverse("inventory:stock_update"), data)
+    texts = [str(m) for m in get_messages(response.wsgi_request)]
+    assert (
+        f"{inventory_item} is now out of stock, and its product is deactivated."
+        in texts
+    )
+
+
 def test_remove_product_view(client, admin_user, product, inventory_item):
     """Test removing a product"""
     client.force_login(admin_user)
@@ -109,12 +125,36 @@ def test_remove_location_with_inventory(client, admin_user, inventory_item):
     assert not inventory_item.location.active
 
 
-def test_qrcode_sheet_view(client, admin_user):
-    """Test generating QR code sheet"""
+def test_qrcode_sheet_view(client, admin_user, settings, tmp_path):
+    """Test the QR code sheet is queued as a job and downloadable once run"""
+    from _core import jobs
+    from _core.models import Job
+
+    settings.JOBS_DIR = tmp_path
     client.force_login(admin_user)
-    response = client.get(reverse("inventory:barcodes"))
+    response = client.post(reverse("inventory:barcodes"))
+    job = Job.objects.get(kind="qrcode_sheet")
+    assert response.status_code == 302
+    assert response.url == reverse("job_detail", args=[job.id])
+
+    job.params = {"pages": 1}
+    job.save()
+    jobs.run(jobs.claim_next())
+
+    response = client.get(reverse("job_download", args=[job.id]))
     assert response.status_code == 200
     assert response["Content-Type"] == "application/pdf"
+    assert b"".join(response.streaming_content).startswith(b"%PDF")
+
+
+def test_qrcode_sheet_get_queues_nothing(client, admin_user):
+    """Test a GET (a prefetch or crawler) does not queue a label sheet"""
+    from _core.models import Job
+
+    client.force_login(admin_user)
+    response = client.get(reverse("inventory:barcodes"))
+    assert response.status_code == 405
+    assert not Job.objects.exists()
 
 
 def test_stock_update_view_invalid_item(client, user):